@@ -0,0 +1,137 @@
+### Dependency scan benchmark: times `determine_dependencies` on generated documents of growing size, checks that its
+### output matches the previous findall-then-replace implementation, and fails when run time stops scaling linearly.
+import argparse
+import math
+import os
+import random
+import re
+import sys
+import time
+from typing import Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from bsedic.pbif.containerization.container_constructor import determine_dependencies  # noqa: E402
+from bsedic.utils.result_types import ExperimentPrimaryDependencies  # noqa: E402
+
+_SIZE_FRACTIONS = (0.125, 0.25, 0.5, 1.0)
+_PAYLOAD_FILLER = '{"time": 0.125, "values": [1.5, 2.25, 3.0], "label": "species_concentration"}, '
+
+
+def generate_document(address_count: int, payload_bytes: int, package_count: int = 200, seed: int = 0) -> str:
+    # Addresses drawn from a fixed pool, separated by JSON-like filler; every package always uses the same import path,
+    # so the previous implementation (which skipped repeated dependencies) rewrites every address too
+    randomizer = random.Random(seed)  # noqa: S311
+    address_pool = [
+        f"python:{'pypi' if index % 3 else 'conda'}<package-{index}[>={index % 7}.0]>@package_{index}.module.Process{index}"
+        for index in range(package_count)
+    ]
+    filler_length = max(payload_bytes // max(address_count, 1), 0)
+    filler = (_PAYLOAD_FILLER * (filler_length // len(_PAYLOAD_FILLER) + 1))[:filler_length]
+    chunks: list[str] = []
+    for _ in range(address_count):
+        chunks.append(filler)
+        chunks.append(f'"address": "{randomizer.choice(address_pool)}", ')
+    return "[" + "".join(chunks) + "]"
+
+
+def legacy_determine_dependencies(string_to_search: str) -> tuple[ExperimentPrimaryDependencies, str]:
+    # The previous implementation (without a passlist): one `str.replace` over the whole document per new dependency
+    import_name_legal_syntax = r"[A-Za-z_]\w*(\.[A-Za-z_]\w*)*"
+    regex_pattern = (
+        r"python:([\w\-]+)<([\w\-._~:/?#[\]@!$&'()*+,;=%]+)(\[([\w><=~!*\-.]+)])?>@" + f"({import_name_legal_syntax})"
+    )
+    approved_dependencies: dict[str, list[str]] = {"pypi": [], "conda": []}
+    adjusted_search_string = str(string_to_search)
+    for match in re.findall(regex_pattern, string_to_search):
+        dependency_str = f"{match[1]}{match[3]}".strip()
+        if dependency_str in approved_dependencies[match[0]]:
+            continue
+        approved_dependencies[match[0]].append(dependency_str)
+        version_str = match[2] if match[3] != "" else ""
+        complete_match = f"python:{match[0]}<{match[1]}{version_str}>@{match[4]}"
+        adjusted_search_string = adjusted_search_string.replace(complete_match, f"local:{match[4]}")
+    return ExperimentPrimaryDependencies(
+        approved_dependencies["pypi"], approved_dependencies["conda"]
+    ), adjusted_search_string.strip()
+
+
+def time_scan(document: str, repeat: int, legacy: bool = False) -> float:
+    scan = legacy_determine_dependencies if legacy else determine_dependencies
+    timings: list[float] = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        scan(document)
+        timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+
+def fit_scaling_exponent(sizes: list[int], timings: list[float]) -> float:
+    # Least-squares slope of log(time) against log(size); 1.0 is linear
+    log_sizes = [math.log(size) for size in sizes]
+    log_timings = [math.log(timing) for timing in timings]
+    mean_size = sum(log_sizes) / len(log_sizes)
+    mean_timing = sum(log_timings) / len(log_timings)
+    covariance = sum((x - mean_size) * (y - mean_timing) for x, y in zip(log_sizes, log_timings))
+    variance = sum((x - mean_size) ** 2 for x in log_sizes)
+    return covariance / variance
+
+
+def check_equivalence(address_count: int, payload_bytes: int) -> Optional[str]:
+    document = generate_document(address_count, payload_bytes, seed=1)
+    dependencies, updated_document = determine_dependencies(document)
+    legacy_dependencies, legacy_updated_document = legacy_determine_dependencies(document)
+    if updated_document != legacy_updated_document:
+        return "rewritten documents differ"
+    if repr(dependencies) != repr(legacy_dependencies):
+        return f"dependencies differ: {dependencies!r} != {legacy_dependencies!r}"
+    return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Scaling benchmark for PBIF dependency scanning")
+    parser.add_argument("--addresses", type=int, default=100_000, help="number of addresses in the largest document")
+    parser.add_argument("--payload-mb", type=float, default=100.0, help="filler payload of the largest document, in MB")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per size; the fastest is reported")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="allowed excess of the fitted scaling exponent over 1.0"
+    )
+    parser.add_argument(
+        "--compare-legacy", action="store_true", help="also time the previous implementation at every size (slow)"
+    )
+    args = parser.parse_args()
+
+    equivalence_error = check_equivalence(address_count=2_000, payload_bytes=1024 * 1024)
+    if equivalence_error is not None:
+        print(f"FAIL: output differs from the previous implementation: {equivalence_error}")
+        return 1
+    print("output identical to the previous implementation")
+
+    sizes: list[int] = []
+    timings: list[float] = []
+    print(
+        f"{'addresses':>10} {'bytes':>12} {'seconds':>9} {'MB/s':>8}"
+        + (f" {'legacy s':>9}" if args.compare_legacy else "")
+    )
+    for fraction in _SIZE_FRACTIONS:
+        document = generate_document(int(args.addresses * fraction), int(args.payload_mb * 1024 * 1024 * fraction))
+        timing = time_scan(document, args.repeat)
+        sizes.append(len(document))
+        timings.append(timing)
+        row = f"{int(args.addresses * fraction):>10} {len(document):>12} {timing:>9.3f} {len(document) / timing / 1e6:>8.1f}"
+        if args.compare_legacy:
+            row += f" {time_scan(document, 1, legacy=True):>9.3f}"
+        print(row)
+        del document
+
+    exponent = fit_scaling_exponent(sizes, timings)
+    print(f"fitted scaling exponent: {exponent:.2f} (linear is 1.00)")
+    if exponent > 1 + args.threshold:
+        print("FAIL: dependency scanning no longer scales linearly with document size")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+### Startup benchmark: measures the import cost of `python main.py --help` with `-X importtime`, and fails when it
+### regresses past the recorded baseline, or when a module that should load lazily is imported at startup.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(REPO_ROOT, "benchmarks", "startup_baseline.json")
+# Heavy modules that only specific code paths need; none of them may be imported just to print `--help`
+FORBIDDEN_STARTUP_MODULES = ["pydantic", "spython", "bsedic.execution", "bsedic.batch", "bsedic.daemon", "http.client"]
+
+
+def parse_importtime_output(stderr: str) -> dict[str, int]:
+    # `-X importtime` lines look like: `import time:  self [us] | cumulative | imported package`;
+    # top-level imports are the ones whose package column is not indented past its single leading space
+    cumulative_times: dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        columns = line[len("import time:") :].split("|")
+        if len(columns) != 3 or not columns[1].strip().isdigit():
+            continue  # header line
+        package_column = columns[2]
+        cumulative_times[package_column.strip()] = int(columns[1])
+        if package_column.startswith("  "):
+            continue
+        cumulative_times.setdefault("<top-level total>", 0)
+        cumulative_times["<top-level total>"] += int(columns[1])
+    return cumulative_times
+
+
+def measure_startup(runs: int) -> tuple[int, set[str]]:
+    command = [sys.executable, "-X", "importtime", os.path.join(REPO_ROOT, "main.py"), "--help"]
+    environment = dict(os.environ, PYTHONHASHSEED="0", PYTHONPATH=REPO_ROOT)
+    totals: list[int] = []
+    imported_modules: set[str] = set()
+    for run_index in range(runs + 1):
+        completed = subprocess.run(command, capture_output=True, text=True, env=environment, check=True)  # noqa: S603
+        cumulative_times = parse_importtime_output(completed.stderr)
+        imported_modules.update(cumulative_times)
+        if run_index == 0:
+            continue  # warm-up run; populates bytecode caches
+        totals.append(cumulative_times["<top-level total>"])
+    return int(statistics.median(totals)), imported_modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Startup import-time benchmark for the BSedic CLI")
+    parser.add_argument("--runs", type=int, default=7, help="number of measured runs; the median is reported")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="allowed regression over the baseline, as a fraction"
+    )
+    parser.add_argument("--update-baseline", action="store_true", help="record this measurement as the new baseline")
+    args = parser.parse_args()
+
+    median_total_us, imported_modules = measure_startup(args.runs)
+    print(f"median top-level import time: {median_total_us} us over {args.runs} runs")
+    eagerly_imported = [module for module in FORBIDDEN_STARTUP_MODULES if module in imported_modules]
+    if eagerly_imported:
+        print(f"FAIL: modules imported at startup that should load lazily: {', '.join(eagerly_imported)}")
+        return 1
+
+    if args.update_baseline or not os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "w") as baseline_file:
+            json.dump({"median_top_level_import_time_us": median_total_us}, baseline_file, indent=2)
+            baseline_file.write("\n")
+        print(f"baseline recorded at {BASELINE_PATH}")
+        return 0
+
+    with open(BASELINE_PATH) as baseline_file:
+        baseline_us = int(json.load(baseline_file)["median_top_level_import_time_us"])
+    limit_us = int(baseline_us * (1 + args.threshold))
+    print(f"baseline: {baseline_us} us; limit: {limit_us} us")
+    if median_total_us > limit_us:
+        print(f"FAIL: startup import time regressed by {median_total_us / baseline_us - 1:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+### Batch compilation: spreads many inputs over a bounded process pool so per-process startup costs are paid once per
+### worker rather than once per input.
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from typing import Optional
+
+from pydantic import BaseModel
+
+from bsedic.execution import execute_bsedic, write_container_files
+from bsedic.pbif.containerization.container_constructor import fill_dockerfile_template
+from bsedic.pbif.containerization.layered_dockerfile import (
+    LayerReuseReport,
+    compute_dependency_frequencies,
+    estimate_layer_reuse,
+)
+from bsedic.pbif.local_registry import prepare_local_registry, refresh_implementation_catalog
+from bsedic.sed.implementation_catalog import ImplementationCatalog
+from bsedic.utils.input_types import ContainerizationTypes, DockerfileLayout, ProgramArguments, RegistryDiscoveryMode
+from bsedic.utils.result_types import ExperimentPrimaryDependencies
+
+SUPPORTED_INPUT_SUFFIXES: tuple[str, ...] = (".json", ".pbif", ".zip", ".omex")
+BATCH_SUMMARY_FILE_NAME = "bsedic_batch_summary.json"
+LAYER_REUSE_REPORT_FILE_NAME = "bsedic_layer_reuse_report.json"
+
+
+class BatchInputResult(BaseModel):
+    input_file_path: str
+    output_dir: str
+    succeeded: bool
+    elapsed_seconds: float
+    error: Optional[str] = None
+    primary_dependencies: Optional[str] = None  # compact representation of `ExperimentPrimaryDependencies`
+    pypi_dependencies: list[str] = []
+    conda_dependencies: list[str] = []
+
+    def get_primary_dependencies(self) -> ExperimentPrimaryDependencies:
+        return ExperimentPrimaryDependencies(self.pypi_dependencies, self.conda_dependencies)
+
+
+class BatchSummary(BaseModel):
+    results: list[BatchInputResult]
+    elapsed_seconds: float
+
+    def get_successes(self) -> list[BatchInputResult]:
+        return [result for result in self.results if result.succeeded]
+
+    def get_failures(self) -> list[BatchInputResult]:
+        return [result for result in self.results if not result.succeeded]
+
+
+def execute_bsedic_batch(batch_program_arguments: ProgramArguments, max_workers: Optional[int] = None) -> BatchSummary:
+    # `batch_program_arguments.input_file_path` holds the batch source (directory, glob pattern, or manifest file);
+    # every other field is applied to each input individually.
+    if batch_program_arguments.output_dir is None:
+        err_msg = "Batch compilation requires an output directory"
+        raise ValueError(err_msg)
+    input_file_paths = collect_batch_inputs(batch_program_arguments.input_file_path)
+    if len(input_file_paths) == 0:
+        err_msg = f"No supported inputs found in batch source: {batch_program_arguments.input_file_path}"
+        raise ValueError(err_msg)
+    output_dirs = _determine_output_dirs(input_file_paths, str(batch_program_arguments.output_dir))
+    per_input_arguments = [
+        replace(batch_program_arguments, input_file_path=input_file_path, output_dir=output_dir)
+        for input_file_path, output_dir in zip(input_file_paths, output_dirs)
+    ]
+
+    start_time = time.perf_counter()
+    if batch_program_arguments.registry_discovery_mode == RegistryDiscoveryMode.STATIC:
+        # Brought up to date once, here, so that workers only query the catalog. Not the process-wide catalog, whose
+        # connection forked workers must not inherit.
+        with ImplementationCatalog() as implementation_catalog:
+            refresh_implementation_catalog(implementation_catalog)
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_initialize_batch_worker,
+        initargs=(batch_program_arguments.registry_discovery_mode,),
+    ) as executor:
+        results = list(executor.map(_execute_batch_entry, per_input_arguments))
+    if (
+        batch_program_arguments.dockerfile_layout == DockerfileLayout.LAYERED
+        and batch_program_arguments.containerization_type == ContainerizationTypes.SINGLE
+    ):
+        _relayer_container_files(per_input_arguments, results, str(batch_program_arguments.output_dir))
+    summary = BatchSummary(results=results, elapsed_seconds=time.perf_counter() - start_time)
+
+    summary_path = os.path.join(str(batch_program_arguments.output_dir), BATCH_SUMMARY_FILE_NAME)
+    with open(summary_path, "w") as summary_file:
+        summary_file.write(summary.model_dump_json(indent=2))
+    print(
+        f"Batch complete: {len(summary.get_successes())} succeeded, {len(summary.get_failures())} failed; "
+        f"summary located at '{summary_path}'"
+    )
+    return summary
+
+
+def collect_batch_inputs(batch_source: str) -> list[str]:
+    if os.path.isdir(batch_source):
+        candidates = [os.path.join(batch_source, entry) for entry in sorted(os.listdir(batch_source))]
+        return [os.path.abspath(path) for path in candidates if _is_supported_input(path)]
+    if any(glob_character in batch_source for glob_character in "*?["):
+        candidates = sorted(glob.glob(os.path.expanduser(batch_source), recursive=True))
+        return [os.path.abspath(path) for path in candidates if _is_supported_input(path)]
+    if os.path.isfile(batch_source):
+        return _read_batch_manifest(batch_source)
+    err_msg = f"Batch source must be a directory, glob pattern, or manifest file: {batch_source}"
+    raise ValueError(err_msg)
+
+
+def _read_batch_manifest(manifest_path: str) -> list[str]:
+    # One input per line; blank lines and `#` comments are ignored, and relative paths are relative to the manifest.
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+    input_file_paths: list[str] = []
+    with open(manifest_path) as manifest_file:
+        for line in manifest_file:
+            entry = line.strip()
+            if entry == "" or entry.startswith("#"):
+                continue
+            input_file_paths.append(os.path.abspath(os.path.join(manifest_dir, os.path.expanduser(entry))))
+    return input_file_paths
+
+
+def _is_supported_input(path: str) -> bool:
+    return os.path.isfile(path) and path.endswith(SUPPORTED_INPUT_SUFFIXES)
+
+
+def _determine_output_dirs(input_file_paths: list[str], batch_output_dir: str) -> list[str]:
+    # Each input gets its own output directory, so that per-input outputs (Dockerfile, rewritten PBIF, ...) never clash
+    output_dirs: list[str] = []
+    used_names: set[str] = set()
+    for input_file_path in input_file_paths:
+        base_name = os.path.basename(input_file_path).split(".")[0]
+        candidate_name = base_name
+        duplicate_count = 1
+        while candidate_name in used_names:
+            candidate_name = f"{base_name}_{duplicate_count}"
+            duplicate_count += 1
+        used_names.add(candidate_name)
+        output_dirs.append(os.path.join(batch_output_dir, candidate_name))
+    return output_dirs
+
+
+def _relayer_container_files(
+    per_input_arguments: list[ProgramArguments], results: list[BatchInputResult], batch_output_dir: str
+) -> None:
+    # Every input was layered on its own; now that the whole batch is known, the dependencies most shared across it
+    # are moved to the front, so that the images share as many layers as possible
+    succeeded_inputs = [
+        (program_arguments, result)
+        for program_arguments, result in zip(per_input_arguments, results)
+        if result.succeeded
+    ]
+    all_experiment_deps = [result.get_primary_dependencies() for _, result in succeeded_inputs]
+    if len(all_experiment_deps) == 0:
+        return
+    dependency_frequencies = compute_dependency_frequencies(all_experiment_deps)
+    layered_dockerfiles: list[str] = []
+    for program_arguments, result in succeeded_inputs:
+        docker_template = fill_dockerfile_template(
+            result.get_primary_dependencies(), DockerfileLayout.LAYERED, dependency_frequencies
+        )
+        write_container_files(program_arguments, docker_template)
+        layered_dockerfiles.append(docker_template.representation)
+    report = LayerReuseReport(
+        experiment_count=len(all_experiment_deps),
+        monolithic=estimate_layer_reuse([
+            fill_dockerfile_template(experiment_deps).representation for experiment_deps in all_experiment_deps
+        ]),
+        layered=estimate_layer_reuse(layered_dockerfiles),
+        dependency_frequencies=dependency_frequencies,
+    )
+    report_path = os.path.join(batch_output_dir, LAYER_REUSE_REPORT_FILE_NAME)
+    with open(report_path, "w") as report_file:
+        report_file.write(report.model_dump_json(indent=2))
+    print(
+        f"Estimated dependency install reuse: {report.layered.dependency_reuse_ratio:.0%} layered vs "
+        f"{report.monolithic.dependency_reuse_ratio:.0%} monolithic; report located at '{report_path}'"
+    )
+
+
+def _initialize_batch_worker(discovery_mode: RegistryDiscoveryMode) -> None:
+    prepare_local_registry(discovery_mode)  # paid once per worker; subsequent calls within the worker are no-ops
+
+
+def _execute_batch_entry(program_arguments: ProgramArguments) -> BatchInputResult:
+    start_time = time.perf_counter()
+    output_dir = str(program_arguments.output_dir)
+    try:
+        if not _is_supported_input(program_arguments.input_file_path):
+            err_msg = f"`{program_arguments.input_file_path}` is not a JSON/PBIF file, or ZIP/OMEX that exists!"
+            raise ValueError(err_msg)  # noqa: TRY301
+        os.makedirs(output_dir, exist_ok=True)
+        _, primary_dependencies = execute_bsedic(program_arguments)
+    except Exception as e:
+        return BatchInputResult(
+            input_file_path=program_arguments.input_file_path,
+            output_dir=output_dir,
+            succeeded=False,
+            elapsed_seconds=time.perf_counter() - start_time,
+            error=f"{type(e).__name__}: {e}",
+        )
+    return BatchInputResult(
+        input_file_path=program_arguments.input_file_path,
+        output_dir=output_dir,
+        succeeded=True,
+        elapsed_seconds=time.perf_counter() - start_time,
+        primary_dependencies=primary_dependencies.get_compact_repr(),
+        pypi_dependencies=primary_dependencies.get_pypi_dependencies(),
+        conda_dependencies=primary_dependencies.get_conda_dependencies(),
+    )
@@ -0,0 +1,131 @@
+# This file contains a long-running, local compile server. It keeps the local registry, imports, and templates warm,
+# so repeated compiles skip interpreter startup and registry scanning. It serves HTTP on a Unix domain socket that only
+# the user running it can connect to, since it trusts the file paths it is given exactly as the CLI would.
+import contextlib
+import errno
+import json
+import os
+import socketserver
+import stat
+import threading
+from http.server import BaseHTTPRequestHandler
+from typing import Any, Optional
+
+from bsedic.daemon_client import (
+    COMPILE_ENDPOINT,
+    HEALTH_ENDPOINT,
+    get_default_daemon_socket_path,
+    is_bsedic_daemon_running,
+    program_arguments_from_json,
+)
+from bsedic.execution import execute_bsedic
+from bsedic.pbif.containerization.template_registry import get_dockerfile_template
+from bsedic.pbif.local_registry import prepare_local_registry
+from bsedic.utils.input_types import RegistryDiscoveryMode
+
+
+class BsedicDaemonRequestHandler(BaseHTTPRequestHandler):
+    server_version = "BSedicDaemon"
+
+    def do_GET(self) -> None:
+        if self.path != HEALTH_ENDPOINT:
+            self._send_json(404, {"error": f"unknown endpoint `{self.path}`", "error_type": "LookupError"})
+            return
+        self._send_json(200, {"status": "ok"})
+
+    def do_POST(self) -> None:
+        if self.path != COMPILE_ENDPOINT:
+            self._send_json(404, {"error": f"unknown endpoint `{self.path}`", "error_type": "LookupError"})
+            return
+        try:
+            request_body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            program_arguments = program_arguments_from_json(request_body)
+            returned_template, primary_dependencies = execute_bsedic(program_arguments)
+        except Exception as e:
+            self._send_json(400, {"error": str(e), "error_type": type(e).__name__})
+            return
+        self._send_json(
+            200,
+            {
+                "representation": returned_template.representation,
+                "pypi_dependencies": primary_dependencies.get_pypi_dependencies(),
+                "conda_dependencies": primary_dependencies.get_conda_dependencies(),
+            },
+        )
+
+    def address_string(self) -> str:
+        return "local"  # Unix domain socket clients have no address
+
+    def _send_json(self, status: int, body: dict[str, Any]) -> None:
+        encoded_body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded_body)))
+        self.end_headers()
+        self.wfile.write(encoded_body)
+
+
+class BsedicDaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self) -> None:
+        socket_path = str(self.server_address)
+        os.makedirs(os.path.dirname(socket_path), mode=0o700, exist_ok=True)
+        _remove_stale_socket(socket_path)
+        super().server_bind()
+        # Nothing can connect before `server_activate` starts listening, so the socket is never reachable by others
+        os.chmod(socket_path, 0o600)
+
+    def server_close(self) -> None:
+        super().server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(str(self.server_address))
+
+
+def create_bsedic_daemon(
+    socket_path: Optional[str] = None, discovery_mode: RegistryDiscoveryMode = RegistryDiscoveryMode.IMPORT
+) -> BsedicDaemonServer:
+    # Warm everything that every compile would otherwise pay for, before accepting any requests; with static discovery,
+    # that is the implementation catalog, and nothing is imported
+    prepare_local_registry(discovery_mode)
+    get_dockerfile_template()
+    return BsedicDaemonServer(
+        get_default_daemon_socket_path() if socket_path is None else socket_path, BsedicDaemonRequestHandler
+    )
+
+
+def serve_bsedic_daemon(
+    socket_path: Optional[str] = None, discovery_mode: RegistryDiscoveryMode = RegistryDiscoveryMode.IMPORT
+) -> None:
+    server = create_bsedic_daemon(socket_path, discovery_mode)
+    print(f"BSedic daemon listening on {server.server_address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def start_bsedic_daemon_in_background(
+    socket_path: Optional[str] = None, discovery_mode: RegistryDiscoveryMode = RegistryDiscoveryMode.IMPORT
+) -> BsedicDaemonServer:
+    # Mostly useful for tests and embedding
+    server = create_bsedic_daemon(socket_path, discovery_mode)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    # A socket left behind by a daemon that did not shut down cleanly is replaced; one a daemon still listens on is not
+    try:
+        socket_mode = os.lstat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(socket_mode):
+        err_msg = f"`{socket_path}` exists and is not a socket"
+        raise FileExistsError(err_msg)
+    if is_bsedic_daemon_running(socket_path):
+        err_msg = f"A BSedic daemon is already listening on `{socket_path}`"
+        raise OSError(errno.EADDRINUSE, err_msg)
+    os.remove(socket_path)
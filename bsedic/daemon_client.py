@@ -0,0 +1,150 @@
+# This file contains the thin client used to forward compile requests to a running BSedic daemon (see `bsedic.daemon`).
+# It deliberately depends only on the standard library and `bsedic.utils.input_types` until a result arrives, so
+# forwarding (or finding that no daemon is running) stays cheap.
+import builtins
+import json
+import os
+from dataclasses import asdict
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Optional
+
+from bsedic.utils.input_types import (
+    ArchiveExtractionMode,
+    ContainerizationEngine,
+    ContainerizationTypes,
+    DependencyScanMode,
+    DockerfileLayout,
+    ProgramArguments,
+    RegistryDiscoveryMode,
+)
+
+if TYPE_CHECKING:
+    import http.client
+
+    from bsedic.utils.result_types import ContainerizationFileRepr, ExperimentPrimaryDependencies
+
+DAEMON_SOCKET_ENVIRONMENT_VARIABLE = "BSEDIC_DAEMON_SOCKET"
+DAEMON_SOCKET_FILE_NAME = "daemon.sock"
+COMPILE_ENDPOINT = "/compile"
+HEALTH_ENDPOINT = "/health"
+_CONNECT_TIMEOUT_SECONDS = 0.5
+_MAX_SOCKET_PATH_BYTES = 103  # the size of `sun_path` on macOS (108 on Linux), less the terminating null byte
+# Enum-valued `ProgramArguments` fields, which are serialized by member name
+_ENUM_ARGUMENT_TYPES: dict[str, type[Enum]] = {
+    "containerization_type": ContainerizationTypes,
+    "containerization_engine": ContainerizationEngine,
+    "archive_extraction_mode": ArchiveExtractionMode,
+    "dependency_scan_mode": DependencyScanMode,
+    "dockerfile_layout": DockerfileLayout,
+    "registry_discovery_mode": RegistryDiscoveryMode,
+}
+
+
+def get_default_daemon_socket_path() -> str:
+    socket_path = os.environ.get(DAEMON_SOCKET_ENVIRONMENT_VARIABLE)
+    if socket_path is not None:
+        return parse_daemon_socket_path(socket_path)
+    runtime_dir = (
+        os.environ.get("XDG_RUNTIME_DIR")
+        or os.environ.get("XDG_CACHE_HOME")
+        or os.path.join(os.path.expanduser("~"), ".cache")
+    )
+    return os.path.join(runtime_dir, "bsedic", DAEMON_SOCKET_FILE_NAME)
+
+
+def parse_daemon_socket_path(socket_path: str) -> str:
+    if socket_path.strip() == "":
+        err_msg = "Invalid daemon socket path ``; expected the path of a Unix domain socket"
+        raise ValueError(err_msg)
+    socket_path = os.path.abspath(os.path.expanduser(socket_path))
+    if len(os.fsencode(socket_path)) > _MAX_SOCKET_PATH_BYTES:
+        err_msg = (
+            f"Invalid daemon socket path `{socket_path}`; Unix domain socket paths are limited to "
+            f"{_MAX_SOCKET_PATH_BYTES} bytes"
+        )
+        raise ValueError(err_msg)
+    return socket_path
+
+
+def program_arguments_to_json(program_arguments: ProgramArguments) -> str:
+    serialized_arguments: dict[str, Any] = asdict(program_arguments)
+    for argument_name in _ENUM_ARGUMENT_TYPES:
+        serialized_arguments[argument_name] = getattr(program_arguments, argument_name).name
+    return json.dumps(serialized_arguments)
+
+
+def program_arguments_from_json(representation: str | bytes) -> ProgramArguments:
+    serialized_arguments: dict[str, Any] = json.loads(representation)
+    for argument_name, enum_type in _ENUM_ARGUMENT_TYPES.items():
+        if argument_name in serialized_arguments:
+            serialized_arguments[argument_name] = enum_type[serialized_arguments[argument_name]]
+    return ProgramArguments(**serialized_arguments)
+
+
+def forward_to_bsedic_daemon(
+    program_arguments: ProgramArguments, socket_path: Optional[str] = None
+) -> Optional[tuple["ContainerizationFileRepr", "ExperimentPrimaryDependencies"]]:
+    # Returns `None` when no daemon is listening, so the caller can fall back to compiling in-process
+    connection = _connect_to_bsedic_daemon(get_default_daemon_socket_path() if socket_path is None else socket_path)
+    if connection is None:
+        return None
+    try:
+        if connection.sock is not None:
+            connection.sock.settimeout(None)  # compiles may take a while; only connecting is time-boxed
+        connection.request(
+            "POST",
+            COMPILE_ENDPOINT,
+            body=program_arguments_to_json(program_arguments),
+            headers={"Content-Type": "application/json"},
+        )
+        response = connection.getresponse()
+        response_body: dict[str, Any] = json.loads(response.read())
+    finally:
+        connection.close()
+    if response.status != 200:
+        raise _rebuild_daemon_error(response_body)
+    from bsedic.utils.result_types import ContainerizationFileRepr, ExperimentPrimaryDependencies
+
+    return (
+        ContainerizationFileRepr(representation=response_body["representation"]),
+        ExperimentPrimaryDependencies(response_body["pypi_dependencies"], response_body["conda_dependencies"]),
+    )
+
+
+def is_bsedic_daemon_running(socket_path: Optional[str] = None) -> bool:
+    connection = _connect_to_bsedic_daemon(get_default_daemon_socket_path() if socket_path is None else socket_path)
+    if connection is None:
+        return False
+    try:
+        connection.request("GET", HEALTH_ENDPOINT)
+        return connection.getresponse().status == 200
+    except OSError:
+        return False
+    finally:
+        connection.close()
+
+
+def _connect_to_bsedic_daemon(socket_path: str) -> Optional["http.client.HTTPConnection"]:
+    # HTTP over the daemon's Unix domain socket; `None` when nothing is listening on it
+    import http.client  # pulls in the `email` package; only worth paying for when actually forwarding
+    import socket
+
+    daemon_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    daemon_socket.settimeout(_CONNECT_TIMEOUT_SECONDS)
+    try:
+        daemon_socket.connect(socket_path)
+    except OSError:
+        daemon_socket.close()
+        return None
+    connection = http.client.HTTPConnection("localhost", timeout=_CONNECT_TIMEOUT_SECONDS)
+    connection.sock = daemon_socket  # used as is, instead of connecting over TCP
+    return connection
+
+
+def _rebuild_daemon_error(response_body: dict[str, Any]) -> Exception:
+    # Re-raise builtin exception types as themselves, so callers see the same errors as an in-process compile
+    error_type = getattr(builtins, str(response_body.get("error_type")), None)
+    error_message = str(response_body.get("error", "unknown daemon error"))
+    if isinstance(error_type, type) and issubclass(error_type, Exception):
+        return error_type(error_message)
+    return RuntimeError(f"{response_body.get('error_type')}: {error_message}")
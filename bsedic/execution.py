@@ -1,91 +1,483 @@
 import os
 import shutil
-
-from spython.main.parse.parsers import DockerParser  # type: ignore[import-untyped]
-from spython.main.parse.writers import SingularityWriter  # type: ignore[import-untyped]
+import zipfile
+from dataclasses import replace
 
 from bsedic.pbif.containerization.container_constructor import (
-    formulate_dockerfile_for_necessary_env,
+    determine_dependencies_for_documents,
+    determine_dependencies_for_files,
+    fill_dockerfile_template,
+    formulate_dockerfile_for_documents,
+)
+from bsedic.pbif.containerization.environment_partitioning import (
+    COORDINATION_MANIFEST_FILE_NAME,
+    ProcessDependency,
+    collect_process_dependencies,
+    merge_process_dependencies,
+    partition_environments,
+)
+from bsedic.pbif.containerization.offline_context import (
+    OFFLINE_SNAPSHOT_FILE_NAME,
+    assemble_offline_build_context,
+    write_offline_package_index_snapshot,
+)
+from bsedic.pbif.containerization.singularity_definition import (
+    UnsupportedDockerInstructionError,
+    convert_dockerfile_to_singularity_definition,
+)
+from bsedic.pbif.containerization.template_registry import get_dockerfile_template
+from bsedic.pbif.dependency_resolution.resolver import get_package_index_snapshot_digest, resolve_dependencies
+from bsedic.pbif.dependency_resolution.streaming_scan import DEFAULT_CHUNK_SIZE, iter_document_segments
+from bsedic.pbif.dependency_resolution.whitelist import CompiledPasslist, resolve_passlist
+from bsedic.pbif.local_registry import prepare_local_registry
+from bsedic.utils.experiment_archive import (
+    extract_archive_members,
+    extract_archive_returning_pbif_paths,
+    get_archive_member_path,
+    get_extraction_destination,
+    locate_pbif_members,
+    read_pbifs_from_archive,
+    reconstitute_archive,
 )
-from bsedic.pbif.local_registry import load_local_modules
-from bsedic.utils.experiment_archive import extract_archive_returning_pbif_path
 from bsedic.utils.input_types import (
+    ArchiveExtractionMode,
     ContainerizationEngine,
-    ContainerizationFileRepr,
     ContainerizationTypes,
-    ExperimentPrimaryDependencies,
+    DependencyScanMode,
     ProgramArguments,
 )
+from bsedic.utils.result_cache import (
+    DEFAULT_RESULT_CACHE_MAX_BYTES,
+    CachedResult,
+    ResultCache,
+    compute_result_cache_key,
+    get_result_cache,
+)
+from bsedic.utils.result_types import ContainerizationFileRepr, CoordinationManifest, ExperimentPrimaryDependencies
 
 
 def execute_bsedic(
     original_program_arguments: ProgramArguments,
 ) -> tuple[ContainerizationFileRepr, ExperimentPrimaryDependencies]:
-    new_input_file_path: str
     input_is_archive = original_program_arguments.input_file_path.endswith(
         ".zip"
     ) or original_program_arguments.input_file_path.endswith(".omex")
-    required_program_arguments: ProgramArguments
-    if input_is_archive:
-        new_input_file_path = extract_archive_returning_pbif_path(
-            original_program_arguments.input_file_path, str(original_program_arguments.output_dir)
-        )
-    else:
-        new_input_file_path = os.path.join(
-            str(original_program_arguments.output_dir), os.path.basename(original_program_arguments.input_file_path)
+    if original_program_arguments.offline_artifacts_dir is not None:
+        original_program_arguments = _prepare_offline_arguments(original_program_arguments)
+    if original_program_arguments.dependency_scan_mode == DependencyScanMode.STREAMING:
+        return _execute_bsedic_streaming(original_program_arguments, input_is_archive)
+    pb_document_paths: list[str]
+    pb_document_strs: list[str]
+    pbif_member_names: list[str] | None  # only set when the archive is read selectively
+    pb_document_paths, pb_document_strs, pbif_member_names = _prepare_pb_documents(
+        original_program_arguments, input_is_archive
+    )
+    required_program_arguments: ProgramArguments = replace(
+        original_program_arguments, input_file_path=pb_document_paths[-1]
+    )
+    if required_program_arguments.containerization_type == ContainerizationTypes.MULTIPLE:
+        return _execute_bsedic_multiple(
+            original_program_arguments,
+            required_program_arguments,
+            input_is_archive,
+            pb_document_paths,
+            pb_document_strs,
+            pbif_member_names,
         )
-        print(f"file copied to `{shutil.copy(original_program_arguments.input_file_path, new_input_file_path)}`")
-    required_program_arguments = ProgramArguments(
-        new_input_file_path,
-        original_program_arguments.output_dir,
-        original_program_arguments.passlist_entries,
-        original_program_arguments.containerization_type,
-        original_program_arguments.containerization_engine,
+
+    passlist = resolve_passlist(
+        required_program_arguments.passlist_entries, required_program_arguments.compiled_passlist_path
     )
+    # Check for a previously computed result
+    result_cache: ResultCache | None = None
+    cache_key: str | None = None
+    if (
+        required_program_arguments.result_cache_dir is not None
+        and required_program_arguments.offline_artifacts_dir is not None
+    ):
+        print("Result cache is not used for offline build contexts")
+    elif required_program_arguments.result_cache_dir is not None:
+        result_cache = get_result_cache(
+            required_program_arguments.result_cache_dir,
+            required_program_arguments.result_cache_max_bytes or DEFAULT_RESULT_CACHE_MAX_BYTES,
+        )
+        cache_key = _compute_cache_key_for_arguments(required_program_arguments, pb_document_strs, passlist)
+        cached_result = result_cache.get(cache_key)
+        if cached_result is not None:
+            print(f"Result cache hit ({result_cache.hits} hits, {result_cache.misses} misses)")
+            _write_updated_documents(pb_document_paths, pb_document_strs, cached_result.updated_documents)
+            _write_cached_result(required_program_arguments, cached_result)
+            if input_is_archive:
+                _reconstitute_archive(
+                    original_program_arguments, pbif_member_names, pb_document_strs, cached_result.updated_documents
+                )
+            return cached_result.get_returned_template(), cached_result.get_primary_dependencies()
 
-    load_local_modules()  # Collect Abstracts
+    prepare_local_registry(required_program_arguments.registry_discovery_mode)  # Collect Abstracts
     # TODO: Add feature - resolve abstracts
 
     # Determine Dependencies
     docker_template: ContainerizationFileRepr
     returned_template: ContainerizationFileRepr
+    singularity_definition: str | None
     primary_dependencies: ExperimentPrimaryDependencies
-    docker_template, primary_dependencies = formulate_dockerfile_for_necessary_env(required_program_arguments)
-    returned_template = docker_template
-    if required_program_arguments.containerization_type != ContainerizationTypes.NONE:
-        if required_program_arguments.containerization_type != ContainerizationTypes.SINGLE:
-            raise NotImplementedError("Only single containerization is currently supported")
-        container_file_path: str
-        container_file_path = os.path.join(str(original_program_arguments.output_dir), "Dockerfile")
-        with open(container_file_path, "w") as docker_file:
-            docker_file.write(docker_template.representation)
-        if (
-            required_program_arguments.containerization_engine == ContainerizationEngine.APPTAINER
-            or required_program_arguments.containerization_engine == ContainerizationEngine.BOTH
-        ):
-            dockerfile_path = container_file_path
-            container_file_path = os.path.join(str(original_program_arguments.output_dir), "singularity.def")
-            dockerfile_parser = DockerParser(dockerfile_path)
-            singularity_writer = SingularityWriter(dockerfile_parser.recipe)
-            results = singularity_writer.convert()
-            returned_template = ContainerizationFileRepr(representation=results)
-            with open(container_file_path, "w") as container_file:
-                container_file.write(results)
-            if required_program_arguments.containerization_engine != ContainerizationEngine.BOTH:
-                os.remove(dockerfile_path)
-        print(f"Container build file located at '{container_file_path}'")
+    updated_document_strs: list[str]
+    docker_template, primary_dependencies, updated_document_strs = formulate_dockerfile_for_documents(
+        pb_document_strs,
+        passlist,
+        scan_mode=required_program_arguments.dependency_scan_mode,
+        package_index_snapshot_path=required_program_arguments.package_index_snapshot_path,
+        dockerfile_layout=required_program_arguments.dockerfile_layout,
+        dockerfile_template=required_program_arguments.dockerfile_template,
+        offline=required_program_arguments.offline_artifacts_dir is not None,
+    )
+    _write_updated_documents(pb_document_paths, pb_document_strs, updated_document_strs)
+    returned_template, singularity_definition = write_container_files(required_program_arguments, docker_template)
+    _assemble_offline_build_context(required_program_arguments, primary_dependencies)
+
+    if result_cache is not None and cache_key is not None:
+        result_cache.put(
+            cache_key,
+            CachedResult(
+                updated_documents=updated_document_strs,
+                dockerfile=docker_template.representation,
+                singularity_definition=singularity_definition,
+                pypi_dependencies=primary_dependencies.get_pypi_dependencies(),
+                conda_dependencies=primary_dependencies.get_conda_dependencies(),
+            ),
+        )
+        print(f"Result cache miss ({result_cache.hits} hits, {result_cache.misses} misses)")
 
     # Reconstitute if archive
     if input_is_archive:
-        base_name = os.path.basename(original_program_arguments.input_file_path)
-        output_dir: str = (
-            os.path.dirname(original_program_arguments.input_file_path)
-            if original_program_arguments.output_dir is None
-            else str(original_program_arguments.output_dir)
+        _reconstitute_archive(original_program_arguments, pbif_member_names, pb_document_strs, updated_document_strs)
+    return returned_template, primary_dependencies
+
+
+def _execute_bsedic_multiple(
+    original_program_arguments: ProgramArguments,
+    required_program_arguments: ProgramArguments,
+    input_is_archive: bool,
+    pb_document_paths: list[str],
+    pb_document_strs: list[str],
+    pbif_member_names: list[str] | None,
+) -> tuple[ContainerizationFileRepr, ExperimentPrimaryDependencies]:
+    # One environment per partition of the conflict graph; the result cache only holds single environments
+    if required_program_arguments.result_cache_dir is not None:
+        print("Result cache is not used for multiple containerization")
+
+    prepare_local_registry(required_program_arguments.registry_discovery_mode)  # Collect Abstracts
+
+    primary_dependencies, updated_document_strs = determine_dependencies_for_documents(
+        pb_document_strs,
+        resolve_passlist(
+            required_program_arguments.passlist_entries, required_program_arguments.compiled_passlist_path
+        ),
+        scan_mode=required_program_arguments.dependency_scan_mode,
+    )
+    process_dependencies = merge_process_dependencies([
+        collect_process_dependencies([pb_document_str], required_program_arguments.dependency_scan_mode)
+        for pb_document_str in pb_document_strs
+    ])
+    coordination_manifest = partition_environments(
+        process_dependencies, required_program_arguments.package_index_snapshot_path
+    )
+    _write_updated_documents(pb_document_paths, pb_document_strs, updated_document_strs)
+    returned_template = _write_environment_files(required_program_arguments, coordination_manifest)
+
+    if input_is_archive:
+        _reconstitute_archive(original_program_arguments, pbif_member_names, pb_document_strs, updated_document_strs)
+    return returned_template, primary_dependencies
+
+
+def _execute_bsedic_streaming(
+    original_program_arguments: ProgramArguments, input_is_archive: bool
+) -> tuple[ContainerizationFileRepr, ExperimentPrimaryDependencies]:
+    # Documents are never held in memory as a whole: they are scanned and rewritten in place on disk. The result cache
+    # stores whole documents, so it is bypassed.
+    if original_program_arguments.result_cache_dir is not None:
+        print("Result cache is not used when scanning in streaming mode")
+    output_dir = str(original_program_arguments.output_dir)
+    pbif_member_names: list[str] | None = None
+    pb_document_paths: list[str]
+    if input_is_archive and original_program_arguments.archive_extraction_mode == ArchiveExtractionMode.SELECTIVE:
+        with zipfile.ZipFile(original_program_arguments.input_file_path) as archive:
+            pbif_member_names = locate_pbif_members(archive)
+        pb_document_paths = extract_archive_members(
+            original_program_arguments.input_file_path, output_dir, pbif_member_names
+        )
+    elif input_is_archive:
+        pb_document_paths = extract_archive_returning_pbif_paths(original_program_arguments.input_file_path, output_dir)
+    else:
+        new_input_file_path = os.path.join(output_dir, os.path.basename(original_program_arguments.input_file_path))
+        print(f"file copied to `{shutil.copy(original_program_arguments.input_file_path, new_input_file_path)}`")
+        pb_document_paths = [new_input_file_path]
+    required_program_arguments: ProgramArguments = replace(
+        original_program_arguments, input_file_path=pb_document_paths[-1]
+    )
+
+    prepare_local_registry(required_program_arguments.registry_discovery_mode)  # Collect Abstracts
+
+    process_dependencies: dict[ProcessDependency, list[str]] | None = None
+    if required_program_arguments.containerization_type == ContainerizationTypes.MULTIPLE:
+        # Collected before the documents are rewritten, which erases their dependencies
+        process_dependencies = merge_process_dependencies([
+            _collect_file_process_dependencies(pb_document_path) for pb_document_path in pb_document_paths
+        ])
+    primary_dependencies, documents_changed = determine_dependencies_for_files(
+        pb_document_paths,
+        resolve_passlist(
+            required_program_arguments.passlist_entries, required_program_arguments.compiled_passlist_path
+        ),
+    )
+    returned_template: ContainerizationFileRepr
+    if process_dependencies is not None:
+        coordination_manifest = partition_environments(
+            process_dependencies, required_program_arguments.package_index_snapshot_path
+        )
+        returned_template = _write_environment_files(required_program_arguments, coordination_manifest)
+    else:
+        primary_dependencies = resolve_dependencies(
+            primary_dependencies, required_program_arguments.package_index_snapshot_path
+        )
+        docker_template = fill_dockerfile_template(
+            primary_dependencies,
+            required_program_arguments.dockerfile_layout,
+            dockerfile_template=required_program_arguments.dockerfile_template,
+            offline=required_program_arguments.offline_artifacts_dir is not None,
+        )
+        returned_template, _ = write_container_files(required_program_arguments, docker_template)
+        _assemble_offline_build_context(required_program_arguments, primary_dependencies)
+
+    if input_is_archive and pbif_member_names is None:
+        _reconstitute_archive(original_program_arguments, None, [], [])
+    elif pbif_member_names is not None:
+        member_override_files = {
+            pbif_member_name: pb_document_path
+            for pbif_member_name, pb_document_path, document_changed in zip(
+                pbif_member_names, pb_document_paths, documents_changed
+            )
+            if document_changed
+        }
+        reconstitute_archive(
+            original_program_arguments.input_file_path,
+            None,
+            _get_reconstituted_archive_path(original_program_arguments),
+            member_override_files=member_override_files,
         )
-        new_archive_path = os.path.join(output_dir, base_name)
-        # Note: If no output dir is provided (dir is `None`), then input file WILL BE OVERWRITTEN
-        target_dir = os.path.join(str(original_program_arguments.output_dir), base_name.split(".")[0])
-        shutil.make_archive(new_archive_path, "zip", target_dir)
-        shutil.move(new_archive_path + ".zip", new_archive_path)  # get rid of extra suffix
     return returned_template, primary_dependencies
+
+
+def _prepare_pb_documents(
+    original_program_arguments: ProgramArguments, input_is_archive: bool
+) -> tuple[list[str], list[str], list[str] | None]:
+    # Returns where each PBIF document lives in the output directory, its current contents, and (for selectively read
+    # archives, whose documents are not on disk yet) its archive member name
+    output_dir = str(original_program_arguments.output_dir)
+    pb_document_paths: list[str]
+    if input_is_archive and original_program_arguments.archive_extraction_mode == ArchiveExtractionMode.SELECTIVE:
+        pbif_documents = read_pbifs_from_archive(original_program_arguments.input_file_path)
+        extraction_destination = get_extraction_destination(original_program_arguments.input_file_path, output_dir)
+        pbif_member_names = [member_name for member_name, _ in pbif_documents]
+        pb_document_paths = [
+            get_archive_member_path(extraction_destination, member_name) for member_name in pbif_member_names
+        ]
+        return pb_document_paths, [pb_document_str for _, pb_document_str in pbif_documents], pbif_member_names
+    if input_is_archive:
+        pb_document_paths = extract_archive_returning_pbif_paths(original_program_arguments.input_file_path, output_dir)
+    else:
+        new_input_file_path = os.path.join(output_dir, os.path.basename(original_program_arguments.input_file_path))
+        print(f"file copied to `{shutil.copy(original_program_arguments.input_file_path, new_input_file_path)}`")
+        pb_document_paths = [new_input_file_path]
+    pb_document_strs: list[str] = []
+    for pb_document_path in pb_document_paths:
+        with open(pb_document_path) as pb_document_file:
+            pb_document_strs.append(pb_document_file.read())
+    return pb_document_paths, pb_document_strs, None
+
+
+def _write_updated_documents(
+    pb_document_paths: list[str], pb_document_strs: list[str], updated_document_strs: list[str]
+) -> None:
+    # A selectively read PBIF is not on disk yet, so it is written even when unchanged
+    for pb_document_path, pb_document_str, updated_document_str in zip(
+        pb_document_paths, pb_document_strs, updated_document_strs
+    ):
+        if updated_document_str == pb_document_str and os.path.exists(pb_document_path):
+            continue
+        os.makedirs(os.path.dirname(pb_document_path), exist_ok=True)
+        with open(pb_document_path, "w") as pb_document_file:
+            pb_document_file.write(updated_document_str)
+
+
+def write_container_files(
+    program_arguments: ProgramArguments, docker_template: ContainerizationFileRepr
+) -> tuple[ContainerizationFileRepr, str | None]:
+    returned_template: ContainerizationFileRepr = docker_template
+    singularity_definition: str | None = None
+    if program_arguments.containerization_type == ContainerizationTypes.NONE:
+        return returned_template, singularity_definition
+    container_file_path: str = os.path.join(str(program_arguments.output_dir), "Dockerfile")
+    if program_arguments.containerization_engine != ContainerizationEngine.APPTAINER:
+        with open(container_file_path, "w") as docker_file:
+            docker_file.write(docker_template.representation)
+    if (
+        program_arguments.containerization_engine == ContainerizationEngine.APPTAINER
+        or program_arguments.containerization_engine == ContainerizationEngine.BOTH
+    ):
+        try:
+            singularity_definition = convert_dockerfile_to_singularity_definition(docker_template.representation)
+        except UnsupportedDockerInstructionError as e:
+            print(f"Falling back to spython for Apptainer conversion: {e}")
+            singularity_definition = _convert_with_spython(program_arguments, docker_template)
+        container_file_path = os.path.join(str(program_arguments.output_dir), "singularity.def")
+        returned_template = ContainerizationFileRepr(representation=singularity_definition)
+        with open(container_file_path, "w") as container_file:
+            container_file.write(singularity_definition)
+    print(f"Container build file located at '{container_file_path}'")
+    return returned_template, singularity_definition
+
+
+def _write_environment_files(
+    program_arguments: ProgramArguments, coordination_manifest: CoordinationManifest
+) -> ContainerizationFileRepr:
+    # Each environment gets its own container files in its build context; the returned representation is the manifest
+    output_dir = str(program_arguments.output_dir)
+    for environment in coordination_manifest.environments:
+        environment_dir = os.path.join(output_dir, *environment.build_context.split("/"))
+        os.makedirs(environment_dir, exist_ok=True)
+        environment_program_arguments = replace(
+            program_arguments, output_dir=environment_dir, containerization_type=ContainerizationTypes.SINGLE
+        )
+        write_container_files(
+            environment_program_arguments,
+            fill_dockerfile_template(
+                environment.get_primary_dependencies(),
+                program_arguments.dockerfile_layout,
+                dockerfile_template=program_arguments.dockerfile_template,
+                offline=program_arguments.offline_artifacts_dir is not None,
+            ),
+        )
+        _assemble_offline_build_context(environment_program_arguments, environment.get_primary_dependencies())
+    coordination_manifest_str = coordination_manifest.model_dump_json(indent=2)
+    coordination_manifest_path = os.path.join(output_dir, COORDINATION_MANIFEST_FILE_NAME)
+    with open(coordination_manifest_path, "w") as coordination_manifest_file:
+        coordination_manifest_file.write(coordination_manifest_str)
+    print(f"Coordination manifest located at '{coordination_manifest_path}'")
+    return ContainerizationFileRepr(representation=coordination_manifest_str)
+
+
+def _prepare_offline_arguments(program_arguments: ProgramArguments) -> ProgramArguments:
+    # Unless another snapshot is given, dependencies are pinned to the versions in the offline artifacts
+    if program_arguments.output_dir is None:
+        err_msg = "Offline build contexts require an output directory"
+        raise ValueError(err_msg)
+    if program_arguments.package_index_snapshot_path is not None:
+        return program_arguments
+    snapshot_path = write_offline_package_index_snapshot(
+        str(program_arguments.offline_artifacts_dir),
+        os.path.join(program_arguments.output_dir, OFFLINE_SNAPSHOT_FILE_NAME),
+    )
+    return replace(program_arguments, package_index_snapshot_path=snapshot_path)
+
+
+def _assemble_offline_build_context(
+    program_arguments: ProgramArguments, primary_dependencies: ExperimentPrimaryDependencies
+) -> None:
+    if program_arguments.offline_artifacts_dir is None:
+        return
+    if program_arguments.containerization_type == ContainerizationTypes.NONE:
+        return
+    assemble_offline_build_context(
+        program_arguments.offline_artifacts_dir, str(program_arguments.output_dir), primary_dependencies
+    )
+    print(f"Offline build context verified at '{program_arguments.output_dir}'")
+
+
+def _collect_file_process_dependencies(pb_document_path: str) -> dict[ProcessDependency, list[str]]:
+    with open(pb_document_path) as pb_document_file:
+        return collect_process_dependencies(iter_document_segments(pb_document_file, DEFAULT_CHUNK_SIZE))
+
+
+def _convert_with_spython(program_arguments: ProgramArguments, docker_template: ContainerizationFileRepr) -> str:
+    # spython only reads recipes from disk, and is only needed for Dockerfiles the native converter does not support
+    from spython.main.parse.parsers import DockerParser  # type: ignore[import-untyped]
+    from spython.main.parse.writers import SingularityWriter  # type: ignore[import-untyped]
+
+    dockerfile_path = os.path.join(str(program_arguments.output_dir), "Dockerfile")
+    with open(dockerfile_path, "w") as docker_file:
+        docker_file.write(docker_template.representation)
+    dockerfile_parser = DockerParser(dockerfile_path)
+    singularity_writer = SingularityWriter(dockerfile_parser.recipe)
+    results: str = singularity_writer.convert()
+    if program_arguments.containerization_engine != ContainerizationEngine.BOTH:
+        os.remove(dockerfile_path)
+    return results
+
+
+def _compute_cache_key_for_arguments(
+    program_arguments: ProgramArguments, pb_document_strs: list[str], passlist: CompiledPasslist | None
+) -> str:
+    return compute_result_cache_key(
+        pb_document_strs,
+        None if passlist is None else passlist.entries,
+        get_dockerfile_template(program_arguments.dockerfile_template).source,
+        program_arguments.containerization_type,
+        program_arguments.containerization_engine,
+        program_arguments.dependency_scan_mode,
+        None
+        if program_arguments.package_index_snapshot_path is None
+        else get_package_index_snapshot_digest(program_arguments.package_index_snapshot_path),
+        program_arguments.dockerfile_layout,
+    )
+
+
+def _write_cached_result(program_arguments: ProgramArguments, cached_result: CachedResult) -> None:
+    # Produces the same container files a full compilation would have, without recomputing any of them
+    if program_arguments.containerization_type == ContainerizationTypes.NONE:
+        return
+    output_dir = str(program_arguments.output_dir)
+    container_file_path = os.path.join(output_dir, "Dockerfile")
+    if program_arguments.containerization_engine != ContainerizationEngine.APPTAINER:
+        with open(container_file_path, "w") as docker_file:
+            docker_file.write(cached_result.dockerfile)
+    if cached_result.singularity_definition is not None:
+        container_file_path = os.path.join(output_dir, "singularity.def")
+        with open(container_file_path, "w") as container_file:
+            container_file.write(cached_result.singularity_definition)
+    print(f"Container build file located at '{container_file_path}'")
+
+
+def _reconstitute_archive(
+    original_program_arguments: ProgramArguments,
+    pbif_member_names: list[str] | None,
+    pb_document_strs: list[str],
+    updated_document_strs: list[str],
+) -> None:
+    new_archive_path = _get_reconstituted_archive_path(original_program_arguments)
+    if pbif_member_names is None:
+        target_dir = get_extraction_destination(
+            original_program_arguments.input_file_path, str(original_program_arguments.output_dir)
+        )
+        reconstitute_archive(original_program_arguments.input_file_path, target_dir, new_archive_path)
+        return
+    # Selectively read archives were never extracted; only the PBIFs that changed differ from the original archive
+    member_overrides: dict[str, bytes] = {
+        pbif_member_name: updated_document_str.encode("utf-8")
+        for pbif_member_name, pb_document_str, updated_document_str in zip(
+            pbif_member_names, pb_document_strs, updated_document_strs
+        )
+        if updated_document_str != pb_document_str
+    }
+    reconstitute_archive(original_program_arguments.input_file_path, None, new_archive_path, member_overrides)
+
+
+def _get_reconstituted_archive_path(original_program_arguments: ProgramArguments) -> str:
+    base_name = os.path.basename(original_program_arguments.input_file_path)
+    output_dir: str = (
+        os.path.dirname(original_program_arguments.input_file_path)
+        if original_program_arguments.output_dir is None
+        else str(original_program_arguments.output_dir)
+    )
+    # Note: If no output dir is provided (dir is `None`), then input file WILL BE OVERWRITTEN
+    return os.path.join(output_dir, base_name)
@@ -1,136 +1,257 @@
-import re
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from typing import Optional
 
-from bsedic.pbif.containerization.container_file import (
-    get_generic_dockerfile_template,
-    pull_substitution_keys_from_document,
+from bsedic.pbif.containerization.container_file import quote_dependencies
+from bsedic.pbif.containerization.layered_dockerfile import fill_layered_dockerfile_template
+from bsedic.pbif.containerization.template_registry import OFFLINE_DOCKERFILE_TEMPLATE_NAME, get_dockerfile_template
+from bsedic.pbif.dependency_resolution.addresses import (
+    DEPENDENCY_ADDRESS_PATTERN,
+    LOCAL_ADDRESS_PATTERN,
+    DependencyAddressRewriter,
+    NoDependenciesFoundError,
 )
-from bsedic.utils.input_types import (
-    ContainerizationFileRepr,
-    ExperimentPrimaryDependencies,
-    ProgramArguments,
+from bsedic.pbif.dependency_resolution.resolver import resolve_dependencies
+from bsedic.pbif.dependency_resolution.streaming_scan import determine_dependencies_streaming
+from bsedic.pbif.dependency_resolution.structured_scan import determine_dependencies_structured
+from bsedic.pbif.dependency_resolution.whitelist import (
+    CompiledPasslist,
+    Passlist,
+    as_compiled_passlist,
+    resolve_passlist,
 )
+from bsedic.utils.input_types import DependencyScanMode, DockerfileLayout, ProgramArguments
+from bsedic.utils.process_pool import get_process_pool_context, get_process_pool_worker_count
+from bsedic.utils.result_types import ContainerizationFileRepr, ExperimentPrimaryDependencies
 
 
 def formulate_dockerfile_for_necessary_env(
     program_arguments: ProgramArguments,
 ) -> tuple[ContainerizationFileRepr, ExperimentPrimaryDependencies]:
-    docker_template: str = get_generic_dockerfile_template()
+    passlist = resolve_passlist(program_arguments.passlist_entries, program_arguments.compiled_passlist_path)
+    if program_arguments.dependency_scan_mode == DependencyScanMode.STREAMING:
+        experiment_deps, _ = determine_dependencies_streaming(program_arguments.input_file_path, passlist)
+        experiment_deps = resolve_dependencies(experiment_deps, program_arguments.package_index_snapshot_path)
+        docker_template = fill_dockerfile_template(
+            experiment_deps,
+            program_arguments.dockerfile_layout,
+            dockerfile_template=program_arguments.dockerfile_template,
+            offline=program_arguments.offline_artifacts_dir is not None,
+        )
+        return docker_template, experiment_deps
     pb_document_str: str
     with open(program_arguments.input_file_path) as pb_document_file:
         pb_document_str = pb_document_file.read()
-    experiment_deps, updated_document_str = determine_dependencies(pb_document_str, program_arguments.passlist_entries)
+    docker_template, experiment_deps, updated_document_str = formulate_dockerfile_for_document(
+        pb_document_str,
+        passlist,
+        program_arguments.dependency_scan_mode,
+        program_arguments.package_index_snapshot_path,
+        program_arguments.dockerfile_layout,
+        program_arguments.dockerfile_template,
+        program_arguments.offline_artifacts_dir is not None,
+    )
     if updated_document_str != pb_document_str:  # we need to update file
         with open(program_arguments.input_file_path, "w") as pb_document_file:
             pb_document_file.write(updated_document_str)
-    for desired_field in generate_necessary_values():
-        match_target: str = "$${#" + desired_field + "}"
-        if desired_field == "PYPI_DEPENDENCIES":
-            if len(experiment_deps.get_pypi_dependencies()) == 0:
-                docker_template = docker_template.replace(match_target, "# No PyPI dependencies!")
-                continue
-            pypi_section = """
-RUN python3 -m pip install $${#DEPENDENCIES}
-""".strip()
-            dependency_str = convert_dependencies_to_installation_string_representation(
-                experiment_deps.get_pypi_dependencies()
-            )
-            filled_section = pypi_section.replace("$${#DEPENDENCIES}", dependency_str)
-            docker_template = docker_template.replace(match_target, filled_section)
-        elif desired_field == "CONDA_FORGE_DEPENDENCIES":
-            if len(experiment_deps.get_conda_dependencies()) == 0:
-                docker_template = docker_template.replace(match_target, "# No conda dependencies!")
-                continue
-            conda_section = """
-RUN mkdir /micromamba
-RUN curl -Ls https://micro.mamba.pm/api/micromamba/linux-64/latest | tar -xvj bin/micromamba
-RUN mv bin/micromamba /usr/local/bin/
-RUN micromamba create -y -p /opt/conda -c conda-forge $${#DEPENDENCIES} python=3.12
-ENV PATH=/opt/conda/bin:$PATH
-""".strip()
-            dependency_str = " ".join(experiment_deps.get_conda_dependencies())
-            filled_section = conda_section.replace("$${#DEPENDENCIES}", dependency_str)
-            docker_template = docker_template.replace(match_target, filled_section)
-        else:
-            err_msg = f"unknown field in template dockerfile: {desired_field}"
-            raise ValueError(err_msg)
+    return docker_template, experiment_deps
+
+
+def formulate_dockerfile_for_document(
+    pb_document_str: str,
+    passlist: Optional[Passlist] = None,
+    scan_mode: DependencyScanMode = DependencyScanMode.TEXT,
+    package_index_snapshot_path: Optional[str] = None,
+    dockerfile_layout: DockerfileLayout = DockerfileLayout.MONOLITHIC,
+    dockerfile_template: Optional[str] = None,
+    offline: bool = False,
+) -> tuple[ContainerizationFileRepr, ExperimentPrimaryDependencies, str]:
+    # Same as `formulate_dockerfile_for_necessary_env`, but for a document already in memory (e.g. read straight out of
+    # an archive); the updated document is returned rather than written back.
+    experiment_deps, updated_document_str = scan_dependencies(pb_document_str, passlist, scan_mode)
+    experiment_deps = resolve_dependencies(experiment_deps, package_index_snapshot_path)
+    docker_template = fill_dockerfile_template(
+        experiment_deps, dockerfile_layout, dockerfile_template=dockerfile_template, offline=offline
+    )
+    return docker_template, experiment_deps, updated_document_str
 
-    return ContainerizationFileRepr(representation=docker_template), experiment_deps
+
+def formulate_dockerfile_for_documents(
+    pb_document_strs: list[str],
+    passlist: Optional[Passlist] = None,
+    max_workers: Optional[int] = None,
+    scan_mode: DependencyScanMode = DependencyScanMode.TEXT,
+    package_index_snapshot_path: Optional[str] = None,
+    dockerfile_layout: DockerfileLayout = DockerfileLayout.MONOLITHIC,
+    dockerfile_template: Optional[str] = None,
+    offline: bool = False,
+) -> tuple[ContainerizationFileRepr, ExperimentPrimaryDependencies, list[str]]:
+    # One environment for every document of a multi-PBIF archive
+    experiment_deps, updated_document_strs = determine_dependencies_for_documents(
+        pb_document_strs, passlist, max_workers, scan_mode
+    )
+    experiment_deps = resolve_dependencies(experiment_deps, package_index_snapshot_path)
+    docker_template = fill_dockerfile_template(
+        experiment_deps, dockerfile_layout, dockerfile_template=dockerfile_template, offline=offline
+    )
+    return docker_template, experiment_deps, updated_document_strs
+
+
+def fill_dockerfile_template(
+    experiment_deps: ExperimentPrimaryDependencies,
+    dockerfile_layout: DockerfileLayout = DockerfileLayout.MONOLITHIC,
+    dependency_frequencies: Optional[Mapping[str, float]] = None,
+    dockerfile_template: Optional[str] = None,
+    offline: bool = False,
+) -> ContainerizationFileRepr:
+    # `dependency_frequencies` (how widely each dependency is shared across a fleet) only affect layered Dockerfiles,
+    # and `dockerfile_template` (see `template_registry`) and `offline` (see `offline_context`) only monolithic ones
+    if dockerfile_layout == DockerfileLayout.LAYERED:
+        if dockerfile_template is not None or offline:
+            err_msg = "Dockerfile templates and offline build contexts only apply to the monolithic Dockerfile layout"
+            raise ValueError(err_msg)
+        return fill_layered_dockerfile_template(experiment_deps, dependency_frequencies)
+    if offline and dockerfile_template is None:
+        dockerfile_template = OFFLINE_DOCKERFILE_TEMPLATE_NAME
+    return ContainerizationFileRepr(
+        representation=get_dockerfile_template(dockerfile_template).render(experiment_deps, offline)
+    )
 
 
 def generate_necessary_values() -> list[str]:
-    return pull_substitution_keys_from_document()
+    return list(dict.fromkeys(get_dockerfile_template().slots))
 
 
-# Due to an assumption that we can not have all dependencies included
-# in the same python environment, we need a solid address protocol to assume.
-# going with: `python:{source}<{package_name}>[{version_statement}]@{python_module_path_to_class_def}`
-#         ex: "python: pypi<copasi-basico[~0.8]>@basico.model_io.load_model" (if this was a class, and not a function)
-def determine_dependencies(  # noqa: C901
-    string_to_search: str, whitelist_entries: Optional[list[str]] = None
+def determine_dependencies(
+    string_to_search: str, passlist: Optional[Passlist] = None
 ) -> tuple[ExperimentPrimaryDependencies, str]:
-    whitelist_mapping: dict[str, set[str]] | None
-    if whitelist_entries is not None:
-        whitelist_mapping = {}
-        for whitelist_entry in whitelist_entries:
-            entry = whitelist_entry.split("::")
-            if len(entry) != 2:
-                err_msg = f"invalid whitelist entry: {whitelist_entry}"
-                raise ValueError(err_msg)
-            source, package = (entry[0], entry[1])
-            if source not in whitelist_mapping:
-                whitelist_mapping[source] = set()
-            whitelist_mapping[source].add(package)
+    # See `bsedic.pbif.dependency_resolution.addresses` for the address protocol
+    address_rewriter = DependencyAddressRewriter(passlist)
+    # A single scan both collects and rewrites every address, so the document is only copied once
+    adjusted_search_string, match_count = DEPENDENCY_ADDRESS_PATTERN.subn(
+        address_rewriter.rewrite_address, string_to_search
+    )
+    if match_count == 0 and LOCAL_ADDRESS_PATTERN.search(string_to_search) is None:
+        err_msg = "No dependencies found in document; unable to generate environment."
+        raise NoDependenciesFoundError(err_msg)
+    return address_rewriter.get_dependencies(), adjusted_search_string.strip()
+
+
+def scan_dependencies(
+    pb_document_str: str,
+    passlist: Optional[Passlist] = None,
+    scan_mode: DependencyScanMode = DependencyScanMode.TEXT,
+) -> tuple[ExperimentPrimaryDependencies, str]:
+    if scan_mode == DependencyScanMode.STRUCTURED:
+        return determine_dependencies_structured(pb_document_str, passlist)
+    if scan_mode == DependencyScanMode.STREAMING:
+        err_msg = "Streaming dependency scanning works on files; use `determine_dependencies_for_files` instead"
+        raise ValueError(err_msg)
+    return determine_dependencies(pb_document_str, passlist)
+
+
+def determine_dependencies_for_documents(
+    documents: list[str],
+    passlist: Optional[Passlist] = None,
+    max_workers: Optional[int] = None,
+    scan_mode: DependencyScanMode = DependencyScanMode.TEXT,
+) -> tuple[ExperimentPrimaryDependencies, list[str]]:
+    # Scans each document in its own worker process (when there is more than one, and this is not a worker process
+    # already), and merges the results into a single environment. Documents without any addresses (e.g. plain JSON data
+    # shipped alongside the PBIF documents) are left untouched, as long as at least one document has dependencies.
+    results: list[Optional[tuple[ExperimentPrimaryDependencies, str]]]
+    worker_count = get_process_pool_worker_count(len(documents), max_workers)
+    if len(documents) == 1:
+        results = [scan_dependencies(documents[0], passlist, scan_mode)]
+    elif worker_count == 1:
+        results = [_determine_dependencies_if_any(document, passlist, scan_mode) for document in documents]
+    else:
+        with _start_scan_workers(worker_count, passlist) as executor:
+            results = list(executor.map(_determine_worker_dependencies_if_any, documents, repeat(scan_mode)))
+    found_dependencies = [result[0] for result in results if result is not None]
+    if len(found_dependencies) == 0:
+        err_msg = "No dependencies found in any document; unable to generate environment."
+        raise NoDependenciesFoundError(err_msg)
+    updated_documents = [document if result is None else result[1] for document, result in zip(documents, results)]
+    return ExperimentPrimaryDependencies.merge(found_dependencies), updated_documents
+
+
+def _determine_dependencies_if_any(
+    document: str, passlist: Optional[Passlist], scan_mode: DependencyScanMode
+) -> Optional[tuple[ExperimentPrimaryDependencies, str]]:
+    try:
+        return scan_dependencies(document, passlist, scan_mode)
+    except NoDependenciesFoundError:
+        return None
+
+
+def _determine_worker_dependencies_if_any(
+    document: str, scan_mode: DependencyScanMode
+) -> Optional[tuple[ExperimentPrimaryDependencies, str]]:
+    return _determine_dependencies_if_any(document, _worker_passlist, scan_mode)
+
+
+def determine_dependencies_for_files(
+    pb_document_paths: list[str],
+    passlist: Optional[Passlist] = None,
+    max_workers: Optional[int] = None,
+) -> tuple[ExperimentPrimaryDependencies, list[bool]]:
+    # Streaming counterpart of `determine_dependencies_for_documents`: each file is rewritten in place, and whether it
+    # changed is returned instead of its contents
+    results: list[Optional[tuple[ExperimentPrimaryDependencies, bool]]]
+    worker_count = get_process_pool_worker_count(len(pb_document_paths), max_workers)
+    if len(pb_document_paths) == 1:
+        results = [determine_dependencies_streaming(pb_document_paths[0], passlist)]
+    elif worker_count == 1:
+        results = [
+            _determine_file_dependencies_if_any(pb_document_path, passlist) for pb_document_path in pb_document_paths
+        ]
     else:
-        whitelist_mapping = None
-    source_name_legal_syntax = r"[\w\-]+"
-    package_name_legal_syntax = r"[\w\-._~:/?#[\]@!$&'()*+,;=%]+"  # package or git-http repo name
-    version_string_legal_syntax = (
-        r"\[([\w><=~!*\-.]+)]"  # hard brackets around alphanumeric plus standard python version constraint characters
+        with _start_scan_workers(worker_count, passlist) as executor:
+            results = list(executor.map(_determine_worker_file_dependencies_if_any, pb_document_paths))
+    found_dependencies = [result[0] for result in results if result is not None]
+    if len(found_dependencies) == 0:
+        err_msg = "No dependencies found in any document; unable to generate environment."
+        raise NoDependenciesFoundError(err_msg)
+    return ExperimentPrimaryDependencies.merge(found_dependencies), [
+        result is not None and result[1] for result in results
+    ]
+
+
+def _determine_file_dependencies_if_any(
+    pb_document_path: str, passlist: Optional[Passlist]
+) -> Optional[tuple[ExperimentPrimaryDependencies, bool]]:
+    try:
+        return determine_dependencies_streaming(pb_document_path, passlist)
+    except NoDependenciesFoundError:
+        return None
+
+
+def _determine_worker_file_dependencies_if_any(
+    pb_document_path: str,
+) -> Optional[tuple[ExperimentPrimaryDependencies, bool]]:
+    return _determine_file_dependencies_if_any(pb_document_path, _worker_passlist)
+
+
+def _start_scan_workers(worker_count: int, passlist: Optional[Passlist]) -> ProcessPoolExecutor:
+    # The passlist is compiled here, and sent to each worker once, rather than with every document
+    compiled_passlist = None if passlist is None else as_compiled_passlist(passlist)
+    return ProcessPoolExecutor(
+        max_workers=worker_count,
+        mp_context=get_process_pool_context(),
+        initializer=_set_worker_passlist,
+        initargs=(compiled_passlist,),
     )
-    # stricter pattern of only legal python module names
-    # (letters and underscore first character, alphanumeric and underscore for remainder); must be at least 1 char long
-    import_name_legal_syntax = r"[A-Za-z_]\w*(\.[A-Za-z_]\w*)*"
-    known_sources = ["pypi", "conda"]
-    approved_dependencies: dict[str, list[str]] = {source: [] for source in known_sources}
-    regex_pattern = f"python:({source_name_legal_syntax})<({package_name_legal_syntax})({version_string_legal_syntax})?>@({import_name_legal_syntax})"
-    adjusted_search_string = str(string_to_search)
-    matches = re.findall(regex_pattern, string_to_search)
-    if len(matches) == 0:
-        local_protocol_matches = re.findall(f"local:{import_name_legal_syntax}", string_to_search)
-        if len(local_protocol_matches) == 0:
-            err_msg = "No dependencies found in document; unable to generate environment."
-            raise ValueError(err_msg)
-        match_str_list: str = ",".join([str(match) for match in matches])
-        if len(match_str_list) != 0:  # For some reason, we can get a single "match" that's empty...
-            err_msg = f"Document is using the following local protocols: `{match_str_list}`; unable to determine needed environment."
-            raise ValueError(err_msg)
-    for match in matches:
-        source_name = match[0]
-        package_name = match[1]
-        package_version = match[3]
-        if source_name not in known_sources:
-            err_msg = f"Unknown source `{source_name}` used; can not determine dependencies"
-            raise ValueError(err_msg)
-        dependency_str = f"{package_name}{package_version}".strip()
-        if dependency_str in approved_dependencies[source_name]:
-            continue  # We've already accounted for this dependency
-        if whitelist_mapping is not None:
-            # We need to validate against whitelist!
-            if source_name not in whitelist_mapping:
-                err_msg = f"Unapproved source `{source_name}` used; can not trust document"
-                raise ValueError(err_msg)
-            if package_name not in whitelist_mapping[source_name]:
-                err_msg = f"`{package_name}` from `{source_name}` is not a trusted package; can not trust document"
-                raise ValueError(err_msg)
-        approved_dependencies[source_name].append(dependency_str)
-        version_str = match[2] if package_version != "" else ""
-        complete_match = f"python:{source_name}<{package_name}{version_str}>@{match[4]}"
-        adjusted_search_string = adjusted_search_string.replace(complete_match, f"local:{match[4]}")
-    return ExperimentPrimaryDependencies(
-        approved_dependencies["pypi"], approved_dependencies["conda"]
-    ), adjusted_search_string.strip()
+
+
+_worker_passlist: Optional[CompiledPasslist] = None  # the passlist of the scan a worker process runs for
+
+
+def _set_worker_passlist(passlist: Optional[CompiledPasslist]) -> None:
+    global _worker_passlist
+    _worker_passlist = passlist
 
 
 def convert_dependencies_to_installation_string_representation(dependencies: list[str]) -> str:
-    return "'" + "' '".join(dependencies) + "'"
+    return quote_dependencies(dependencies)
@@ -26,9 +26,35 @@ ENTRYPOINT ["python3", "/runtime/main.py"]
 """.strip()
 
 
+def get_offline_dockerfile_template() -> str:
+    # Everything is installed from the build context, including the runtime's build backend, which pip installs into
+    # an isolated build environment from the wheelhouse; see `bsedic.pbif.containerization.offline_context`
+    return """
+FROM ghcr.io/astral-sh/uv:python3.12-bookworm
+
+## Dependency Installs (offline; from the build context only)
+### Conda
+$${#CONDA_FORGE_DEPENDENCIES}
+
+### PyPI
+$${#PYPI_DEPENDENCIES}
+
+##
+COPY runtime /runtime
+WORKDIR /runtime
+RUN python3 -m pip install --no-index --find-links /opt/bsedic/wheelhouse -e /runtime
+
+ENTRYPOINT ["python3", "/runtime/main.py"]
+""".strip()
+
+
 # Note the capture group; that's what re.findall will return!
 _sub_keys: set[str] = {match for match in re.findall(r"\$\${#(\w+)}", get_generic_dockerfile_template())}  # noqa: C416
 
 
 def pull_substitution_keys_from_document() -> list[str]:
     return list(_sub_keys)
+
+
+def quote_dependencies(dependencies: list[str]) -> str:
+    return "'" + "' '".join(dependencies) + "'"
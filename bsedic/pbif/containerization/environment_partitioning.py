@@ -0,0 +1,151 @@
+### Environment partitioning for `ContainerizationTypes.MULTIPLE`: the dependencies of an experiment's processes become
+### the vertices of a conflict graph (an edge joins two requirements no single version satisfies), which is colored
+### with DSatur so that every color is one environment whose requirements can all be installed together.
+import json
+from collections.abc import Iterable
+from typing import Callable, Optional
+
+from bsedic.pbif.dependency_resolution.addresses import DEPENDENCY_ADDRESS_PATTERN
+from bsedic.pbif.dependency_resolution.resolver import UnsatisfiableDependenciesError, resolve_dependencies
+from bsedic.pbif.dependency_resolution.structured_scan import find_process_node_addresses
+from bsedic.pbif.dependency_resolution.whitelist import normalize_package_name
+from bsedic.utils.input_types import DependencyScanMode
+from bsedic.utils.result_types import CoordinationManifest, EnvironmentPartition, ExperimentPrimaryDependencies
+
+ENVIRONMENTS_DIR_NAME = "environments"
+COORDINATION_MANIFEST_FILE_NAME = "coordination_manifest.json"
+
+# A process dependency is `(source, dependency string)`, e.g. `("pypi", "numpy>=2.0.0")`
+ProcessDependency = tuple[str, str]
+
+
+def collect_process_dependencies(
+    pb_document_segments: Iterable[str], scan_mode: DependencyScanMode = DependencyScanMode.TEXT
+) -> dict[ProcessDependency, list[str]]:
+    # Maps every dependency of a (not yet rewritten) document to the `local:` addresses of the processes needing it;
+    # a document may be given in several segments, as long as no address is split across two of them
+    process_dependencies: dict[ProcessDependency, dict[str, None]] = {}
+    for segment in pb_document_segments:
+        if scan_mode == DependencyScanMode.STRUCTURED:
+            addresses = [json.loads(segment[start:end]) for start, end in find_process_node_addresses(segment)]
+        else:
+            addresses = [address_match.group(0) for address_match in DEPENDENCY_ADDRESS_PATTERN.finditer(segment)]
+        for address in addresses:
+            address_match = DEPENDENCY_ADDRESS_PATTERN.fullmatch(address)
+            if address_match is None:
+                continue
+            dependency_str = f"{address_match.group(2)}{address_match.group(4) or ''}".strip()
+            process_dependencies.setdefault((address_match.group(1), dependency_str), {})[
+                f"local:{address_match.group(5)}"
+            ] = None
+    return {dependency: list(processes) for dependency, processes in process_dependencies.items()}
+
+
+def merge_process_dependencies(
+    all_process_dependencies: list[dict[ProcessDependency, list[str]]],
+) -> dict[ProcessDependency, list[str]]:
+    merged: dict[ProcessDependency, dict[str, None]] = {}
+    for process_dependencies in all_process_dependencies:
+        for dependency, processes in process_dependencies.items():
+            merged.setdefault(dependency, {}).update(dict.fromkeys(processes))
+    return {dependency: list(processes) for dependency, processes in merged.items()}
+
+
+def partition_environments(
+    process_dependencies: dict[ProcessDependency, list[str]], package_index_snapshot_path: Optional[str] = None
+) -> CoordinationManifest:
+    dependencies = list(process_dependencies)
+
+    def is_compatible(dependency_indices: list[int]) -> bool:
+        try:
+            _resolve_partition([dependencies[index] for index in dependency_indices], package_index_snapshot_path)
+        except UnsatisfiableDependenciesError:
+            return False
+        return True
+
+    colors = color_conflict_graph(build_conflict_graph(dependencies, is_compatible), is_compatible)
+    environments: list[EnvironmentPartition] = []
+    process_environments: dict[str, list[str]] = {}
+    for color in range(max(colors, default=-1) + 1):
+        members = [dependencies[index] for index, member_color in enumerate(colors) if member_color == color]
+        environment_name = f"env_{color}"
+        resolved_dependencies = _resolve_partition(members, package_index_snapshot_path)
+        processes = list(dict.fromkeys(process for member in members for process in process_dependencies[member]))
+        environments.append(
+            EnvironmentPartition(
+                name=environment_name,
+                build_context=f"{ENVIRONMENTS_DIR_NAME}/{environment_name}",
+                pypi_dependencies=resolved_dependencies.get_pypi_dependencies(),
+                conda_dependencies=resolved_dependencies.get_conda_dependencies(),
+                processes=processes,
+            )
+        )
+        for process in processes:
+            process_environments.setdefault(process, []).append(environment_name)
+    return CoordinationManifest(environments=environments, processes=process_environments)
+
+
+def build_conflict_graph(
+    dependencies: list[ProcessDependency], is_compatible: Callable[[list[int]], bool]
+) -> list[set[int]]:
+    # Adjacency sets, by index into `dependencies`; only requirements on the same package can conflict, so only those
+    # pairs are checked
+    same_package_indices: dict[tuple[str, str], list[int]] = {}
+    for index, (source_name, dependency_str) in enumerate(dependencies):
+        package_key = (source_name, normalize_package_name(source_name, _get_package_name(dependency_str)))
+        same_package_indices.setdefault(package_key, []).append(index)
+    conflicts: list[set[int]] = [set() for _ in dependencies]
+    for indices in same_package_indices.values():
+        for position, index in enumerate(indices):
+            for other_index in indices[position + 1 :]:
+                if not is_compatible([index, other_index]):
+                    conflicts[index].add(other_index)
+                    conflicts[other_index].add(index)
+    return conflicts
+
+
+def color_conflict_graph(conflicts: list[set[int]], is_compatible: Callable[[list[int]], bool]) -> list[int]:
+    # DSatur: repeatedly colors the vertex whose neighbors already use the most distinct colors (ties broken by degree,
+    # then by order), with the lowest color that none of its neighbors use. Pairwise compatibility does not guarantee
+    # that a whole color class can be installed together (e.g. `!=` splits a range in two), so each class is also
+    # checked as a whole before a vertex joins it.
+    colors: dict[int, int] = {}
+    color_members: list[list[int]] = []
+    while len(colors) < len(conflicts):
+        vertex = max(
+            (index for index in range(len(conflicts)) if index not in colors),
+            key=lambda index: (
+                len({colors[neighbor] for neighbor in conflicts[index] if neighbor in colors}),
+                len(conflicts[index]),
+                -index,
+            ),
+        )
+        neighbor_colors = {colors[neighbor] for neighbor in conflicts[vertex] if neighbor in colors}
+        for color, members in enumerate(color_members):
+            if color not in neighbor_colors and is_compatible([*members, vertex]):
+                break
+        else:
+            color = len(color_members)
+            color_members.append([])
+        colors[vertex] = color
+        color_members[color].append(vertex)
+    return [colors[index] for index in range(len(conflicts))]
+
+
+def _resolve_partition(
+    members: list[ProcessDependency], package_index_snapshot_path: Optional[str]
+) -> ExperimentPrimaryDependencies:
+    return resolve_dependencies(
+        ExperimentPrimaryDependencies(
+            [dependency_str for source_name, dependency_str in members if source_name == "pypi"],
+            [dependency_str for source_name, dependency_str in members if source_name == "conda"],
+        ),
+        package_index_snapshot_path,
+    )
+
+
+def _get_package_name(dependency_str: str) -> str:
+    for index, character in enumerate(dependency_str):
+        if character in "<>=!~[ ;@":
+            return dependency_str[:index]
+    return dependency_str
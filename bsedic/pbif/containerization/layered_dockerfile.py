@@ -0,0 +1,200 @@
+### Layer-cache-friendly Dockerfiles: every experiment starts from the same common base (system packages and
+### micromamba), then installs its dependencies in deterministic layers, the most widely shared dependencies first, so
+### that images of different experiments share as long a prefix of layers as possible. Package downloads go through
+### BuildKit cache mounts, so even layers that can not be reused do not download packages again.
+import hashlib
+import re
+import shlex
+from collections.abc import Mapping
+from typing import Optional
+
+from pydantic import BaseModel
+
+from bsedic.pbif.containerization.container_file import quote_dependencies
+from bsedic.pbif.dependency_resolution.whitelist import normalize_package_name
+from bsedic.utils.result_types import ContainerizationFileRepr, ExperimentPrimaryDependencies
+
+# Dependencies shared by at least this fraction of experiments get a layer each (the most shared first, up to the
+# limit); the remaining ones are grouped into one layer per tier
+INDIVIDUAL_LAYER_MIN_FREQUENCY = 0.5
+MAX_INDIVIDUAL_LAYERS = 8
+LAYER_TIER_MIN_FREQUENCIES = (0.1, 0.0)
+
+_COMMON_BASE = """
+# syntax=docker/dockerfile:1
+FROM ghcr.io/astral-sh/uv:python3.12-bookworm
+
+## Common base (identical for every experiment)
+RUN --mount=type=cache,target=/var/cache/apt,sharing=locked --mount=type=cache,target=/var/lib/apt/lists,sharing=locked apt update && apt upgrade -y && apt install -y git curl
+RUN curl -Ls https://micro.mamba.pm/api/micromamba/linux-64/latest | tar -xvj -C /usr/local bin/micromamba
+ENV MAMBA_ROOT_PREFIX=/opt/micromamba
+""".strip()
+_CONDA_ENVIRONMENT = """
+RUN --mount=type=cache,target=/opt/micromamba/pkgs micromamba create -y --always-copy -p /opt/conda -c conda-forge python=3.12
+ENV PATH=/opt/conda/bin:$PATH
+""".strip()
+_CONDA_LAYER = "RUN --mount=type=cache,target=/opt/micromamba/pkgs micromamba install -y --always-copy -p /opt/conda -c conda-forge {dependencies}"
+_PYPI_LAYER = "RUN --mount=type=cache,target=/root/.cache/pip python3 -m pip install {dependencies}"
+_RUNTIME = """
+##
+RUN mkdir /runtime
+WORKDIR /runtime
+RUN git clone https://github.com/biosimulators/bsew.git  /runtime
+RUN --mount=type=cache,target=/root/.cache/pip python3 -m pip install -e /runtime
+
+ENTRYPOINT ["python3", "/runtime/main.py"]
+""".strip()
+_LAYER_INSTRUCTIONS = ("RUN", "COPY", "ADD")
+_INSTRUCTION = re.compile(r"^([A-Z]+)\s")
+_INSTALL_COMMANDS = (("pip", "install"), ("micromamba", "create"), ("micromamba", "install"))
+_INSTALL_OPTIONS_WITH_VALUES = ("-p", "-c", "-e")
+
+
+class LayerReuseEstimate(BaseModel):
+    total_layers: int  # summed over every image
+    unique_layers: int  # what actually has to be built and stored
+    reuse_ratio: float  # fraction of all layers served from another image's cache
+    # The same, counting dependency installs rather than layers, since those dominate build times (and layouts with
+    # different numbers of layers can only be compared this way)
+    total_dependency_installs: int
+    unique_dependency_installs: int
+    dependency_reuse_ratio: float
+
+
+class LayerReuseReport(BaseModel):
+    experiment_count: int
+    monolithic: LayerReuseEstimate
+    layered: LayerReuseEstimate
+    dependency_frequencies: dict[str, float]  # `{source}::{dependency}` -> fraction of experiments using it
+
+
+def fill_layered_dockerfile_template(
+    experiment_deps: ExperimentPrimaryDependencies, dependency_frequencies: Optional[Mapping[str, float]] = None
+) -> ContainerizationFileRepr:
+    sections: list[str] = [_COMMON_BASE, "", "## Dependency Installs, most widely shared first", "### Conda"]
+    conda_layers = split_dependency_layers("conda", experiment_deps.get_conda_dependencies(), dependency_frequencies)
+    if len(conda_layers) == 0:
+        sections.append("# No conda dependencies!")
+    else:
+        sections.append(_CONDA_ENVIRONMENT)
+        sections += [_CONDA_LAYER.format(dependencies=quote_dependencies(layer)) for layer in conda_layers]
+    sections += ["", "### PyPI"]
+    pypi_layers = split_dependency_layers("pypi", experiment_deps.get_pypi_dependencies(), dependency_frequencies)
+    if len(pypi_layers) == 0:
+        sections.append("# No PyPI dependencies!")
+    sections += [_PYPI_LAYER.format(dependencies=quote_dependencies(layer)) for layer in pypi_layers]
+    sections += ["", _RUNTIME]
+    return ContainerizationFileRepr(representation="\n".join(sections))
+
+
+def split_dependency_layers(
+    source_name: str, dependencies: list[str], dependency_frequencies: Optional[Mapping[str, float]] = None
+) -> list[list[str]]:
+    # Without frequencies, every dependency is equally (un)shared: one layer, in a deterministic order
+    def get_frequency(dependency: str) -> float:
+        return 0.0 if dependency_frequencies is None else dependency_frequencies.get(f"{source_name}::{dependency}", 0)
+
+    ordered_dependencies = sorted(
+        dict.fromkeys(dependencies),
+        key=lambda dependency: (
+            -get_frequency(dependency),
+            normalize_package_name(source_name, dependency),
+            dependency,
+        ),
+    )
+    layers: list[list[str]] = []
+    remaining_dependencies: list[str] = []
+    for dependency in ordered_dependencies:
+        if get_frequency(dependency) >= INDIVIDUAL_LAYER_MIN_FREQUENCY and len(layers) < MAX_INDIVIDUAL_LAYERS:
+            layers.append([dependency])
+        else:
+            remaining_dependencies.append(dependency)
+    for min_frequency in LAYER_TIER_MIN_FREQUENCIES:
+        tier = [dependency for dependency in remaining_dependencies if get_frequency(dependency) >= min_frequency]
+        remaining_dependencies = [dependency for dependency in remaining_dependencies if dependency not in tier]
+        if len(tier) > 0:
+            layers.append(
+                sorted(tier, key=lambda dependency: (normalize_package_name(source_name, dependency), dependency))
+            )
+    return layers
+
+
+def compute_dependency_frequencies(all_experiment_deps: list[ExperimentPrimaryDependencies]) -> dict[str, float]:
+    dependency_counts: dict[str, int] = {}
+    for experiment_deps in all_experiment_deps:
+        experiment_dependencies = {f"pypi::{dependency}" for dependency in experiment_deps.get_pypi_dependencies()}
+        experiment_dependencies.update(
+            f"conda::{dependency}" for dependency in experiment_deps.get_conda_dependencies()
+        )
+        for dependency in experiment_dependencies:
+            dependency_counts[dependency] = dependency_counts.get(dependency, 0) + 1
+    return {dependency: count / len(all_experiment_deps) for dependency, count in sorted(dependency_counts.items())}
+
+
+def estimate_layer_reuse(dockerfiles: list[str]) -> LayerReuseEstimate:
+    # A layer can only come from the build cache when every instruction before it is identical too, so layers are
+    # identified by the chain of instructions leading up to them
+    layer_dependency_installs: dict[str, int] = {}
+    total_layers = 0
+    total_dependency_installs = 0
+    for dockerfile in dockerfiles:
+        chain_hasher = hashlib.sha256()
+        for instruction in _iter_instructions(dockerfile):
+            chain_hasher.update(instruction.encode("utf-8") + b"\0")
+            if instruction.split(" ", 1)[0] in _LAYER_INSTRUCTIONS:
+                dependency_installs = _count_dependency_installs(instruction)
+                total_layers += 1
+                total_dependency_installs += dependency_installs
+                layer_dependency_installs[chain_hasher.copy().hexdigest()] = dependency_installs
+    unique_dependency_installs = sum(layer_dependency_installs.values())
+    return LayerReuseEstimate(
+        total_layers=total_layers,
+        unique_layers=len(layer_dependency_installs),
+        reuse_ratio=_get_reuse_ratio(total_layers, len(layer_dependency_installs)),
+        total_dependency_installs=total_dependency_installs,
+        unique_dependency_installs=unique_dependency_installs,
+        dependency_reuse_ratio=_get_reuse_ratio(total_dependency_installs, unique_dependency_installs),
+    )
+
+
+def _iter_instructions(dockerfile: str) -> list[str]:
+    instructions: list[str] = []
+    continued = False
+    for line in dockerfile.splitlines():
+        stripped_line = line.strip()
+        if continued:
+            instructions[-1] += " " + stripped_line.rstrip("\\").strip()
+        elif _INSTRUCTION.match(stripped_line):
+            instructions.append(stripped_line.rstrip("\\").strip())
+        else:
+            continue  # comments and blank lines do not affect the build cache
+        continued = stripped_line.endswith("\\")
+    return instructions
+
+
+def _count_dependency_installs(instruction: str) -> int:
+    # Packages named by `pip install` / `micromamba create|install` commands; editable installs are not counted
+    try:
+        words = shlex.split(instruction)
+    except ValueError:
+        return 0
+    for index in range(len(words) - 1):
+        if (words[index], words[index + 1]) not in _INSTALL_COMMANDS:
+            continue
+        dependency_count = 0
+        skip_next_word = False
+        for word in words[index + 2 :]:
+            if word in ("&&", ";", "|"):
+                break
+            if skip_next_word:
+                skip_next_word = False
+            elif word.startswith("-"):
+                skip_next_word = word in _INSTALL_OPTIONS_WITH_VALUES
+            else:
+                dependency_count += 1
+        return dependency_count
+    return 0
+
+
+def _get_reuse_ratio(total: int, unique: int) -> float:
+    return 0.0 if total == 0 else (total - unique) / total
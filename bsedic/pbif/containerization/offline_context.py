@@ -0,0 +1,268 @@
+### Offline build contexts: instead of downloading anything at build time, the generated container installs every
+### dependency from the build context itself, which holds a wheelhouse (wheels and sdists), a local conda channel, a
+### micromamba binary, and a checkout of the runtime. Dependencies are pinned to the versions found there, and a build
+### context can be checked for missing artifacts without any network access. Nothing is ever downloaded while compiling;
+### `download_runtime_requirements` fills a wheelhouse with what the runtime needs, ahead of time and on request.
+import json
+import os
+import shutil
+import subprocess
+import sys
+from typing import Any
+
+import tomllib
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.utils import InvalidSdistFilename, InvalidWheelFilename, parse_sdist_filename, parse_wheel_filename
+from packaging.version import InvalidVersion, Version
+
+from bsedic.pbif.dependency_resolution.resolver import PackageIndexSnapshot
+from bsedic.pbif.dependency_resolution.whitelist import normalize_package_name
+from bsedic.pbif.registry_index import parse_requirements
+from bsedic.utils.result_types import ExperimentPrimaryDependencies
+
+WHEELHOUSE_DIR_NAME = "wheelhouse"
+CONDA_CHANNEL_DIR_NAME = "conda-channel"
+MICROMAMBA_FILE_NAME = "micromamba"
+RUNTIME_DIR_NAME = "runtime"
+OFFLINE_SNAPSHOT_FILE_NAME = "offline_package_index_snapshot.json"
+# Where the artifacts end up inside the image
+WHEELHOUSE_IMAGE_PATH = "/opt/bsedic/wheelhouse"
+CONDA_CHANNEL_IMAGE_PATH = "/opt/bsedic/conda-channel"
+_CONDA_PYTHON_VERSION = "3.12"
+_SDIST_SUFFIXES = (".tar.gz", ".zip")
+_RUNTIME_PROJECT_FILES = ("pyproject.toml", "setup.py")
+_DEFAULT_BUILD_REQUIREMENTS = ["setuptools>=40.8.0"]  # what pip builds a project without `[build-system]` with
+
+
+class OfflineBuildContextError(ValueError):
+    pass
+
+
+def build_offline_package_index_snapshot(offline_artifacts_dir: str) -> PackageIndexSnapshot:
+    # Every version of every package available from the wheelhouse and the conda channel
+    packages = {
+        "pypi": _collect_wheelhouse_versions(os.path.join(offline_artifacts_dir, WHEELHOUSE_DIR_NAME)),
+        "conda": _collect_conda_channel_versions(os.path.join(offline_artifacts_dir, CONDA_CHANNEL_DIR_NAME)),
+    }
+    return PackageIndexSnapshot(
+        packages={
+            source_name: {package_name: _sort_versions(versions) for package_name, versions in source_packages.items()}
+            for source_name, source_packages in packages.items()
+        }
+    )
+
+
+def write_offline_package_index_snapshot(offline_artifacts_dir: str, snapshot_path: str) -> str:
+    with open(snapshot_path, "w") as snapshot_file:
+        snapshot_file.write(build_offline_package_index_snapshot(offline_artifacts_dir).model_dump_json(indent=2))
+    return snapshot_path
+
+
+def assemble_offline_build_context(
+    offline_artifacts_dir: str, build_context_dir: str, experiment_deps: ExperimentPrimaryDependencies
+) -> None:
+    # Artifacts are hard-linked into the build context where possible, since wheelhouses and channels tend to be large
+    artifact_names = [WHEELHOUSE_DIR_NAME, RUNTIME_DIR_NAME]
+    if len(experiment_deps.get_conda_dependencies()) > 0:
+        artifact_names += [CONDA_CHANNEL_DIR_NAME, MICROMAMBA_FILE_NAME]
+    for artifact_name in artifact_names:
+        source_path = os.path.join(offline_artifacts_dir, artifact_name)
+        destination_path = os.path.join(build_context_dir, artifact_name)
+        if not os.path.exists(source_path) or os.path.exists(destination_path):
+            continue  # missing artifacts are reported by the verification below
+        if os.path.isdir(source_path):
+            shutil.copytree(source_path, destination_path, symlinks=True, copy_function=_link_or_copy)
+        else:
+            _link_or_copy(source_path, destination_path)
+    verify_offline_build_context(build_context_dir, experiment_deps)
+
+
+def download_runtime_requirements(offline_artifacts_dir: str) -> list[str]:
+    # The image installs the runtime from the wheelhouse only, so its build backend and its dependencies have to be in
+    # there. Downloads whatever is missing (with its dependencies), and returns what was missing; never called while
+    # compiling, which has to work without network access.
+    runtime_dir = os.path.join(offline_artifacts_dir, RUNTIME_DIR_NAME)
+    wheelhouse_dir = os.path.join(offline_artifacts_dir, WHEELHOUSE_DIR_NAME)
+    if not os.path.isdir(runtime_dir):
+        return []  # reported by the verification
+    snapshot = build_offline_package_index_snapshot(offline_artifacts_dir)
+    missing_requirement_strs = [
+        requirement_str
+        for requirement_str in [*read_runtime_build_requirements(runtime_dir), *read_runtime_dependencies(runtime_dir)]
+        if len(_check_dependency_available("pypi", requirement_str, snapshot, WHEELHOUSE_DIR_NAME)) > 0
+    ]
+    if len(missing_requirement_strs) == 0:
+        return []
+    print(f"Downloading the runtime's requirements into `{wheelhouse_dir}`: {', '.join(missing_requirement_strs)}")
+    os.makedirs(wheelhouse_dir, exist_ok=True)
+    download_command = [
+        sys.executable,
+        "-m",
+        "pip",
+        "download",
+        "--disable-pip-version-check",
+        "--only-binary=:all:",
+        "--python-version",
+        _CONDA_PYTHON_VERSION,  # the Python of the image
+        "--dest",
+        wheelhouse_dir,
+        *missing_requirement_strs,
+    ]
+    completed = subprocess.run(download_command, capture_output=True, text=True, check=False)  # noqa: S603
+    if completed.returncode != 0:  # left to the verification to report, along with everything else
+        print(f"Could not download the runtime's requirements:\n{completed.stderr.strip()}", file=sys.stderr)
+    return missing_requirement_strs
+
+
+def read_runtime_build_requirements(runtime_dir: str) -> list[str]:
+    build_requirements = _read_runtime_project(runtime_dir).get("build-system", {}).get("requires")
+    if not isinstance(build_requirements, list):
+        return list(_DEFAULT_BUILD_REQUIREMENTS)
+    return [str(requirement_str) for requirement_str in build_requirements]
+
+
+def read_runtime_dependencies(runtime_dir: str) -> list[str]:
+    # What installing the runtime pulls in, leaving out extras and whatever this environment's markers exclude
+    dependencies = _read_runtime_project(runtime_dir).get("project", {}).get("dependencies")
+    if not isinstance(dependencies, list):
+        return []
+    return [
+        f"{package_name}{specifier}"
+        for package_name, specifier in parse_requirements(
+            str(dependency_str) for dependency_str in dependencies
+        ).items()
+    ]
+
+
+def _read_runtime_project(runtime_dir: str) -> dict[str, Any]:
+    try:
+        with open(os.path.join(runtime_dir, "pyproject.toml"), "rb") as project_file:
+            return tomllib.load(project_file)
+    except (OSError, tomllib.TOMLDecodeError):
+        return {}
+
+
+def verify_offline_build_context(build_context_dir: str, experiment_deps: ExperimentPrimaryDependencies) -> None:
+    # Raises with every problem found at once, so that a build context can be fixed in one go
+    problems: list[str] = []
+    snapshot = build_offline_package_index_snapshot(build_context_dir)
+    for dependency_str in experiment_deps.get_pypi_dependencies():
+        problems += _check_dependency_available("pypi", dependency_str, snapshot, WHEELHOUSE_DIR_NAME)
+    conda_dependency_strs = experiment_deps.get_conda_dependencies()
+    if len(conda_dependency_strs) > 0:
+        conda_dependency_strs = [*conda_dependency_strs, f"python=={_CONDA_PYTHON_VERSION}.*"]
+        if not os.path.isfile(os.path.join(build_context_dir, MICROMAMBA_FILE_NAME)):
+            problems.append(f"`{MICROMAMBA_FILE_NAME}` binary is missing")
+    for dependency_str in conda_dependency_strs:
+        problems += _check_dependency_available("conda", dependency_str, snapshot, CONDA_CHANNEL_DIR_NAME)
+    runtime_dir = os.path.join(build_context_dir, RUNTIME_DIR_NAME)
+    if not any(os.path.isfile(os.path.join(runtime_dir, file_name)) for file_name in _RUNTIME_PROJECT_FILES):
+        problems.append(f"`{RUNTIME_DIR_NAME}` is not a checkout of the runtime (no pyproject.toml or setup.py)")
+    else:
+        for requirement_str in read_runtime_build_requirements(runtime_dir):
+            problems += [
+                f"{problem} (needed to build `{RUNTIME_DIR_NAME}`)"
+                for problem in _check_dependency_available("pypi", requirement_str, snapshot, WHEELHOUSE_DIR_NAME)
+            ]
+        for requirement_str in read_runtime_dependencies(runtime_dir):
+            problems += [
+                f"{problem} (needed to install `{RUNTIME_DIR_NAME}`)"
+                for problem in _check_dependency_available("pypi", requirement_str, snapshot, WHEELHOUSE_DIR_NAME)
+            ]
+    problems += _check_copied_sources(build_context_dir)
+    if len(problems) > 0:
+        err_msg = f"Offline build context `{build_context_dir}` is incomplete:\n\t" + "\n\t".join(problems)
+        raise OfflineBuildContextError(err_msg)
+
+
+def _collect_wheelhouse_versions(wheelhouse_dir: str) -> dict[str, set[str]]:
+    package_versions: dict[str, set[str]] = {}
+    if not os.path.isdir(wheelhouse_dir):
+        return package_versions
+    for file_name in sorted(os.listdir(wheelhouse_dir)):
+        try:
+            if file_name.endswith(".whl"):
+                package_name, version, _, _ = parse_wheel_filename(file_name)
+            elif file_name.endswith(_SDIST_SUFFIXES):
+                package_name, version = parse_sdist_filename(file_name)
+            else:
+                continue
+        except (InvalidWheelFilename, InvalidSdistFilename, InvalidVersion):
+            continue
+        package_versions.setdefault(str(package_name), set()).add(str(version))
+    return package_versions
+
+
+def _collect_conda_channel_versions(conda_channel_dir: str) -> dict[str, set[str]]:
+    # Every platform subdirectory (`noarch`, `linux-64`, ...) with an index counts
+    package_versions: dict[str, set[str]] = {}
+    if not os.path.isdir(conda_channel_dir):
+        return package_versions
+    for subdir_name in sorted(os.listdir(conda_channel_dir)):
+        repodata_path = os.path.join(conda_channel_dir, subdir_name, "repodata.json")
+        if not os.path.isfile(repodata_path):
+            continue
+        with open(repodata_path) as repodata_file:
+            repodata = json.load(repodata_file)
+        for package_records in (repodata.get("packages", {}), repodata.get("packages.conda", {})):
+            for package_record in package_records.values():
+                package_name = normalize_package_name("conda", package_record["name"])
+                package_versions.setdefault(package_name, set()).add(package_record["version"])
+    return package_versions
+
+
+def _check_dependency_available(
+    source_name: str, dependency_str: str, snapshot: PackageIndexSnapshot, artifact_name: str
+) -> list[str]:
+    try:
+        requirement = Requirement(dependency_str)
+    except InvalidRequirement:
+        return [f"`{dependency_str}` from `{source_name}` can not be installed from `{artifact_name}`"]
+    if requirement.url is not None:
+        return [f"`{dependency_str}` from `{source_name}` points at a URL; it can not be installed offline"]
+    available_version_strs = snapshot.get_versions(source_name, requirement.name)
+    if available_version_strs is None:
+        return [f"`{requirement.name}` from `{source_name}` is missing from `{artifact_name}`"]
+    if len(list(requirement.specifier.filter(available_version_strs, prereleases=True))) == 0:
+        return [
+            f"no version of `{requirement.name}` in `{artifact_name}` satisfies `{dependency_str}` "
+            f"(available: {', '.join(available_version_strs)})"
+        ]
+    return []
+
+
+def _check_copied_sources(build_context_dir: str) -> list[str]:
+    # Everything the Dockerfile copies in must be part of the build context
+    dockerfile_path = os.path.join(build_context_dir, "Dockerfile")
+    if not os.path.isfile(dockerfile_path):
+        return []
+    problems: list[str] = []
+    with open(dockerfile_path) as dockerfile:
+        for line in dockerfile:
+            arguments = line.split()
+            if len(arguments) < 3 or arguments[0] != "COPY" or arguments[1].startswith("--"):
+                continue
+            for source in arguments[1:-1]:
+                if not os.path.exists(os.path.join(build_context_dir, source)):
+                    problems.append(f"the Dockerfile copies `{source}`, which is not part of the build context")
+    return problems
+
+
+def _link_or_copy(source_path: str, destination_path: str) -> str:
+    try:
+        os.link(source_path, destination_path)
+    except OSError:  # e.g. across file systems
+        shutil.copy2(source_path, destination_path)
+    return destination_path
+
+
+def _sort_versions(version_strs: set[str]) -> list[str]:
+    # Versions that do not parse (which some conda packages use) come first, in lexical order
+    parsed_versions: dict[str, Version] = {}
+    for version_str in version_strs:
+        try:
+            parsed_versions[version_str] = Version(version_str)
+        except InvalidVersion:
+            continue
+    unparsed_version_strs = sorted(version_str for version_str in version_strs if version_str not in parsed_versions)
+    return unparsed_version_strs + sorted(parsed_versions, key=lambda version_str: parsed_versions[version_str])
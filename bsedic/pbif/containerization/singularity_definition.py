@@ -0,0 +1,253 @@
+# This file converts a filled Dockerfile straight into an Apptainer (formerly Singularity) definition, in memory.
+# The output intentionally matches what spython's `DockerParser` + `SingularityWriter` produce for the instructions
+# supported here; anything else raises `UnsupportedDockerInstructionError`, so callers can fall back to spython.
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from bsedic.utils.result_types import ContainerizationFileRepr
+
+_DEFAULT_STAGE_NAME = "spython-base"
+_DEFAULT_RUNSCRIPT = "/bin/bash"
+# BuildKit-only `RUN` options have no Apptainer equivalent, and would otherwise end up inside `%post` as shell words
+_BUILDKIT_RUN_OPTIONS = re.compile(r"^(?:--(?:mount|network|security)=\S+\s*)+")
+_ENV_TOKEN_SPLIT = re.compile("( |\\\".*?\\\"|'.*?')")
+
+
+class UnsupportedDockerInstructionError(ValueError):
+    pass
+
+
+@dataclass
+class _DefinitionStage:
+    from_header: Optional[str] = None
+    install: list[str] = field(default_factory=list)
+    environ: list[str] = field(default_factory=list)
+    files: list[list[str]] = field(default_factory=list)
+    layer_files: dict[str, list[list[str]]] = field(default_factory=dict)
+    labels: list[list[str]] = field(default_factory=list)
+    workdir: Optional[str] = None
+    entrypoint: Any = None
+    cmd: Any = None
+    test: Optional[list[str]] = None
+
+
+def convert_dockerfile_to_singularity_definition(dockerfile: str) -> str:
+    return _DefinitionBuilder(dockerfile).build()
+
+
+def convert_container_file_repr_to_singularity_definition(
+    docker_template: ContainerizationFileRepr,
+) -> ContainerizationFileRepr:
+    return ContainerizationFileRepr(
+        representation=convert_dockerfile_to_singularity_definition(docker_template.representation)
+    )
+
+
+class _DefinitionBuilder:
+    def __init__(self, dockerfile: str) -> None:
+        self._lines = dockerfile.splitlines(keepends=True)
+        self._stages: dict[str, _DefinitionStage] = {_DEFAULT_STAGE_NAME: _DefinitionStage()}
+        self._active_stage_name = _DEFAULT_STAGE_NAME
+        self._handlers: dict[str, Callable[[str], None]] = {
+            "COPY": self._copy,
+            "CMD": self._cmd,
+            "ENTRYPOINT": self._entrypoint,
+            "ENV": self._env,
+            "EXPOSE": self._as_comment,
+            "FROM": self._from,
+            "HEALTHCHECK": self._healthcheck,
+            "LABEL": self._label,
+            "MAINTAINER": self._label,
+            "RUN": self._run,
+            "STOPSIGNAL": self._as_comment,
+            "VOLUME": self._as_comment,
+            "WORKDIR": self._workdir,
+        }
+
+    def build(self) -> str:
+        handler: Optional[Callable[[str], None]] = None
+        previous_line: Optional[str] = None
+        for line in self._lines:
+            handler = self._select_handler(line, handler, previous_line)
+            handler(line)
+            previous_line = line
+        return self._write()
+
+    @property
+    def _stage(self) -> _DefinitionStage:
+        return self._stages[self._active_stage_name]
+
+    # Parsing
+
+    def _select_handler(
+        self, line: str, previous_handler: Optional[Callable[[str], None]], previous_line: Optional[str]
+    ) -> Callable[[str], None]:
+        instruction = line.split(" ", 1)[0].strip().upper()
+        if instruction in self._handlers:
+            return self._handlers[instruction]
+        if instruction in ("ADD", "ARG", "ONBUILD", "SHELL"):
+            err_msg = f"`{instruction}` instructions are not supported by the native Apptainer converter"
+            raise UnsupportedDockerInstructionError(err_msg)
+        # Continuation lines belong to the instruction that started them
+        if previous_handler is not None and (
+            _strip_comment(line.split(" ", 1)[-1]).endswith("\\") or _strip_comment(previous_line).endswith("\\")
+        ):
+            return previous_handler
+        return self._default
+
+    def _arguments(self, instruction: str, line: str) -> list[str]:
+        remainder = " " + re.sub(f"^{instruction}", "", line)
+        return [token for token in (piece.strip() for piece in remainder.split(" ", 1)) if token != ""]
+
+    def _from(self, line: str) -> None:
+        from_header = self._arguments("FROM", line)[0]
+        stage_match = re.search("AS (?P<layer>.+)", from_header, flags=re.I)
+        if stage_match:
+            stage_name = stage_match.group("layer").strip()
+            if len(self._stages) == 1 and _DEFAULT_STAGE_NAME in self._stages:
+                self._stages = {stage_name: self._stages[_DEFAULT_STAGE_NAME]}  # the first stage was named
+            else:
+                self._stages[stage_name] = _DefinitionStage()
+            self._active_stage_name = stage_name
+        self._stage.from_header = re.sub("AS .+", "", from_header, flags=re.I)
+
+    def _run(self, line: str) -> None:
+        arguments = self._arguments("RUN", line)
+        self._stage.install += [_BUILDKIT_RUN_OPTIONS.sub("", argument) for argument in arguments]
+
+    def _env(self, line: str) -> None:
+        exports = _parse_env(self._arguments("ENV", line))
+        self._stage.install += exports
+        self._stage.environ += exports
+
+    def _copy(self, line: str) -> None:
+        for argument in self._arguments("COPY", line):
+            layer: Optional[str] = None
+            if argument.startswith("--from"):
+                layer = argument[len("--from") :].split(" ")[0].lstrip("=")
+                if layer not in self._stages:
+                    err_msg = f"COPY requested from stage `{layer}`, which is not previously defined"
+                    raise UnsupportedDockerInstructionError(err_msg)
+                argument = " ".join([word for word in argument.split(" ")[1:] if word])
+            values = argument.split(" ")
+            destination = values.pop()
+            for source in values:
+                if layer is None:
+                    self._stage.files.append([source, destination])
+                else:
+                    self._stage.layer_files.setdefault(layer, []).append([source, destination])
+
+    def _workdir(self, line: str) -> None:
+        workdir = self._arguments("WORKDIR", line)
+        self._stage.install.append(f"mkdir -p {''.join(workdir)}")
+        self._stage.install.append(f"cd {''.join(workdir)}")
+        self._stage.workdir = workdir[0]
+
+    def _cmd(self, line: str) -> None:
+        self._stage.cmd = _load_list(self._arguments("CMD", line)[0])
+
+    def _entrypoint(self, line: str) -> None:
+        self._stage.entrypoint = _load_list(self._arguments("ENTRYPOINT", line)[0])
+
+    def _healthcheck(self, line: str) -> None:
+        self._stage.test = self._arguments("HEALTHCHECK", line)
+
+    def _label(self, line: str) -> None:
+        self._stage.labels.append(self._arguments("LABEL", line))
+
+    def _as_comment(self, line: str) -> None:
+        self._stage.install.append(f"# {line}")
+
+    def _default(self, line: str) -> None:
+        self._stage.install.append(line)  # comments, blank lines, and unrecognized lines are kept verbatim
+
+    # Writing
+
+    def _write(self) -> str:
+        definition: list[str] = []
+        stage_names = list(self._stages)
+        for stage_name in stage_names:
+            definition += _write_stage(stage_name, self._stages[stage_name], is_last=stage_name == stage_names[-1])
+        return "\n".join(definition).replace("\n\n", "\n").strip("\n").rstrip()
+
+
+def _write_stage(stage_name: str, stage: _DefinitionStage, is_last: bool) -> list[str]:
+    if stage.from_header is None:
+        err_msg = "Apptainer definitions require a `FROM` instruction"
+        raise UnsupportedDockerInstructionError(err_msg)
+    definition = ["\n\n\nBootstrap: docker", f"From: {stage.from_header}", f"Stage: {stage_name}\n\n\n"]
+    if stage.files:
+        definition += _key_value_section(stage.files, "files")
+    for layer, layer_files in stage.layer_files.items():
+        definition += _key_value_section(layer_files, f"files from {layer}")
+    if stage.labels:
+        definition += _key_value_section(stage.labels, "labels")
+    if stage.install:
+        definition += _finish_section(stage.install, "post")
+    if stage.environ:
+        definition += ["%environment"] + [f"export {pair}" for pair in stage.environ]
+    if is_last:
+        runscript: list[str] = [_create_runscript(stage)]
+        if stage.workdir is not None:
+            runscript = [f"cd {stage.workdir}", *runscript]
+        definition += _finish_section(runscript, "runscript")
+        definition += _finish_section(runscript, "startscript")
+        if stage.test is not None:
+            definition += _finish_section(stage.test, "test")
+    return definition
+
+
+def _strip_comment(line: Optional[str]) -> str:
+    return (line or "").split("#")[0].strip()
+
+
+def _load_list(argument: str) -> Any:
+    try:
+        return json.loads(argument)
+    except ValueError:
+        return argument
+
+
+def _parse_env(environment_arguments: list[str]) -> list[str]:
+    exports: list[str] = []
+    for environment_argument in environment_arguments:
+        pieces = [piece for piece in _ENV_TOKEN_SPLIT.split(environment_argument) if piece.strip()]
+        while pieces:
+            current = pieces.pop(0)
+            if current.endswith("="):  # `A= "1 2"` -> `A=1 2`, and `A=` -> `A=`
+                exports.append(current + (pieces.pop(0) if pieces else ""))
+            elif "=" in current:  # `A=B`
+                exports.append(current)
+            elif current.endswith("\\"):  # `ENV \`
+                continue
+            else:  # legacy `ENV A B` -> `A=B`
+                exports.append(f"{current}={pieces.pop(0)}")
+    return exports
+
+
+def _create_runscript(stage: _DefinitionStage) -> str:
+    runscript = _DEFAULT_RUNSCRIPT
+    if stage.entrypoint is not None:
+        runscript = " ".join(stage.entrypoint) if isinstance(stage.entrypoint, list) else "".join(stage.entrypoint)
+    if stage.cmd is not None:
+        runscript += " " + (" ".join(stage.cmd) if isinstance(stage.cmd, list) else "".join(stage.cmd))
+    if not runscript.startswith("exec"):
+        runscript = f"exec {runscript}"
+    if not re.search('"?[$]@"?', runscript):
+        runscript = f'{runscript} "$@"'
+    return runscript
+
+
+def _finish_section(section: list[str], name: str) -> list[str]:
+    lines: list[str] = []
+    for line in section:
+        if re.search("^USER", line):
+            line = f"su - {line.replace('USER', '', 1).rstrip()} # {line}"
+        lines.append(line)
+    return [f"%{name}", *lines]
+
+
+def _key_value_section(pairs: list[list[str]], name: str) -> list[str]:
+    return [f"%{name}"] + [" ".join(pair).strip().strip("\\") for pair in pairs]
@@ -0,0 +1,180 @@
+### Dockerfile template registry: every template is parsed once into literal segments and the slots between them
+### (written `$${#SLOT_NAME}`), and its slots are checked when it is registered or loaded, so rendering an experiment's
+### Dockerfile is a single join. Besides the built-in templates, templates can be registered by name, or given as a
+### path to a template file, so that each compile can pick its own base image. Offline compiles fill the same slots with
+### installs from the build context instead (see `offline_context`).
+import functools
+import os
+import re
+from typing import Callable, Optional
+
+from pydantic import BaseModel
+
+from bsedic.pbif.containerization.container_file import (
+    get_generic_dockerfile_template,
+    get_offline_dockerfile_template,
+    quote_dependencies,
+)
+from bsedic.pbif.containerization.offline_context import (
+    CONDA_CHANNEL_DIR_NAME,
+    CONDA_CHANNEL_IMAGE_PATH,
+    MICROMAMBA_FILE_NAME,
+    WHEELHOUSE_DIR_NAME,
+    WHEELHOUSE_IMAGE_PATH,
+)
+from bsedic.utils.result_types import ExperimentPrimaryDependencies
+
+DEFAULT_DOCKERFILE_TEMPLATE_NAME = "generic"
+OFFLINE_DOCKERFILE_TEMPLATE_NAME = "offline"
+PYPI_DEPENDENCIES_SLOT = "PYPI_DEPENDENCIES"
+CONDA_FORGE_DEPENDENCIES_SLOT = "CONDA_FORGE_DEPENDENCIES"
+_SLOT = re.compile(r"\$\${#(\w*)}")
+_SLOT_OPENING = "$${#"
+
+_CONDA_FORGE_SECTION = """
+RUN mkdir /micromamba
+RUN curl -Ls https://micro.mamba.pm/api/micromamba/linux-64/latest | tar -xvj bin/micromamba
+RUN mv bin/micromamba /usr/local/bin/
+RUN micromamba create -y -p /opt/conda -c conda-forge {dependencies} python=3.12
+ENV PATH=/opt/conda/bin:$PATH
+""".strip()
+_OFFLINE_CONDA_FORGE_SECTION = f"""
+COPY {MICROMAMBA_FILE_NAME} /usr/local/bin/micromamba
+COPY {CONDA_CHANNEL_DIR_NAME} {CONDA_CHANNEL_IMAGE_PATH}
+RUN micromamba create -y --offline --override-channels -p /opt/conda -c file://{CONDA_CHANNEL_IMAGE_PATH} {{dependencies}} python=3.12
+ENV PATH=/opt/conda/bin:$PATH
+""".strip()
+# The wheelhouse is always copied in, since the runtime is installed from it too
+_OFFLINE_PYPI_SECTION = f"""
+COPY {WHEELHOUSE_DIR_NAME} {WHEELHOUSE_IMAGE_PATH}
+{{dependencies}}
+""".strip()
+
+
+class DockerfileTemplate(BaseModel):
+    name: str
+    source: str  # as written, so that anything derived from a template (e.g. cache keys) can tell templates apart
+    literals: list[str]  # always one more than `slots`; literal `i` comes right before slot `i`
+    slots: list[str]
+
+    def render(self, experiment_deps: ExperimentPrimaryDependencies, offline: bool = False) -> str:
+        slot_renderers = _OFFLINE_SLOT_RENDERERS if offline else _SLOT_RENDERERS
+        slot_values = {slot: slot_renderers[slot](experiment_deps) for slot in set(self.slots)}
+        segments: list[str] = [self.literals[0]]
+        for slot, literal in zip(self.slots, self.literals[1:]):
+            segments += [slot_values[slot], literal]
+        return "".join(segments)
+
+
+def _render_pypi_dependencies(experiment_deps: ExperimentPrimaryDependencies) -> str:
+    if len(experiment_deps.get_pypi_dependencies()) == 0:
+        return "# No PyPI dependencies!"
+    return f"RUN python3 -m pip install {quote_dependencies(experiment_deps.get_pypi_dependencies())}"
+
+
+def _render_conda_forge_dependencies(experiment_deps: ExperimentPrimaryDependencies) -> str:
+    if len(experiment_deps.get_conda_dependencies()) == 0:
+        return "# No conda dependencies!"
+    return _CONDA_FORGE_SECTION.format(dependencies=" ".join(experiment_deps.get_conda_dependencies()))
+
+
+def _render_offline_pypi_dependencies(experiment_deps: ExperimentPrimaryDependencies) -> str:
+    if len(experiment_deps.get_pypi_dependencies()) == 0:
+        install_str = "# No PyPI dependencies!"
+    else:
+        install_str = (
+            f"RUN python3 -m pip install --no-index --find-links {WHEELHOUSE_IMAGE_PATH} "
+            f"{quote_dependencies(experiment_deps.get_pypi_dependencies())}"
+        )
+    return _OFFLINE_PYPI_SECTION.format(dependencies=install_str)
+
+
+def _render_offline_conda_forge_dependencies(experiment_deps: ExperimentPrimaryDependencies) -> str:
+    if len(experiment_deps.get_conda_dependencies()) == 0:
+        return "# No conda dependencies!"
+    return _OFFLINE_CONDA_FORGE_SECTION.format(
+        dependencies=quote_dependencies(experiment_deps.get_conda_dependencies())
+    )
+
+
+_SLOT_RENDERERS: dict[str, Callable[[ExperimentPrimaryDependencies], str]] = {
+    PYPI_DEPENDENCIES_SLOT: _render_pypi_dependencies,
+    CONDA_FORGE_DEPENDENCIES_SLOT: _render_conda_forge_dependencies,
+}
+_OFFLINE_SLOT_RENDERERS: dict[str, Callable[[ExperimentPrimaryDependencies], str]] = {
+    PYPI_DEPENDENCIES_SLOT: _render_offline_pypi_dependencies,
+    CONDA_FORGE_DEPENDENCIES_SLOT: _render_offline_conda_forge_dependencies,
+}
+
+_registered_templates: dict[str, DockerfileTemplate] = {}
+
+
+def parse_dockerfile_template(template_name: str, template_source: str) -> DockerfileTemplate:
+    # Every slot must be one we know how to fill, and every dependency slot must appear, or dependencies would silently
+    # go uninstalled
+    split_source = _SLOT.split(template_source)
+    literals, slots = split_source[0::2], split_source[1::2]
+    for literal in literals:
+        if _SLOT_OPENING in literal:
+            err_msg = f"Dockerfile template `{template_name}` has a malformed slot near `{_get_slot_context(literal)}`"
+            raise ValueError(err_msg)
+    unknown_slots = sorted(set(slots) - set(_SLOT_RENDERERS))
+    if len(unknown_slots) > 0:
+        err_msg = (
+            f"Dockerfile template `{template_name}` has unknown slots {', '.join(unknown_slots)}; "
+            f"expected only {', '.join(sorted(_SLOT_RENDERERS))}"
+        )
+        raise ValueError(err_msg)
+    missing_slots = sorted(set(_SLOT_RENDERERS) - set(slots))
+    if len(missing_slots) > 0:
+        err_msg = f"Dockerfile template `{template_name}` is missing slots {', '.join(missing_slots)}"
+        raise ValueError(err_msg)
+    return DockerfileTemplate(name=template_name, source=template_source, literals=literals, slots=slots)
+
+
+def register_dockerfile_template(template_name: str, template_source: str) -> DockerfileTemplate:
+    if template_name in _registered_templates:
+        err_msg = f"A Dockerfile template named `{template_name}` is already registered"
+        raise ValueError(err_msg)
+    dockerfile_template = parse_dockerfile_template(template_name, template_source)
+    _registered_templates[template_name] = dockerfile_template
+    return dockerfile_template
+
+
+def get_dockerfile_template(template_name_or_path: Optional[str] = None) -> DockerfileTemplate:
+    # A registered template name, or a path to a template file; `None` is the generic template
+    if template_name_or_path is None:
+        template_name_or_path = DEFAULT_DOCKERFILE_TEMPLATE_NAME
+    dockerfile_template = _registered_templates.get(template_name_or_path)
+    if dockerfile_template is not None:
+        return dockerfile_template
+    if os.path.isfile(template_name_or_path):
+        template_stat = os.stat(template_name_or_path)
+        return _load_dockerfile_template(
+            os.path.abspath(template_name_or_path), template_stat.st_mtime_ns, template_stat.st_size
+        )
+    err_msg = (
+        f"Unknown Dockerfile template `{template_name_or_path}`; expected a path to a template file, or one of "
+        f"{', '.join(list_dockerfile_templates())}"
+    )
+    raise ValueError(err_msg)
+
+
+def list_dockerfile_templates() -> list[str]:
+    return sorted(_registered_templates)
+
+
+@functools.lru_cache(maxsize=16)
+def _load_dockerfile_template(template_path: str, modification_time_ns: int, size: int) -> DockerfileTemplate:
+    # The modification time and size are only part of the cache key, so that an edited template is parsed again
+    with open(template_path) as template_file:
+        return parse_dockerfile_template(template_path, template_file.read().strip())
+
+
+def _get_slot_context(literal: str) -> str:
+    slot_start = literal.index(_SLOT_OPENING)
+    return literal[slot_start : slot_start + 32].split("\n")[0]
+
+
+register_dockerfile_template(DEFAULT_DOCKERFILE_TEMPLATE_NAME, get_generic_dockerfile_template())
+register_dockerfile_template(OFFLINE_DOCKERFILE_TEMPLATE_NAME, get_offline_dockerfile_template())
@@ -0,0 +1,57 @@
+### This file holds the PBIF dependency address protocol, shared by every way of scanning a document for addresses.
+import re
+from typing import Optional
+
+from bsedic.pbif.dependency_resolution.whitelist import CompiledPasslist, Passlist, as_compiled_passlist
+from bsedic.utils.result_types import ExperimentPrimaryDependencies
+
+# Due to an assumption that we can not have all dependencies included
+# in the same python environment, we need a solid address protocol to assume.
+# going with: `python:{source}<{package_name}>[{version_statement}]@{python_module_path_to_class_def}`
+#         ex: "python: pypi<copasi-basico[~0.8]>@basico.model_io.load_model" (if this was a class, and not a function)
+SOURCE_NAME_LEGAL_SYNTAX = r"[\w\-]+"
+PACKAGE_NAME_LEGAL_SYNTAX = r"[\w\-._~:/?#[\]@!$&'()*+,;=%]+"  # package or git-http repo name
+# hard brackets around alphanumeric plus standard python version constraint characters
+VERSION_STRING_LEGAL_SYNTAX = r"\[([\w><=~!*\-.]+)]"
+# stricter pattern of only legal python module names
+# (letters and underscore first character, alphanumeric and underscore for remainder); must be at least 1 char long
+IMPORT_NAME_LEGAL_SYNTAX = r"[A-Za-z_]\w*(\.[A-Za-z_]\w*)*"
+KNOWN_SOURCES = ("pypi", "conda")
+# Groups: 1 - source, 2 - package, 3 - bracketed version, 4 - version, 5 - import path
+DEPENDENCY_ADDRESS_PATTERN = re.compile(
+    f"python:({SOURCE_NAME_LEGAL_SYNTAX})<({PACKAGE_NAME_LEGAL_SYNTAX})({VERSION_STRING_LEGAL_SYNTAX})?>@({IMPORT_NAME_LEGAL_SYNTAX})"
+)
+LOCAL_ADDRESS_PATTERN = re.compile(f"local:{IMPORT_NAME_LEGAL_SYNTAX}")
+
+
+class NoDependenciesFoundError(ValueError):
+    pass
+
+
+class DependencyAddressRewriter:
+    # Validates each matched address against the whitelist, records its dependency, and returns its `local:` rewrite;
+    # `rewrite_address` is meant to be handed to `DEPENDENCY_ADDRESS_PATTERN.sub`.
+    def __init__(self, passlist: Optional[Passlist] = None) -> None:
+        self.passlist: CompiledPasslist | None = None if passlist is None else as_compiled_passlist(passlist)
+        # insertion-ordered sets; dependencies are reported in the order they first appear
+        self.approved_dependencies: dict[str, dict[str, None]] = {source: {} for source in KNOWN_SOURCES}
+
+    def rewrite_address(self, match: re.Match[str]) -> str:
+        source_name = match.group(1)
+        package_name = match.group(2)
+        package_version = match.group(4) or ""
+        if source_name not in self.approved_dependencies:
+            err_msg = f"Unknown source `{source_name}` used; can not determine dependencies"
+            raise ValueError(err_msg)
+        dependency_str = f"{package_name}{package_version}".strip()
+        if dependency_str not in self.approved_dependencies[source_name]:
+            if self.passlist is not None:
+                # We need to validate against whitelist!
+                self.passlist.check_dependency(source_name, package_name, package_version)
+            self.approved_dependencies[source_name][dependency_str] = None
+        return f"local:{match.group(5)}"
+
+    def get_dependencies(self) -> ExperimentPrimaryDependencies:
+        return ExperimentPrimaryDependencies(
+            list(self.approved_dependencies["pypi"]), list(self.approved_dependencies["conda"])
+        )
@@ -0,0 +1,177 @@
+### Offline dependency resolution: requirements on the same package are merged into one (intersecting their version
+### specifiers), combinations no version could ever satisfy are reported before any container is built, and, given a
+### snapshot of a package index, every requirement is pinned to the newest version that satisfies it. Nothing is
+### fetched over the network.
+import functools
+import hashlib
+import os
+from typing import Optional
+
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.specifiers import SpecifierSet
+from packaging.version import InvalidVersion, Version
+from pydantic import BaseModel
+
+from bsedic.pbif.dependency_resolution.version_ranges import parse_version_ranges
+from bsedic.pbif.dependency_resolution.whitelist import normalize_package_name
+from bsedic.utils.result_types import ExperimentPrimaryDependencies
+
+_RESOLUTION_CACHE_SIZE = 256
+
+
+class UnsatisfiableDependenciesError(ValueError):
+    pass
+
+
+class PackageIndexSnapshot(BaseModel):
+    # The versions available per package, per source, e.g. `{"pypi": {"numpy": ["1.26.4", "2.0.0"]}}`
+    packages: dict[str, dict[str, list[str]]]
+
+    def get_versions(self, source_name: str, package_name: str) -> Optional[list[str]]:
+        source_packages = self.packages.get(source_name, {})
+        return source_packages.get(normalize_package_name(source_name, package_name))
+
+
+class _MergedRequirement:
+    # Every requirement on one package, in the order they were first seen
+    def __init__(self, requirement: Requirement) -> None:
+        self.name = requirement.name
+        self.extras: dict[str, None] = dict.fromkeys(sorted(requirement.extras))
+        self.specifiers: dict[str, None] = {}
+        self.requirement_strs: dict[str, None] = {}
+
+    def add(self, requirement: Requirement, requirement_str: str) -> None:
+        self.extras.update(dict.fromkeys(sorted(requirement.extras)))
+        self.specifiers.update(dict.fromkeys(str(specifier) for specifier in requirement.specifier))
+        self.requirement_strs[requirement_str] = None
+
+    def get_specifier_str(self) -> str:
+        return ",".join(self.specifiers)
+
+    def to_requirement_str(self, specifier_str: str) -> str:
+        if len(self.requirement_strs) == 1 and specifier_str == self.get_specifier_str():
+            return next(iter(self.requirement_strs))  # nothing to merge; keep it as it was written
+        extras_str = f"[{','.join(self.extras)}]" if self.extras else ""
+        return f"{self.name}{extras_str}{specifier_str}"
+
+
+def resolve_dependencies(
+    experiment_deps: ExperimentPrimaryDependencies, package_index_snapshot_path: Optional[str] = None
+) -> ExperimentPrimaryDependencies:
+    # Requirements that are not plain `name[extras]specifier` strings (e.g. git repositories) are passed through as-is
+    snapshot_key: Optional[tuple[str, int, int]] = None
+    if package_index_snapshot_path is not None:
+        snapshot_stat = os.stat(package_index_snapshot_path)
+        snapshot_key = (os.path.abspath(package_index_snapshot_path), snapshot_stat.st_mtime_ns, snapshot_stat.st_size)
+    pypi_dependencies, conda_dependencies = _resolve_dependencies(
+        tuple(experiment_deps.get_pypi_dependencies()), tuple(experiment_deps.get_conda_dependencies()), snapshot_key
+    )
+    return ExperimentPrimaryDependencies(list(pypi_dependencies), list(conda_dependencies))
+
+
+def get_package_index_snapshot_digest(package_index_snapshot_path: str) -> str:
+    with open(package_index_snapshot_path, "rb") as snapshot_file:
+        return hashlib.file_digest(snapshot_file, "sha256").hexdigest()
+
+
+@functools.lru_cache(maxsize=_RESOLUTION_CACHE_SIZE)
+def _resolve_dependencies(
+    pypi_dependencies: tuple[str, ...],
+    conda_dependencies: tuple[str, ...],
+    snapshot_key: Optional[tuple[str, int, int]],
+) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    # Memoized per dependency set (and snapshot version), so that repeated experiments resolve instantly
+    package_index_snapshot = None if snapshot_key is None else _load_package_index_snapshot(*snapshot_key)
+    return (
+        _resolve_source_dependencies("pypi", pypi_dependencies, package_index_snapshot),
+        _resolve_source_dependencies("conda", conda_dependencies, package_index_snapshot),
+    )
+
+
+def _resolve_source_dependencies(
+    source_name: str, dependency_strs: tuple[str, ...], package_index_snapshot: Optional[PackageIndexSnapshot]
+) -> tuple[str, ...]:
+    # Each merged requirement takes the place of the first requirement on its package
+    resolved_entries: dict[str, Optional[_MergedRequirement]] = {}  # passed-through strings map to `None`
+    merged_requirements: dict[str, _MergedRequirement] = {}
+    for dependency_str in dependency_strs:
+        try:
+            requirement = Requirement(dependency_str)
+        except InvalidRequirement:
+            requirement = None
+        if requirement is None or requirement.url is not None or requirement.marker is not None:
+            resolved_entries.setdefault(dependency_str, None)
+            continue
+        normalized_name = normalize_package_name(source_name, requirement.name)
+        if normalized_name not in merged_requirements:
+            merged_requirements[normalized_name] = _MergedRequirement(requirement)
+            resolved_entries[f"{source_name}::{normalized_name}"] = merged_requirements[normalized_name]
+        merged_requirements[normalized_name].add(requirement, dependency_str)
+    resolved_strs: list[str] = []
+    for entry_key, merged_requirement in resolved_entries.items():
+        if merged_requirement is None:
+            resolved_strs.append(entry_key)
+            continue
+        specifier_str = _check_satisfiable(source_name, merged_requirement)
+        if package_index_snapshot is not None:
+            specifier_str = _pin_to_snapshot(source_name, merged_requirement, specifier_str, package_index_snapshot)
+        resolved_strs.append(merged_requirement.to_requirement_str(specifier_str))
+    return tuple(resolved_strs)
+
+
+def _check_satisfiable(source_name: str, merged_requirement: _MergedRequirement) -> str:
+    specifier_str = merged_requirement.get_specifier_str()
+    try:
+        satisfiable = len(parse_version_ranges(specifier_str)) > 0
+    except ValueError:  # e.g. `===` on a string that is not a version; only an installer can tell
+        return specifier_str
+    if not satisfiable:
+        requirements_str = ", ".join(f"`{requirement_str}`" for requirement_str in merged_requirement.requirement_strs)
+        err_msg = (
+            f"Unsatisfiable requirements on `{merged_requirement.name}` from `{source_name}`: {requirements_str}; "
+            "no version satisfies all of them"
+        )
+        raise UnsatisfiableDependenciesError(err_msg)
+    return specifier_str
+
+
+def _pin_to_snapshot(
+    source_name: str,
+    merged_requirement: _MergedRequirement,
+    specifier_str: str,
+    package_index_snapshot: PackageIndexSnapshot,
+) -> str:
+    # Packages missing from the snapshot are left unpinned
+    available_version_strs = package_index_snapshot.get_versions(source_name, merged_requirement.name)
+    if available_version_strs is None:
+        return specifier_str
+    available_versions: list[Version] = []
+    for available_version_str in available_version_strs:
+        try:
+            available_versions.append(Version(available_version_str))
+        except InvalidVersion:
+            continue
+    matching_versions = list(SpecifierSet(specifier_str).filter(available_versions))
+    if len(matching_versions) == 0:
+        err_msg = (
+            f"No version of `{merged_requirement.name}` from `{source_name}` in the package index snapshot satisfies "
+            f"`{specifier_str or '*'}`"
+        )
+        raise UnsatisfiableDependenciesError(err_msg)
+    return f"=={max(matching_versions)}"
+
+
+@functools.lru_cache(maxsize=4)
+def _load_package_index_snapshot(
+    package_index_snapshot_path: str, modification_time_ns: int, size: int
+) -> PackageIndexSnapshot:
+    # The modification time and size are only part of the cache key, so that an updated snapshot is reloaded
+    with open(package_index_snapshot_path) as snapshot_file:
+        package_index_snapshot = PackageIndexSnapshot.model_validate_json(snapshot_file.read())
+    package_index_snapshot.packages = {
+        source_name: {
+            normalize_package_name(source_name, package_name): versions for package_name, versions in packages.items()
+        }
+        for source_name, packages in package_index_snapshot.packages.items()
+    }
+    return package_index_snapshot
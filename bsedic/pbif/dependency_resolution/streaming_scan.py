@@ -0,0 +1,104 @@
+### Streaming dependency scanning: rewrites a PBIF file chunk by chunk into a temporary file that then replaces it, so
+### peak memory is bounded by the chunk size rather than by the size of the document.
+import os
+import re
+import shutil
+import tempfile
+from collections.abc import Iterator
+from typing import Optional, TextIO
+
+from bsedic.pbif.dependency_resolution.addresses import (
+    DEPENDENCY_ADDRESS_PATTERN,
+    LOCAL_ADDRESS_PATTERN,
+    DependencyAddressRewriter,
+    NoDependenciesFoundError,
+)
+from bsedic.pbif.dependency_resolution.whitelist import Passlist
+from bsedic.utils.result_types import ExperimentPrimaryDependencies
+
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024  # characters
+# Characters no address (dependency or local) can contain; text is only ever cut right after one of them, so no
+# address is split across two chunks
+_ADDRESS_DELIMITERS = r"\s\"`{}\\^|"
+_LAST_ADDRESS_DELIMITER = re.compile(f"[{_ADDRESS_DELIMITERS}](?=[^{_ADDRESS_DELIMITERS}]*\\Z)")
+
+
+def determine_dependencies_streaming(
+    pb_document_path: str, passlist: Optional[Passlist] = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> tuple[ExperimentPrimaryDependencies, bool]:
+    # Same contract as `determine_dependencies` (including stripping surrounding whitespace), but the document is
+    # rewritten in place rather than returned; also returns whether the file changed. On error, the file is untouched.
+    address_rewriter = DependencyAddressRewriter(passlist)
+    file_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(pb_document_path)), suffix=".tmp")
+    try:
+        with open(pb_document_path) as pb_document_file, os.fdopen(file_descriptor, "w") as temp_file:
+            file_changed = _rewrite_document(pb_document_file, temp_file, address_rewriter, chunk_size)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    if file_changed:
+        shutil.copymode(pb_document_path, temp_path)
+        os.replace(temp_path, pb_document_path)
+    else:
+        os.remove(temp_path)
+    return address_rewriter.get_dependencies(), file_changed
+
+
+def _rewrite_document(
+    pb_document_file: TextIO, output_file: TextIO, address_rewriter: DependencyAddressRewriter, chunk_size: int
+) -> bool:
+    document_writer = _StrippingWriter(output_file)
+    rewritten_address_count = 0
+    found_local_address = False
+    for segment in iter_document_segments(pb_document_file, chunk_size):
+        rewritten_segment, match_count = DEPENDENCY_ADDRESS_PATTERN.subn(address_rewriter.rewrite_address, segment)
+        rewritten_address_count += match_count
+        found_local_address = found_local_address or LOCAL_ADDRESS_PATTERN.search(segment) is not None
+        document_writer.write(rewritten_segment)
+    if rewritten_address_count == 0 and not found_local_address:
+        err_msg = "No dependencies found in document; unable to generate environment."
+        raise NoDependenciesFoundError(err_msg)
+    return rewritten_address_count > 0 or document_writer.has_stripped_whitespace()
+
+
+def iter_document_segments(pb_document_file: TextIO, chunk_size: int) -> Iterator[str]:
+    # Yields consecutive pieces of the file that each end right after an address delimiter (except the last)
+    carried_over = ""
+    while chunk := pb_document_file.read(chunk_size):
+        buffered = carried_over + chunk
+        last_delimiter = _LAST_ADDRESS_DELIMITER.search(buffered)
+        if last_delimiter is None:  # no safe place to cut yet; keep reading
+            carried_over = buffered
+            continue
+        carried_over = buffered[last_delimiter.end() :]
+        yield buffered[: last_delimiter.end()]
+    if carried_over:
+        yield carried_over
+
+
+class _StrippingWriter:
+    # Writes segments to `output_file`, dropping the document's leading and trailing whitespace like `str.strip`
+    def __init__(self, output_file: TextIO) -> None:
+        self.output_file = output_file
+        self.started = False
+        self.stripped_leading_whitespace = False
+        self.pending_whitespace = ""  # only written once more content follows it
+
+    def write(self, segment: str) -> None:
+        if not self.started:
+            content_start = len(segment) - len(segment.lstrip())
+            self.stripped_leading_whitespace = self.stripped_leading_whitespace or content_start > 0
+            segment = segment[content_start:]
+            if segment == "":
+                return
+            self.started = True
+        content = segment.rstrip()
+        if content == "":
+            self.pending_whitespace += segment
+            return
+        self.output_file.write(self.pending_whitespace)
+        self.output_file.write(content)
+        self.pending_whitespace = segment[len(content) :]
+
+    def has_stripped_whitespace(self) -> bool:
+        return self.stripped_leading_whitespace or self.pending_whitespace != ""
@@ -0,0 +1,151 @@
+### Structure-aware dependency scanning: walks a JSON PBIF document as a stream of parse events, and only looks at the
+### `address` of process/step nodes, instead of searching the whole text. Arrays holding only numbers (e.g. the `_data`
+### of `array` states) are skipped with a single regex match, so the scan costs scale with the size of the bigraph
+### rather than with the size of its data.
+import json
+import re
+from collections.abc import Iterator
+from typing import Optional
+
+from bsedic.pbif.dependency_resolution.addresses import (
+    DEPENDENCY_ADDRESS_PATTERN,
+    LOCAL_ADDRESS_PATTERN,
+    DependencyAddressRewriter,
+    NoDependenciesFoundError,
+)
+from bsedic.pbif.dependency_resolution.whitelist import Passlist
+from bsedic.utils.result_types import ExperimentPrimaryDependencies
+
+PROCESS_NODE_TYPES = frozenset({"process", "step", "composite", "edge"})
+
+# Parse events, as yielded by `iter_pbif_events`
+START_OBJECT = "start_object"
+END_OBJECT = "end_object"
+START_ARRAY = "start_array"
+END_ARRAY = "end_array"
+KEY = "key"
+STRING = "string"
+SCALAR = "scalar"
+SCALAR_ARRAY = "scalar_array"  # an entire array of numbers / booleans / nulls, skipped in one step
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+_SCALAR = re.compile(r"-?(?:Infinity|[0-9][0-9eE+\-.]*)|true|false|null|NaN")
+# No quotes, braces, or brackets can appear inside, so this only ever matches a flat array of scalars
+_SCALAR_ARRAY = re.compile(r"\[[ \t\n\r0-9eE+\-.,INaflnrstuy]*\]")
+
+
+def iter_pbif_events(document: str) -> Iterator[tuple[str, int, int]]:  # noqa: C901
+    # Yields `(event, start, end)` for each token of a JSON document; `document[start:end]` is the token's raw text
+    # (including the quotes of keys and strings). Only as much validation as needed to tell keys from values is done.
+    containers: list[str] = []
+    expect_key = False
+    position = _WHITESPACE.match(document).end()  # type: ignore[union-attr]
+    while position < len(document):
+        character = document[position]
+        token_end = position + 1
+        if character == "{":
+            containers.append(character)
+            expect_key = True
+            yield START_OBJECT, position, token_end
+        elif character == "[":
+            scalar_array = _SCALAR_ARRAY.match(document, position)
+            if scalar_array is not None:
+                token_end = scalar_array.end()
+                yield SCALAR_ARRAY, position, token_end
+            else:
+                containers.append(character)
+                yield START_ARRAY, position, token_end
+        elif character in "}]":
+            if not containers or containers.pop() != ("{" if character == "}" else "["):
+                err_msg = f"Unbalanced `{character}` at offset {position}"
+                raise ValueError(err_msg)
+            expect_key = False
+            yield END_OBJECT if character == "}" else END_ARRAY, position, token_end
+        elif character == '"':
+            string = _STRING.match(document, position)
+            if string is None:
+                err_msg = f"Unterminated string at offset {position}"
+                raise ValueError(err_msg)
+            token_end = string.end()
+            yield KEY if expect_key else STRING, position, token_end
+            expect_key = False
+        elif character == ",":
+            expect_key = bool(containers) and containers[-1] == "{"
+        elif character != ":":
+            scalar = _SCALAR.match(document, position)
+            if scalar is None:
+                err_msg = f"Unexpected character `{character}` at offset {position}"
+                raise ValueError(err_msg)
+            token_end = scalar.end()
+            yield SCALAR, position, token_end
+        position = _WHITESPACE.match(document, token_end).end()  # type: ignore[union-attr]
+    if containers:
+        err_msg = "Document ended before all of its objects and arrays were closed"
+        raise ValueError(err_msg)
+
+
+def find_process_node_addresses(document: str) -> list[tuple[int, int]]:
+    # Spans (including quotes) of the `address` strings of every process/step node, in document order
+    address_spans: list[tuple[int, int]] = []
+    # One entry per open container; objects track their `_type` and `address`, arrays are `None`
+    frames: list[Optional[dict[str, tuple[int, int]]]] = []
+    pending_key: Optional[str] = None
+    for event, start, end in iter_pbif_events(document):
+        if event == KEY:
+            pending_key = _decode_string(document[start:end])
+            continue
+        if event == START_OBJECT:
+            frames.append({})
+        elif event == START_ARRAY:
+            frames.append(None)
+        elif event == END_OBJECT:
+            node = frames.pop()
+            if node is not None and "address" in node and "_type" in node:
+                node_type = _decode_string(document[slice(*node["_type"])])
+                if node_type in PROCESS_NODE_TYPES:
+                    address_spans.append(node["address"])
+        elif event == END_ARRAY:
+            frames.pop()
+        elif event == STRING and pending_key in ("_type", "address") and frames and frames[-1] is not None:
+            frames[-1][pending_key] = (start, end)
+        pending_key = None
+    address_spans.sort()  # nested nodes close before the nodes containing them
+    return address_spans
+
+
+def determine_dependencies_structured(
+    pb_document_str: str, passlist: Optional[Passlist] = None
+) -> tuple[ExperimentPrimaryDependencies, str]:
+    # Same contract as `determine_dependencies`, for JSON documents; addresses outside of process/step nodes (e.g. in
+    # descriptions or configs) are neither collected nor rewritten
+    try:
+        address_spans = find_process_node_addresses(pb_document_str)
+    except ValueError as e:
+        err_msg = f"Structured dependency scanning requires a JSON document: {e}"
+        raise ValueError(err_msg) from e
+    address_rewriter = DependencyAddressRewriter(passlist)
+    document_pieces: list[str] = []
+    position = 0
+    found_local_address = False
+    for start, end in address_spans:
+        address = _decode_string(pb_document_str[start:end])
+        address_match = DEPENDENCY_ADDRESS_PATTERN.fullmatch(address)
+        if address_match is None:
+            found_local_address = found_local_address or LOCAL_ADDRESS_PATTERN.fullmatch(address) is not None
+            continue
+        document_pieces.append(pb_document_str[position:start])
+        document_pieces.append(json.dumps(address_rewriter.rewrite_address(address_match)))
+        position = end
+    if position == 0 and not found_local_address:
+        err_msg = "No dependencies found in document; unable to generate environment."
+        raise NoDependenciesFoundError(err_msg)
+    document_pieces.append(pb_document_str[position:])
+    return address_rewriter.get_dependencies(), "".join(document_pieces).strip()
+
+
+def _decode_string(raw_string: str) -> str:
+    if "\\" not in raw_string:
+        return raw_string[1:-1]
+    decoded: str = json.loads(raw_string)
+    return decoded
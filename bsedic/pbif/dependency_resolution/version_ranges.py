@@ -0,0 +1,182 @@
+### Version specifiers as unions of version intervals, so that one specifier can be checked to only ever allow versions
+### another specifier allows too (e.g. `>=1.2,<1.5` is within `~=1.1`, but `>=1.2` is not).
+import functools
+from typing import NamedTuple, Optional
+
+from packaging.specifiers import InvalidSpecifier, Specifier, SpecifierSet
+from packaging.version import InvalidVersion, Version
+
+
+class VersionInterval(NamedTuple):
+    lower: Optional[Version]  # `None` is unbounded
+    lower_inclusive: bool
+    upper: Optional[Version]  # `None` is unbounded
+    upper_inclusive: bool
+
+
+_ANY_VERSION = VersionInterval(None, False, None, False)
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_version_ranges(specifier_str: str) -> tuple[VersionInterval, ...]:
+    # The sorted, non-overlapping intervals of versions `specifier_str` allows; an empty specifier allows every version
+    try:
+        specifier_set = SpecifierSet(specifier_str)
+    except InvalidSpecifier as e:
+        err_msg = f"Invalid version specifier `{specifier_str}`: {e}"
+        raise ValueError(err_msg) from e
+    intervals: list[VersionInterval] = [_ANY_VERSION]
+    for specifier in specifier_set:
+        intervals = _intersect(intervals, _get_specifier_intervals(specifier))
+    return tuple(_merge(intervals))
+
+
+def is_version_range_subset(requested_specifier_str: str, allowed_specifier_strs: tuple[str, ...]) -> bool:
+    # Whether every version `requested_specifier_str` allows is allowed by at least one of `allowed_specifier_strs`
+    return _is_version_range_subset(requested_specifier_str, tuple(sorted(set(allowed_specifier_strs))))
+
+
+@functools.lru_cache(maxsize=4096)
+def _is_version_range_subset(requested_specifier_str: str, allowed_specifier_strs: tuple[str, ...]) -> bool:
+    allowed_intervals = _merge([
+        interval
+        for allowed_specifier_str in allowed_specifier_strs
+        for interval in parse_version_ranges(allowed_specifier_str)
+    ])
+    return all(
+        any(_contains(allowed_interval, requested_interval) for allowed_interval in allowed_intervals)
+        for requested_interval in parse_version_ranges(requested_specifier_str)
+    )
+
+
+def _get_specifier_intervals(specifier: Specifier) -> list[VersionInterval]:  # noqa: C901
+    operator, version_str = specifier.operator, specifier.version
+    if version_str.endswith(".*"):
+        lower, upper = _get_prefix_bounds(version_str[:-2])
+        if operator == "==":
+            return [VersionInterval(lower, True, upper, False)]
+        return [VersionInterval(None, False, lower, False), VersionInterval(upper, True, None, False)]  # `!=`
+    try:
+        version = Version(version_str)
+    except InvalidVersion as e:  # only possible with `===`, which compares arbitrary strings
+        err_msg = f"Unsupported version specifier `{specifier}`: {e}"
+        raise ValueError(err_msg) from e
+    if operator in ("==", "==="):
+        return [VersionInterval(version, True, version, True)]
+    if operator == "!=":
+        return [VersionInterval(None, False, version, False), VersionInterval(version, False, None, False)]
+    if operator == ">=":
+        return [VersionInterval(version, True, None, False)]
+    if operator == ">":
+        return [VersionInterval(version, False, None, False)]
+    if operator == "<=":
+        return [VersionInterval(None, False, version, True)]
+    if operator == "<":
+        if not version.is_prerelease:  # `<2.0` excludes the pre-releases of 2.0, which all come after `2.0.dev0`
+            version = Version(f"{_format_epoch(version)}{'.'.join(map(str, version.release))}.dev0")
+        return [VersionInterval(None, False, version, False)]
+    if operator == "~=":  # `~=1.4.2` is `>=1.4.2, ==1.4.*`
+        _, upper = _get_prefix_bounds(".".join(str(part) for part in version.release[:-1]))
+        return [VersionInterval(version, True, upper, False)]
+    err_msg = f"Unsupported version specifier operator `{operator}`"
+    raise ValueError(err_msg)
+
+
+def _get_prefix_bounds(prefix: str) -> tuple[Version, Version]:
+    # `==1.2.*` allows `1.2.dev0` up to, but excluding, `1.3.dev0`
+    prefix_version = Version(prefix)
+    release = list(prefix_version.release)
+    next_release = [*release[:-1], release[-1] + 1]
+    epoch = _format_epoch(prefix_version)
+    return (
+        Version(f"{epoch}{'.'.join(map(str, release))}.dev0"),
+        Version(f"{epoch}{'.'.join(map(str, next_release))}.dev0"),
+    )
+
+
+def _format_epoch(version: Version) -> str:
+    return f"{version.epoch}!" if version.epoch else ""
+
+
+def _intersect(intervals: list[VersionInterval], other_intervals: list[VersionInterval]) -> list[VersionInterval]:
+    intersections: list[VersionInterval] = []
+    for interval in intervals:
+        for other_interval in other_intervals:
+            lower, lower_inclusive = _tighter_lower(interval, other_interval)
+            upper, upper_inclusive = _tighter_upper(interval, other_interval)
+            intersection = VersionInterval(lower, lower_inclusive, upper, upper_inclusive)
+            if not _is_empty(intersection):
+                intersections.append(intersection)
+    return intersections
+
+
+def _merge(intervals: list[VersionInterval]) -> list[VersionInterval]:
+    # Sorts intervals by their lower bound, and joins the ones that overlap or touch
+    merged: list[VersionInterval] = []
+    for interval in sorted(intervals, key=_lower_sort_key):
+        if merged and _touches(merged[-1], interval):
+            upper, upper_inclusive = _looser_upper(merged[-1], interval)
+            merged[-1] = merged[-1]._replace(upper=upper, upper_inclusive=upper_inclusive)
+        else:
+            merged.append(interval)
+    return merged
+
+
+def _contains(interval: VersionInterval, other_interval: VersionInterval) -> bool:
+    return _tighter_lower(interval, other_interval) == (other_interval.lower, other_interval.lower_inclusive) and (
+        _tighter_upper(interval, other_interval) == (other_interval.upper, other_interval.upper_inclusive)
+    )
+
+
+def _touches(interval: VersionInterval, next_interval: VersionInterval) -> bool:
+    # `next_interval` does not start before `interval`
+    if interval.upper is None or next_interval.lower is None:
+        return True
+    if next_interval.lower != interval.upper:
+        return next_interval.lower < interval.upper
+    return interval.upper_inclusive or next_interval.lower_inclusive
+
+
+def _is_empty(interval: VersionInterval) -> bool:
+    if interval.lower is None or interval.upper is None:
+        return False
+    if interval.lower == interval.upper:
+        return not (interval.lower_inclusive and interval.upper_inclusive)
+    return interval.lower > interval.upper
+
+
+def _tighter_lower(interval: VersionInterval, other_interval: VersionInterval) -> tuple[Optional[Version], bool]:
+    if interval.lower is None:
+        return other_interval.lower, other_interval.lower_inclusive
+    if other_interval.lower is None or interval.lower > other_interval.lower:
+        return interval.lower, interval.lower_inclusive
+    if other_interval.lower > interval.lower:
+        return other_interval.lower, other_interval.lower_inclusive
+    return interval.lower, interval.lower_inclusive and other_interval.lower_inclusive
+
+
+def _tighter_upper(interval: VersionInterval, other_interval: VersionInterval) -> tuple[Optional[Version], bool]:
+    if interval.upper is None:
+        return other_interval.upper, other_interval.upper_inclusive
+    if other_interval.upper is None or interval.upper < other_interval.upper:
+        return interval.upper, interval.upper_inclusive
+    if other_interval.upper < interval.upper:
+        return other_interval.upper, other_interval.upper_inclusive
+    return interval.upper, interval.upper_inclusive and other_interval.upper_inclusive
+
+
+def _looser_upper(interval: VersionInterval, other_interval: VersionInterval) -> tuple[Optional[Version], bool]:
+    if interval.upper is None or other_interval.upper is None:
+        return None, False
+    if interval.upper > other_interval.upper:
+        return interval.upper, interval.upper_inclusive
+    if other_interval.upper > interval.upper:
+        return other_interval.upper, other_interval.upper_inclusive
+    return interval.upper, interval.upper_inclusive or other_interval.upper_inclusive
+
+
+def _lower_sort_key(interval: VersionInterval) -> tuple[bool, Optional[Version], bool]:
+    # Unbounded first, then by version; inclusive before exclusive at the same version
+    if interval.lower is None:
+        return False, None, False
+    return True, interval.lower, not interval.lower_inclusive
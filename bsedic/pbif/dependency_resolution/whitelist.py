@@ -1,2 +1,191 @@
-### This file will hold the complex code of version resolution and package allowances, once
-### there is a need for such levels of inspection
+### This file holds the compiled form of passlists (whitelists): entries of `{source}::{package}`, where the package may
+### end with a `*` to allow every package starting with it, and may be followed by a bracketed range of allowed
+### versions (e.g. `pypi::numpy[>=1.26,<3]`, `pypi::bsedic-*`). Package names are normalized (PEP 503 for PyPI), exact
+### names are looked up in a dict and prefixes in a trie, so checking an address costs the same no matter how long the
+### passlist is. Compiled passlists serialize to JSON, so large ones only need to be parsed and validated once.
+import os
+import re
+import tempfile
+from typing import Any, Optional, Union
+
+from pydantic import BaseModel
+
+from bsedic.pbif.dependency_resolution.version_ranges import is_version_range_subset, parse_version_ranges
+from bsedic.utils.atomic_file import replace_file
+
+PASSLIST_FORMAT_VERSION = 1
+ANY_VERSION = ""  # the allowed versions of entries without a version range
+_PACKAGE_WILDCARD = "*"
+_TRIE_RULES_KEY = ""  # trie nodes map characters to child nodes; this key holds the allowed versions ending at the node
+_COMPILED_PASSLIST_CACHE_SIZE = 8
+_PEP_503_SEPARATORS = re.compile(r"[-_.]+")
+_PLAIN_PACKAGE_NAME = re.compile(r"[A-Za-z0-9\-_.]*")  # as opposed to e.g. git repositories
+
+
+class CompiledPasslist(BaseModel):
+    format_version: int = PASSLIST_FORMAT_VERSION
+    entries: list[str]  # as written, so the passlist a compiled one came from can still be identified
+    exact_packages: dict[str, dict[str, list[str]]]  # source -> normalized package name -> allowed versions
+    package_prefixes: dict[str, dict[str, Any]]  # source -> trie of normalized package name prefixes
+
+    def get_allowed_versions(self, source_name: str, package_name: str) -> Optional[list[str]]:
+        # Every allowed version range of every entry matching the package, or `None` when no entry matches it
+        normalized_name = normalize_package_name(source_name, package_name)
+        allowed_versions: list[str] = list(self.exact_packages.get(source_name, {}).get(normalized_name, []))
+        trie_node: Optional[dict[str, Any]] = self.package_prefixes.get(source_name)
+        for character in normalized_name:
+            if trie_node is None:
+                break
+            allowed_versions.extend(trie_node.get(_TRIE_RULES_KEY, []))
+            trie_node = trie_node.get(character)
+        if trie_node is not None:
+            allowed_versions.extend(trie_node.get(_TRIE_RULES_KEY, []))
+        return allowed_versions if len(allowed_versions) > 0 else None
+
+    def check_dependency(self, source_name: str, package_name: str, package_version: str) -> None:
+        # Raises if the passlist does not allow the package, or any of the versions `package_version` would allow
+        if source_name not in self.exact_packages and source_name not in self.package_prefixes:
+            err_msg = f"Unapproved source `{source_name}` used; can not trust document"
+            raise ValueError(err_msg)
+        allowed_versions = self.get_allowed_versions(source_name, package_name)
+        if allowed_versions is None:
+            err_msg = f"`{package_name}` from `{source_name}` is not a trusted package; can not trust document"
+            raise ValueError(err_msg)
+        if ANY_VERSION in allowed_versions:
+            return
+        try:
+            is_allowed_version = package_version != "" and is_version_range_subset(
+                package_version, tuple(allowed_versions)
+            )
+        except ValueError as e:
+            err_msg = f"`{package_name}` from `{source_name}` requests invalid versions `{package_version}`: {e}"
+            raise ValueError(err_msg) from e
+        if not is_allowed_version:
+            allowed_versions_str = ", ".join(
+                f"`{allowed_version}`" for allowed_version in sorted(set(allowed_versions))
+            )
+            err_msg = (
+                f"`{package_name}{package_version}` from `{source_name}` is outside of the trusted versions "
+                f"({allowed_versions_str}); can not trust document"
+            )
+            raise ValueError(err_msg)
+
+
+Passlist = Union[CompiledPasslist, list[str]]  # compiled, or the entries to compile
+_compiled_passlists: dict[tuple[str, ...], CompiledPasslist] = {}
+_compiled_passlist_files: dict[tuple[str, int, int], CompiledPasslist] = {}  # keyed on path, mtime, and size
+
+
+def compile_passlist(passlist_entries: list[str]) -> CompiledPasslist:
+    # Compiled passlists are kept for reuse, since the same passlist is usually checked against many documents
+    cache_key = tuple(passlist_entries)
+    compiled_passlist = _compiled_passlists.get(cache_key)
+    if compiled_passlist is None:
+        compiled_passlist = _compile_passlist(passlist_entries)
+        _remember_compiled_passlist(compiled_passlist)
+    return compiled_passlist
+
+
+def as_compiled_passlist(passlist: Passlist) -> CompiledPasslist:
+    return passlist if isinstance(passlist, CompiledPasslist) else compile_passlist(passlist)
+
+
+def resolve_passlist(
+    passlist_entries: Optional[list[str]], compiled_passlist_path: Optional[str] = None
+) -> Optional[CompiledPasslist]:
+    # The passlist of a compilation, resolved once and handed to every scan of it. A compiled passlist file is only
+    # read again once it changes, so long-lived processes (batch workers, the daemon) load it once.
+    if compiled_passlist_path is None:
+        return None if passlist_entries is None else compile_passlist(passlist_entries)
+    file_stat = os.stat(compiled_passlist_path)
+    cache_key = (os.path.abspath(compiled_passlist_path), file_stat.st_mtime_ns, file_stat.st_size)
+    compiled_passlist = _compiled_passlist_files.get(cache_key)
+    if compiled_passlist is None:
+        compiled_passlist = load_compiled_passlist(compiled_passlist_path)
+        if len(_compiled_passlist_files) >= _COMPILED_PASSLIST_CACHE_SIZE:
+            del _compiled_passlist_files[next(iter(_compiled_passlist_files))]  # the oldest
+        _compiled_passlist_files[cache_key] = compiled_passlist
+    return compiled_passlist
+
+
+def load_compiled_passlist(compiled_passlist_path: str) -> CompiledPasslist:
+    with open(compiled_passlist_path) as compiled_passlist_file:
+        compiled_passlist = CompiledPasslist.model_validate_json(compiled_passlist_file.read())
+    if compiled_passlist.format_version != PASSLIST_FORMAT_VERSION:
+        err_msg = (
+            f"Compiled passlist `{compiled_passlist_path}` has format version {compiled_passlist.format_version}, "
+            f"expected {PASSLIST_FORMAT_VERSION}; recompile it"
+        )
+        raise ValueError(err_msg)
+    _remember_compiled_passlist(compiled_passlist)
+    return compiled_passlist
+
+
+def save_compiled_passlist(compiled_passlist: CompiledPasslist, compiled_passlist_path: str) -> None:
+    destination_dir = os.path.dirname(os.path.abspath(compiled_passlist_path))
+    file_descriptor, temp_path = tempfile.mkstemp(dir=destination_dir, suffix=".json.tmp")
+    try:
+        with os.fdopen(file_descriptor, "w") as temp_file:
+            temp_file.write(compiled_passlist.model_dump_json())
+        replace_file(temp_path, compiled_passlist_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def normalize_package_name(source_name: str, package_name: str) -> str:
+    if _PLAIN_PACKAGE_NAME.fullmatch(package_name) is None:
+        return package_name
+    if source_name == "pypi":
+        return _PEP_503_SEPARATORS.sub("-", package_name).lower()
+    return package_name.lower()  # conda tells `-`, `_`, and `.` apart
+
+
+def _compile_passlist(passlist_entries: list[str]) -> CompiledPasslist:
+    exact_packages: dict[str, dict[str, list[str]]] = {}
+    package_prefixes: dict[str, dict[str, Any]] = {}
+    for passlist_entry in passlist_entries:
+        source_name, package_pattern, allowed_versions = _parse_passlist_entry(passlist_entry)
+        if package_pattern.endswith(_PACKAGE_WILDCARD):
+            trie_node = package_prefixes.setdefault(source_name, {})
+            for character in normalize_package_name(source_name, package_pattern[:-1]):
+                trie_node = trie_node.setdefault(character, {})
+            _add_allowed_versions(trie_node.setdefault(_TRIE_RULES_KEY, []), allowed_versions)
+        else:
+            source_packages = exact_packages.setdefault(source_name, {})
+            normalized_name = normalize_package_name(source_name, package_pattern)
+            _add_allowed_versions(source_packages.setdefault(normalized_name, []), allowed_versions)
+    return CompiledPasslist(
+        entries=list(passlist_entries), exact_packages=exact_packages, package_prefixes=package_prefixes
+    )
+
+
+def _parse_passlist_entry(passlist_entry: str) -> tuple[str, str, str]:
+    entry = passlist_entry.strip().split("::")
+    if len(entry) != 2 or entry[0] == "":
+        err_msg = f"invalid whitelist entry: {passlist_entry}"
+        raise ValueError(err_msg)
+    source_name, package_pattern = (entry[0], entry[1])
+    allowed_versions = ANY_VERSION
+    if package_pattern.endswith("]") and "[" in package_pattern:
+        package_pattern, allowed_versions = package_pattern[:-1].rsplit("[", 1)
+        try:
+            parse_version_ranges(allowed_versions)
+        except ValueError as e:
+            err_msg = f"invalid whitelist entry: {passlist_entry} ({e})"
+            raise ValueError(err_msg) from e
+    if package_pattern == "" or _PACKAGE_WILDCARD in package_pattern[:-1]:
+        err_msg = f"invalid whitelist entry: {passlist_entry}"
+        raise ValueError(err_msg)
+    return source_name, package_pattern, allowed_versions
+
+
+def _add_allowed_versions(all_allowed_versions: list[str], allowed_versions: str) -> None:
+    if allowed_versions not in all_allowed_versions:
+        all_allowed_versions.append(allowed_versions)
+
+
+def _remember_compiled_passlist(compiled_passlist: CompiledPasslist) -> None:
+    if len(_compiled_passlists) >= _COMPILED_PASSLIST_CACHE_SIZE:
+        del _compiled_passlists[next(iter(_compiled_passlists))]  # the oldest
+    _compiled_passlists[tuple(compiled_passlist.entries)] = compiled_passlist
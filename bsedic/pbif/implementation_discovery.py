@@ -0,0 +1,328 @@
+### Static discovery of Process/Step implementations: package sources are parsed with `ast` instead of imported, so no
+### import-time code runs and no simulator is loaded just to find out what a package offers. Classes are followed
+### through imports and re-exports (also across packages), declared ports and config schemas are read when written as
+### literals, and a discovered implementation is only imported once something asks for it with `load()`.
+import ast
+import importlib
+import importlib.util
+import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, NamedTuple, Optional
+
+from pydantic import BaseModel
+
+from bsedic.utils.process_pool import get_process_pool_context, get_process_pool_worker_count
+
+# Implementations ultimately derive from these, by qualified name; anything from `process_bigraph` counts, since the
+# classes are re-exported from several of its modules
+ROOT_BASE_CLASS_KINDS: dict[str, str] = {"Process": "process", "Step": "step"}
+_ROOT_PACKAGE_NAME = "process_bigraph"
+_FILES_PER_WORKER_TASK = 16
+_INHERITABLE_FIELDS = ("inputs", "outputs", "config_schema")
+
+
+class DiscoveredImplementation(BaseModel):
+    module_name: str
+    class_name: str
+    kind: str  # `process` or `step`
+    bases: list[str]  # qualified names, as far as the imports tell
+    inputs: Optional[list[str]] = None  # port names; `None` when not declared as a literal
+    outputs: Optional[list[str]] = None
+    config_schema: Optional[dict[str, Any]] = None
+    abstraction: Optional[str] = None  # qualified name of the nearest ancestor declared in a context module
+    source_path: str
+    line_number: int
+
+    def get_address(self) -> str:
+        return f"local:{self.module_name}.{self.class_name}"
+
+    def load(self) -> type:
+        # The only place the implementation's module is actually imported
+        implementation: type = getattr(importlib.import_module(self.module_name), self.class_name)
+        return implementation
+
+
+class _ClassDeclaration(NamedTuple):
+    qualified_name: str
+    bases: list[str]
+    inputs: Optional[list[str]]
+    outputs: Optional[list[str]]
+    config_schema: Optional[dict[str, Any]]
+    declared_fields: frozenset[str]  # which of `inputs`, `outputs` and `config_schema` the class body declares itself
+    line_number: int
+
+
+class _ScannedSourceFile(NamedTuple):
+    module_name: str
+    source_path: str
+    classes: list[_ClassDeclaration]
+    imported_names: dict[str, str]  # qualified name within the module -> what it was imported as
+
+
+def discover_implementations(
+    module_names: list[str], context_module_names: Optional[list[str]] = None, max_workers: Optional[int] = None
+) -> list[DiscoveredImplementation]:
+    # Only classes from `module_names` are returned; `context_module_names` are scanned too, so that implementations
+    # deriving from (abstract) classes declared there are recognized
+    emitted_module_names = list(dict.fromkeys(module_names))
+    all_module_names = list(dict.fromkeys([*emitted_module_names, *(context_module_names or [])]))
+    source_files = [source_file for name in all_module_names for source_file in find_module_source_files(name)]
+    scanned_files: list[_ScannedSourceFile]
+    worker_count = get_process_pool_worker_count(len(source_files), max_workers)
+    if worker_count == 1:
+        scanned_files = [_scan_source_file(source_file) for source_file in source_files]
+    else:
+        with ProcessPoolExecutor(max_workers=worker_count, mp_context=get_process_pool_context()) as executor:
+            scanned_files = list(executor.map(_scan_source_file, source_files, chunksize=_FILES_PER_WORKER_TASK))
+    imported_names, declarations = _collect_class_declarations(scanned_files)
+    class_kinds = _determine_class_kinds(declarations, imported_names)
+    implementations: list[DiscoveredImplementation] = []
+    for scanned_file in scanned_files:
+        if not any(_is_within_module(scanned_file.module_name, name) for name in emitted_module_names):
+            continue
+        for declaration in scanned_file.classes:
+            kind = class_kinds.get(declaration.qualified_name)
+            if kind is None:
+                continue
+            ancestors = _iter_ancestors(declaration, declarations, imported_names)
+            inherited_fields = _inherit_fields(declaration, ancestors)
+            implementations.append(
+                DiscoveredImplementation(
+                    module_name=scanned_file.module_name,
+                    class_name=declaration.qualified_name.rsplit(".", 1)[1],
+                    kind=kind,
+                    bases=declaration.bases,
+                    inputs=inherited_fields.inputs,
+                    outputs=inherited_fields.outputs,
+                    config_schema=inherited_fields.config_schema,
+                    abstraction=_find_abstraction(
+                        _iter_ancestors(declaration, declarations, imported_names), context_module_names or []
+                    ),
+                    source_path=scanned_file.source_path,
+                    line_number=declaration.line_number,
+                )
+            )
+    return implementations
+
+
+def find_module_source_files(module_name: str) -> list[tuple[str, str]]:
+    # `(module name, source path)` of every Python source file of a module or package, found without importing it
+    try:
+        module_spec = importlib.util.find_spec(module_name)
+    except (ImportError, ValueError):
+        return []
+    if module_spec is None:
+        return []
+    if module_spec.submodule_search_locations is None:
+        if module_spec.origin is None or not module_spec.origin.endswith(".py"):
+            return []  # e.g. an extension module
+        return [(module_name, module_spec.origin)]
+    source_files: list[tuple[str, str]] = []
+    for package_dir in module_spec.submodule_search_locations:
+        for dir_path, dir_names, file_names in os.walk(package_dir):
+            dir_names[:] = sorted(
+                dir_name for dir_name in dir_names if dir_name.isidentifier() and dir_name != "__pycache__"
+            )
+            relative_parts = os.path.relpath(dir_path, package_dir).split(os.sep)
+            package_name = ".".join([module_name, *(part for part in relative_parts if part != os.curdir)])
+            for file_name in sorted(file_names):
+                if not file_name.endswith(".py") or not file_name[:-3].isidentifier():
+                    continue
+                submodule_name = package_name if file_name == "__init__.py" else f"{package_name}.{file_name[:-3]}"
+                source_files.append((submodule_name, os.path.join(dir_path, file_name)))
+    return source_files
+
+
+def _scan_source_file(source_file: tuple[str, str]) -> _ScannedSourceFile:
+    module_name, source_path = source_file
+    try:
+        with open(source_path, "rb") as source:
+            module_tree = ast.parse(source.read(), filename=source_path)
+    except (OSError, SyntaxError, ValueError):
+        return _ScannedSourceFile(module_name, source_path, [], {})
+    package_name = module_name if source_path.endswith("__init__.py") else module_name.rpartition(".")[0]
+    imported_names: dict[str, str] = {}
+    classes: list[_ClassDeclaration] = []
+    for statement in module_tree.body:  # only module-level declarations can be addressed
+        if isinstance(statement, ast.Import):
+            for alias in statement.names:
+                if alias.asname is not None:
+                    imported_names[alias.asname] = alias.name
+                else:
+                    top_level_name = alias.name.split(".")[0]
+                    imported_names[top_level_name] = top_level_name
+        elif isinstance(statement, ast.ImportFrom):
+            source_module = _resolve_import_source(statement, package_name)
+            for alias in statement.names:
+                if alias.name != "*":
+                    imported_names[alias.asname or alias.name] = f"{source_module}.{alias.name}"
+        elif isinstance(statement, ast.ClassDef):
+            classes.append(_scan_class(statement, module_name, imported_names))
+    return _ScannedSourceFile(
+        module_name,
+        source_path,
+        classes,
+        {f"{module_name}.{local_name}": target for local_name, target in imported_names.items()},
+    )
+
+
+def _resolve_import_source(statement: ast.ImportFrom, package_name: str) -> str:
+    if statement.level == 0:
+        return statement.module or ""
+    package_parts = package_name.split(".")
+    base_parts = package_parts[: len(package_parts) - (statement.level - 1)]
+    return ".".join([*base_parts, *([statement.module] if statement.module else [])])
+
+
+def _scan_class(class_node: ast.ClassDef, module_name: str, imported_names: dict[str, str]) -> _ClassDeclaration:
+    bases: list[str] = []
+    for base_node in class_node.bases:
+        base_name = _get_dotted_name(base_node)
+        if base_name is None:
+            continue
+        first_part, _, rest = base_name.partition(".")
+        qualified_base = imported_names.get(first_part, f"{module_name}.{first_part}")
+        bases.append(f"{qualified_base}.{rest}" if rest else qualified_base)
+    declared: dict[str, Any] = {}
+    for statement in class_node.body:
+        if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef)) and statement.name in ("inputs", "outputs"):
+            returned = statement.body[-1] if len(statement.body) > 0 else None
+            if isinstance(returned, ast.Return) and returned.value is not None:
+                declared[statement.name] = returned.value
+        elif isinstance(statement, (ast.Assign, ast.AnnAssign)):
+            targets = statement.targets if isinstance(statement, ast.Assign) else [statement.target]
+            for target in targets:
+                if isinstance(target, ast.Name) and statement.value is not None:
+                    declared[target.id] = statement.value
+    config_schema = _literal_eval(declared.get("config_schema"))
+    return _ClassDeclaration(
+        qualified_name=f"{module_name}.{class_node.name}",
+        bases=bases,
+        inputs=_get_port_names(declared.get("inputs")),
+        outputs=_get_port_names(declared.get("outputs")),
+        config_schema=config_schema if isinstance(config_schema, dict) else None,
+        declared_fields=frozenset(field for field in _INHERITABLE_FIELDS if field in declared),
+        line_number=class_node.lineno,
+    )
+
+
+def _collect_class_declarations(
+    scanned_files: list[_ScannedSourceFile],
+) -> tuple[dict[str, str], dict[str, _ClassDeclaration]]:
+    imported_names: dict[str, str] = {}
+    declarations: dict[str, _ClassDeclaration] = {}
+    for scanned_file in scanned_files:
+        imported_names.update(scanned_file.imported_names)
+        declarations.update((declaration.qualified_name, declaration) for declaration in scanned_file.classes)
+    return imported_names, declarations
+
+
+def _determine_class_kinds(
+    declarations: dict[str, _ClassDeclaration], imported_names: dict[str, str]
+) -> dict[str, str]:
+    # A class is a process/step when one of its bases is, following imports and re-exports, until nothing changes
+    class_kinds: dict[str, str] = {}
+    changed = True
+    while changed:
+        changed = False
+        for qualified_name, declaration in declarations.items():
+            if qualified_name in class_kinds:
+                continue
+            for base in declaration.bases:
+                canonical_base = _canonicalize(base, imported_names)
+                kind = class_kinds.get(canonical_base) or _get_root_kind(canonical_base)
+                if kind is not None:
+                    class_kinds[qualified_name] = kind
+                    changed = True
+                    break
+    return class_kinds
+
+
+def _iter_ancestors(
+    declaration: _ClassDeclaration, declarations: dict[str, _ClassDeclaration], imported_names: dict[str, str]
+) -> Iterator[_ClassDeclaration]:
+    # Breadth first, so nearer ancestors come first; ancestors declared outside the scanned modules are skipped
+    pending_bases = list(declaration.bases)
+    seen_bases: set[str] = set()
+    while len(pending_bases) > 0:
+        base = _canonicalize(pending_bases.pop(0), imported_names)
+        if base in seen_bases or base not in declarations:
+            continue
+        seen_bases.add(base)
+        yield declarations[base]
+        pending_bases += declarations[base].bases
+
+
+def _inherit_fields(declaration: _ClassDeclaration, ancestors: Iterable[_ClassDeclaration]) -> _ClassDeclaration:
+    # Fields the class does not declare itself come from the nearest ancestor that does (even if not as a literal)
+    inherited_fields = {field: getattr(declaration, field) for field in declaration.declared_fields}
+    for ancestor in ancestors:
+        if len(inherited_fields) == len(_INHERITABLE_FIELDS):
+            break
+        for field in ancestor.declared_fields:
+            inherited_fields.setdefault(field, getattr(ancestor, field))
+    return declaration._replace(
+        inputs=inherited_fields.get("inputs"),
+        outputs=inherited_fields.get("outputs"),
+        config_schema=inherited_fields.get("config_schema"),
+    )
+
+
+def _find_abstraction(ancestors: Iterable[_ClassDeclaration], context_module_names: list[str]) -> Optional[str]:
+    # The nearest ancestor declared in a context module
+    for ancestor in ancestors:
+        if any(_is_within_module(ancestor.qualified_name.rpartition(".")[0], name) for name in context_module_names):
+            return ancestor.qualified_name
+    return None
+
+
+def _canonicalize(qualified_name: str, imported_names: dict[str, str]) -> str:
+    # Follows re-exports back to where a name was declared
+    seen_names: set[str] = set()
+    while qualified_name in imported_names and qualified_name not in seen_names:
+        seen_names.add(qualified_name)
+        qualified_name = imported_names[qualified_name]
+    return qualified_name
+
+
+def _get_root_kind(qualified_name: str) -> Optional[str]:
+    module_name, _, class_name = qualified_name.rpartition(".")
+    if not _is_within_module(module_name, _ROOT_PACKAGE_NAME):
+        return None
+    return ROOT_BASE_CLASS_KINDS.get(class_name)
+
+
+def _is_within_module(module_name: str, parent_module_name: str) -> bool:
+    return module_name == parent_module_name or module_name.startswith(f"{parent_module_name}.")
+
+
+def _get_dotted_name(node: ast.expr) -> Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        parent_name = _get_dotted_name(node.value)
+        return None if parent_name is None else f"{parent_name}.{node.attr}"
+    if isinstance(node, ast.Subscript):  # e.g. `Process[Config]`
+        return _get_dotted_name(node.value)
+    return None
+
+
+def _get_port_names(node: Optional[ast.expr]) -> Optional[list[str]]:
+    if not isinstance(node, ast.Dict):
+        return None
+    port_names: list[str] = []
+    for key in node.keys:
+        if not isinstance(key, ast.Constant) or not isinstance(key.value, str):
+            return None  # e.g. `**other_ports`; the ports can not be known without running the code
+        port_names.append(key.value)
+    return port_names
+
+
+def _literal_eval(node: Optional[ast.expr]) -> Any:
+    if node is None:
+        return None
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return None
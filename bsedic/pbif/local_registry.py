@@ -1,26 +1,126 @@
 ### File that collects the abstract headers
+import functools
 import importlib.metadata
 import pkgutil
-import re
+from typing import Optional
 
+from bsedic.pbif.implementation_discovery import DiscoveredImplementation, discover_implementations
+from bsedic.pbif.registry_index import RegistryIndex, get_registry_index, parse_requirements
+from bsedic.sed.data_structure import ExperimentNodeImplementation
+from bsedic.sed.implementation_catalog import ImplementationCatalog, UnknownPortImplementation
+from bsedic.utils.input_types import RegistryDiscoveryMode
 
+BSAIL_PACKAGE_NAME = "bsail"
+
+
+def prepare_local_registry(discovery_mode: RegistryDiscoveryMode = RegistryDiscoveryMode.IMPORT) -> None:
+    if discovery_mode == RegistryDiscoveryMode.STATIC:
+        get_local_implementation_catalog()
+    else:
+        load_local_modules()
+
+
+@functools.cache  # even with the persistent index, long-lived processes only need to do this once
 def load_local_modules() -> None:
     print("Loading local registry...")
-    for package in importlib.metadata.distributions():
-        if not does_package_require_bsail(package):
-            continue
+    for entry in get_registry_index().find_dependents(BSAIL_PACKAGE_NAME):
         # If a package requires BSail, it probably has abstractions for us; worth importing.
-        recursive_dynamic_import(package.name)
+        for module_name in entry.top_level_modules:
+            recursive_dynamic_import(module_name)
+
+
+def refresh_implementation_catalog(
+    implementation_catalog: ImplementationCatalog,
+    registry_index: Optional[RegistryIndex] = None,
+    max_workers: Optional[int] = None,
+) -> int:
+    # Only distributions installed, upgraded, or removed since the catalog was last refreshed are looked at again; their
+    # sources are discovered statically, so nothing is imported. Returns how many implementations were upserted.
+    if registry_index is None:
+        registry_index = get_registry_index()
+    cataloged_mtimes = implementation_catalog.get_distribution_mtimes()
+    dependents = {entry.name: entry for entry in registry_index.find_dependents(BSAIL_PACKAGE_NAME)}
+    changed_dependents = [
+        entry for entry in dependents.values() if cataloged_mtimes.get(entry.name) != entry.metadata_mtime_ns
+    ]
+    implementation_catalog.remove_distributions(set(cataloged_mtimes) - set(dependents))
+    if len(changed_dependents) == 0:
+        return 0
+    print(f"Discovering implementations of {len(changed_dependents)} changed package(s)...")
+    distribution_by_module = {
+        module_name: entry.name for entry in changed_dependents for module_name in entry.top_level_modules
+    }
+    distribution_implementations: dict[str, tuple[int, list[ExperimentNodeImplementation]]] = {
+        entry.name: (entry.metadata_mtime_ns, []) for entry in changed_dependents
+    }
+    unknown_port_implementations: dict[str, list[UnknownPortImplementation]] = {
+        entry.name: [] for entry in changed_dependents
+    }
+    for discovered_implementation in discover_implementations(
+        list(distribution_by_module), [BSAIL_PACKAGE_NAME], max_workers
+    ):
+        if discovered_implementation.abstraction is None:
+            continue  # not an implementation of a BSail abstraction, so nothing can be routed to it
+        distribution_name = distribution_by_module[discovered_implementation.module_name.split(".")[0]]
+        node_implementation = _to_node_implementation(discovered_implementation)
+        if node_implementation is not None:
+            distribution_implementations[distribution_name][1].append(node_implementation)
+        else:
+            unknown_port_implementations[distribution_name].append(
+                UnknownPortImplementation(
+                    id=discovered_implementation.class_name,
+                    definition=_get_definition(discovered_implementation.abstraction),
+                    address=discovered_implementation.get_address(),
+                )
+            )
+    unknown_port_addresses = [
+        implementation.address
+        for implementations in unknown_port_implementations.values()
+        for implementation in implementations
+    ]
+    if len(unknown_port_addresses) > 0:
+        print(
+            f"Ports of {len(unknown_port_addresses)} implementation(s) could not be read statically, so they can not be"
+            f" routed to by port: {', '.join(unknown_port_addresses)}"
+        )
+    return implementation_catalog.upsert_distributions(distribution_implementations, unknown_port_implementations)
+
+
+@functools.cache  # once per process; queries are cheap after that
+def get_local_implementation_catalog() -> ImplementationCatalog:
+    implementation_catalog = ImplementationCatalog()
+    refresh_implementation_catalog(implementation_catalog)
+    return implementation_catalog
+
+
+def _to_node_implementation(
+    discovered_implementation: DiscoveredImplementation,
+) -> Optional[ExperimentNodeImplementation]:
+    # Only implementations of a BSail abstraction with (possibly inherited) literal ports can be routed to by port
+    if (
+        discovered_implementation.abstraction is None
+        or discovered_implementation.inputs is None
+        or discovered_implementation.outputs is None
+    ):
+        return None
+    try:
+        return ExperimentNodeImplementation(
+            id=discovered_implementation.class_name,
+            definition=_get_definition(discovered_implementation.abstraction),
+            inputs=set(discovered_implementation.inputs),
+            outputs=set(discovered_implementation.outputs),
+            address=discovered_implementation.get_address(),
+        )
+    except ValueError:  # e.g. a port name that is not a valid identifier
+        return None
+
+
+def _get_definition(abstraction: str) -> str:
+    return abstraction.rpartition(".")[2]
 
 
 def does_package_require_bsail(package: importlib.metadata.Distribution) -> bool:
-    for key in package.metadata:
-        if key != "Requires-Dist":
-            continue
-        if not re.match(r"bsail \([=><\d.]+,?[=><\d.]+\)", package.metadata[key]):
-            continue
-        return True
-    return False
+    return BSAIL_PACKAGE_NAME in parse_requirements(package.requires or [])
 
 
 def recursive_dynamic_import(package_name: str) -> list[str]:
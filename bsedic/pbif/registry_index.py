@@ -0,0 +1,233 @@
+### Persistent index of the installed distributions, so that finding the ones that provide abstractions does not walk
+### and parse every distribution's metadata on every run. The index remembers the modification time of every search
+### path directory and of every distribution's metadata; only paths whose contents changed are listed again, and only
+### distributions whose metadata changed are parsed again.
+import os
+import sys
+import tempfile
+from collections.abc import Iterable
+from email.parser import HeaderParser
+from typing import Optional
+
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.utils import canonicalize_name
+from pydantic import BaseModel
+
+from bsedic.utils.atomic_file import replace_file
+
+REGISTRY_INDEX_FORMAT_VERSION = 1
+REGISTRY_INDEX_PATH_ENVIRONMENT_VARIABLE = "BSEDIC_REGISTRY_INDEX"
+_METADATA_DIR_SUFFIXES = (".dist-info", ".egg-info")
+_METADATA_FILE_NAMES = ("METADATA", "PKG-INFO")
+_NON_MODULE_SUFFIXES = (*_METADATA_DIR_SUFFIXES, ".data", ".libs", ".pth")
+
+
+class RegistryIndexEntry(BaseModel):
+    name: str  # canonical (PEP 503) name
+    version: str
+    metadata_path: str  # the `.dist-info` / `.egg-info` directory
+    metadata_mtime_ns: int
+    requirements: dict[str, str]  # canonical name -> specifier, for every requirement that is not extra-only
+    top_level_modules: list[str]
+
+    def requires(self, package_name: str) -> bool:
+        return canonicalize_name(package_name) in self.requirements
+
+
+class RegistrySearchPath(BaseModel):
+    mtime_ns: int
+    metadata_paths: list[str]  # in directory order
+
+
+class RegistryIndex(BaseModel):
+    format_version: int = REGISTRY_INDEX_FORMAT_VERSION
+    search_paths: dict[str, RegistrySearchPath] = {}  # in `sys.path` order
+    entries: dict[str, RegistryIndexEntry] = {}  # by metadata path
+
+    def iter_distributions(self) -> Iterable[RegistryIndexEntry]:
+        # A distribution installed in several search paths is only found in the first, as with imports
+        seen_names: set[str] = set()
+        for search_path in self.search_paths.values():
+            for metadata_path in search_path.metadata_paths:
+                entry = self.entries[metadata_path]
+                if entry.name in seen_names:
+                    continue
+                seen_names.add(entry.name)
+                yield entry
+
+    def get_distribution(self, package_name: str) -> Optional[RegistryIndexEntry]:
+        canonical_name = canonicalize_name(package_name)
+        return next((entry for entry in self.iter_distributions() if entry.name == canonical_name), None)
+
+    def find_dependents(self, package_name: str) -> list[RegistryIndexEntry]:
+        return [entry for entry in self.iter_distributions() if entry.requires(package_name)]
+
+
+def get_registry_index_path() -> str:
+    registry_index_path = os.environ.get(REGISTRY_INDEX_PATH_ENVIRONMENT_VARIABLE)
+    if registry_index_path is not None:
+        return registry_index_path
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "bsedic", "registry_index.json")
+
+
+def get_registry_index(
+    search_paths: Optional[list[str]] = None, registry_index_path: Optional[str] = None
+) -> RegistryIndex:
+    # Loads the persisted index, brings it up to date with `search_paths` (`sys.path` by default), and persists it
+    # again if anything changed; an index that can not be read or written only costs a full scan
+    if registry_index_path is None:
+        registry_index_path = get_registry_index_path()
+    previous_index = _load_registry_index(registry_index_path)
+    registry_index = update_registry_index(previous_index, sys.path if search_paths is None else search_paths)
+    if registry_index != previous_index:
+        _save_registry_index(registry_index, registry_index_path)
+    return registry_index
+
+
+def update_registry_index(previous_index: RegistryIndex, search_paths: list[str]) -> RegistryIndex:
+    registry_index = RegistryIndex()
+    for search_path in dict.fromkeys(os.path.abspath(search_path or os.curdir) for search_path in search_paths):
+        try:
+            search_path_mtime_ns = os.stat(search_path).st_mtime_ns
+        except OSError:
+            continue
+        previous_search_path = previous_index.search_paths.get(search_path)
+        if previous_search_path is not None and previous_search_path.mtime_ns == search_path_mtime_ns:
+            metadata_paths = previous_search_path.metadata_paths  # nothing was installed or removed here
+        elif os.path.isdir(search_path):
+            metadata_paths = [
+                os.path.join(search_path, entry_name)
+                for entry_name in sorted(os.listdir(search_path))
+                if entry_name.endswith(_METADATA_DIR_SUFFIXES)
+            ]
+        else:
+            metadata_paths = []  # e.g. a zip file
+        indexed_metadata_paths: list[str] = []
+        for metadata_path in metadata_paths:
+            entry = _index_distribution(metadata_path, previous_index.entries.get(metadata_path))
+            if entry is not None:
+                registry_index.entries[metadata_path] = entry
+                indexed_metadata_paths.append(metadata_path)
+        registry_index.search_paths[search_path] = RegistrySearchPath(
+            mtime_ns=search_path_mtime_ns, metadata_paths=indexed_metadata_paths
+        )
+    return registry_index
+
+
+def parse_requirements(requires_dist: Iterable[str]) -> dict[str, str]:
+    # Requirements only needed for extras are left out; so are ones whose markers exclude this environment
+    requirements: dict[str, str] = {}
+    for requirement_str in requires_dist:
+        try:
+            requirement = Requirement(requirement_str)
+        except InvalidRequirement:
+            continue
+        if requirement.marker is not None and not requirement.marker.evaluate({"extra": ""}):
+            continue
+        requirements[canonicalize_name(requirement.name)] = str(requirement.specifier)
+    return requirements
+
+
+def _index_distribution(
+    metadata_path: str, previous_entry: Optional[RegistryIndexEntry]
+) -> Optional[RegistryIndexEntry]:
+    metadata_file_path = _find_metadata_file(metadata_path)
+    if metadata_file_path is None:
+        return None
+    metadata_mtime_ns = max(os.stat(metadata_path).st_mtime_ns, os.stat(metadata_file_path).st_mtime_ns)
+    if previous_entry is not None and previous_entry.metadata_mtime_ns == metadata_mtime_ns:
+        return previous_entry
+    with open(metadata_file_path, encoding="utf-8", errors="replace") as metadata_file:
+        metadata = HeaderParser().parse(metadata_file)
+    if metadata.get("Name") is None:
+        return None
+    requires_dist = metadata.get_all("Requires-Dist") or []
+    if metadata_path.endswith(".egg-info"):
+        requires_dist += _read_egg_info_requirements(metadata_path)
+    return RegistryIndexEntry(
+        name=canonicalize_name(metadata["Name"]),
+        version=metadata.get("Version", ""),
+        metadata_path=metadata_path,
+        metadata_mtime_ns=metadata_mtime_ns,
+        requirements=parse_requirements(requires_dist),
+        top_level_modules=_find_top_level_modules(metadata_path, metadata["Name"]),
+    )
+
+
+def _find_metadata_file(metadata_path: str) -> Optional[str]:
+    for metadata_file_name in _METADATA_FILE_NAMES:
+        metadata_file_path = os.path.join(metadata_path, metadata_file_name)
+        if os.path.isfile(metadata_file_path):
+            return metadata_file_path
+    return None
+
+
+def _read_egg_info_requirements(metadata_path: str) -> list[str]:
+    # Only the unconditional section of `requires.txt`, before the first `[extra]` header
+    requires_path = os.path.join(metadata_path, "requires.txt")
+    if not os.path.isfile(requires_path):
+        return []
+    requirement_strs: list[str] = []
+    with open(requires_path) as requires_file:
+        for line in requires_file:
+            requirement_str = line.strip()
+            if requirement_str.startswith("["):
+                break
+            if requirement_str != "":
+                requirement_strs.append(requirement_str)
+    return requirement_strs
+
+
+def _find_top_level_modules(metadata_path: str, distribution_name: str) -> list[str]:
+    # From `top_level.txt` if there is one, otherwise from the files the distribution installed
+    top_level_path = os.path.join(metadata_path, "top_level.txt")
+    if os.path.isfile(top_level_path):
+        with open(top_level_path) as top_level_file:
+            top_level_modules = [line.strip() for line in top_level_file if line.strip() != ""]
+        if len(top_level_modules) > 0:
+            return top_level_modules
+    record_path = os.path.join(metadata_path, "RECORD")
+    if os.path.isfile(record_path):
+        top_level_modules_found: dict[str, None] = {}
+        with open(record_path) as record_file:
+            for line in record_file:
+                installed_path = line.split(",", 1)[0]
+                first_component = installed_path.split("/", 1)[0]
+                if (
+                    first_component.endswith(_NON_MODULE_SUFFIXES)
+                    or first_component.startswith("__editable__")
+                    or first_component in ("", "..", "__pycache__")
+                ):
+                    continue
+                if "/" in installed_path or first_component.endswith(".py"):
+                    top_level_modules_found[first_component.removesuffix(".py")] = None
+        if len(top_level_modules_found) > 0:
+            return list(top_level_modules_found)
+    return [distribution_name.replace("-", "_").replace(".", "_")]
+
+
+def _load_registry_index(registry_index_path: str) -> RegistryIndex:
+    try:
+        with open(registry_index_path) as registry_index_file:
+            registry_index = RegistryIndex.model_validate_json(registry_index_file.read())
+    except (OSError, ValueError):
+        return RegistryIndex()
+    if registry_index.format_version != REGISTRY_INDEX_FORMAT_VERSION:
+        return RegistryIndex()
+    return registry_index
+
+
+def _save_registry_index(registry_index: RegistryIndex, registry_index_path: str) -> None:
+    destination_dir = os.path.dirname(os.path.abspath(registry_index_path))
+    try:
+        os.makedirs(destination_dir, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=destination_dir, suffix=".json.tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(file_descriptor, "w") as temp_file:
+            temp_file.write(registry_index.model_dump_json())
+        replace_file(temp_path, registry_index_path)
+    except OSError:
+        os.remove(temp_path)
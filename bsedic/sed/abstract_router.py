@@ -1,35 +1,139 @@
+import hashlib
+import json
 from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from typing import Optional
 
-from bsedic.sed.data_structure import ExperimentNodeImplementation, ExperimentNode
-
+from bsedic.pbif.local_registry import get_local_implementation_catalog
+from bsedic.sed.data_structure import ExperimentEntityList, ExperimentNode, ExperimentNodeImplementation
+from bsedic.sed.implementation_catalog import ImplementationCatalog
+from bsedic.sed.selection_policy import FirstMatchPolicy, SelectionPolicy, SelectionResult
 
 # Need to create a datasource of implementations with proper tags that tie back to their abstract concepts.
 # With all of the groups gathered covering all abstract concept, in each group pick one implementation based on
 # criteria that can be feed in (pick from the set).
 
+# definition, inputs, outputs; port order never matters
+_RoutingSignature = tuple[str, frozenset[str], frozenset[str]]
+
+
+class RoutingError(ValueError):
+    def __init__(self, unroutable_nodes: list[ExperimentNode]) -> None:
+        self.unroutable_nodes = unroutable_nodes
+        node_descriptions = [
+            f"`{node.id}` ({node.definition}; inputs: {', '.join(sorted(node.inputs)) or '-'}; "
+            f"outputs: {', '.join(sorted(node.outputs)) or '-'})"
+            for node in unroutable_nodes
+        ]
+        super().__init__(f"No implementation for {len(unroutable_nodes)} node(s):\n\t" + "\n\t".join(node_descriptions))
+
+
+def get_routing_signature(node: ExperimentNode) -> _RoutingSignature:
+    return node.definition, frozenset(node.inputs), frozenset(node.outputs)
+
+
 class AbstractRouter(ABC):
-    @abstractmethod
-    def abstract_entity_to_implementation(self, abstract_representation: ExperimentNode) -> ExperimentNodeImplementation:
-        pass
+    def __init__(self, selection_policy: Optional[SelectionPolicy] = None) -> None:
+        self.selection_policy = FirstMatchPolicy() if selection_policy is None else selection_policy
+
+    def get_routing_digest(self) -> Optional[str]:
+        # Changes whenever the router could route a node differently (its implementations or its selection policy
+        # changed), so routing results can be cached on it; `None` when that can not be told, and they must not be
+        return None
+
+    def abstract_entity_to_implementation(
+        self, abstract_representation: ExperimentNode
+    ) -> ExperimentNodeImplementation:
+        return self.select_implementation(abstract_representation).implementation
+
+    def select_implementation(self, abstract_representation: ExperimentNode) -> SelectionResult:
+        # The chosen implementation (with the node's id) and, depending on the policy, its predicted cost, which is also
+        # set on the implementation, so it is kept on the routed node
+        node_implementations_for_abstract = self._get_implementations(abstract_representation)
+        if len(node_implementations_for_abstract) == 0:
+            raise RoutingError([abstract_representation])
+        selection_result = self.selection_policy.select(abstract_representation, node_implementations_for_abstract)
+        return selection_result.model_copy(
+            update={
+                "implementation": selection_result.implementation.model_copy(
+                    update={"id": abstract_representation.id, "predicted_cost": selection_result.predicted_cost}
+                )
+            }
+        )
+
+    def route_entity_list(self, abstract_entity_list: ExperimentEntityList) -> ExperimentEntityList:
+        # Nodes sharing a routing signature are routed once; every node that can not be routed is reported at once
+        routed_by_signature: dict[_RoutingSignature, Optional[ExperimentNodeImplementation]] = {}
+        implementation_nodes: list[ExperimentNode] = []
+        unroutable_nodes: list[ExperimentNode] = []
+        for node in abstract_entity_list.nodes:
+            routing_signature = get_routing_signature(node)
+            if routing_signature not in routed_by_signature:
+                try:
+                    routed_by_signature[routing_signature] = self.abstract_entity_to_implementation(node)
+                except RoutingError:
+                    routed_by_signature[routing_signature] = None
+            routed = routed_by_signature[routing_signature]
+            if routed is None:
+                unroutable_nodes.append(node)
+            else:
+                implementation_nodes.append(routed.model_copy(update={"id": node.id}))
+        if len(unroutable_nodes) > 0:
+            raise RoutingError(unroutable_nodes)
+        return abstract_entity_list.model_copy(update={"nodes": implementation_nodes})
 
     @abstractmethod
-    def _get_implementations(self, abstract_representation: ExperimentNode) -> set[ExperimentNodeImplementation]:
+    def _get_implementations(self, abstract_representation: ExperimentNode) -> list[ExperimentNodeImplementation]:
+        # Every implementation that could implement the node, most preferred first
         pass
 
 
 class LocalRouter(AbstractRouter):
-    def abstract_entity_to_implementation(self, abstract_representation: ExperimentNode) -> ExperimentNodeImplementation:
-        input_constraint = abstract_representation.inputs
-        output_constraint = abstract_representation.outputs
-        node_implementations_for_abstract: set[ExperimentNodeImplementation] = self._get_implementations(abstract_representation)
+    def __init__(
+        self,
+        implementation_catalog: Optional[ImplementationCatalog] = None,
+        selection_policy: Optional[SelectionPolicy] = None,
+    ) -> None:
+        super().__init__(selection_policy)
+        self.implementation_catalog = (
+            get_local_implementation_catalog() if implementation_catalog is None else implementation_catalog
+        )
 
-        # Sift through the set, simple for now but will need retouch when what's being sifted for is better understood
-        for n in node_implementations_for_abstract:
-            if n.inputs == input_constraint and n.outputs == output_constraint:
-                return n
+    def get_routing_digest(self) -> Optional[str]:
+        return _hash_routing_state(self, self.implementation_catalog.get_digest())
 
-        raise Exception("No implementation for abstract entity to implement")
+    def _get_implementations(self, abstract_representation: ExperimentNode) -> list[ExperimentNodeImplementation]:
+        # Indexed on definition and port signature, so only matching implementations come back
+        return self.implementation_catalog.find_by_port_signature(
+            abstract_representation.inputs, abstract_representation.outputs, abstract_representation.definition
+        )
+
+
+class IndexedRouter(AbstractRouter):
+    # Every implementation is indexed up front by routing signature, so routing a node is a dictionary lookup, with no
+    # database round trip; meant for routing large entity lists.
+    def __init__(
+        self,
+        implementations: Optional[Iterable[ExperimentNodeImplementation]] = None,
+        selection_policy: Optional[SelectionPolicy] = None,
+    ) -> None:
+        super().__init__(selection_policy)
+        if implementations is None:
+            implementations = get_local_implementation_catalog().list_implementations()
+        self._index: dict[_RoutingSignature, list[ExperimentNodeImplementation]] = {}
+        implementations_hasher = hashlib.sha256()
+        for implementation in implementations:
+            self._index.setdefault(get_routing_signature(implementation), []).append(implementation)
+            implementations_hasher.update(implementation.model_dump_json().encode("utf-8"))
+        self._implementations_digest = implementations_hasher.hexdigest()  # order matters: it is the preference order
+
+    def get_routing_digest(self) -> Optional[str]:
+        return _hash_routing_state(self, self._implementations_digest)
+
+    def _get_implementations(self, abstract_representation: ExperimentNode) -> list[ExperimentNodeImplementation]:
+        return self._index.get(get_routing_signature(abstract_representation), [])
 
-    def _get_implementations(self, abstract_representation: ExperimentNode):
-        pass
 
+def _hash_routing_state(router: AbstractRouter, implementations_digest: str) -> str:
+    routing_state = [type(router).__qualname__, implementations_digest, router.selection_policy.get_digest()]
+    return hashlib.sha256(json.dumps(routing_state).encode("utf-8")).hexdigest()
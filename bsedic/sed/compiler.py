@@ -1,12 +1,52 @@
-from typing import Any, TypeAlias, Union
+import hashlib
+import itertools
+import json
+import socket
+from collections import Counter
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, BinaryIO, Optional, TypeAlias, TypeVar, Union
 
-from bsedic.sed.data_structure import ExperimentEntityList
+from bsedic.sed.abstract_router import AbstractRouter, IndexedRouter, RoutingError
+from bsedic.sed.data_structure import ExperimentEntityList, ExperimentNode, ExperimentNodeImplementation
+from bsedic.sed.node_fingerprint import compute_node_fingerprints
+from bsedic.sed.pbif_emitter import DEFAULT_PBIF_BUFFER_BYTES, emit_node_fragments, iter_pbif_json, write_pbif_stream
+from bsedic.sed.stage_cache import DEFAULT_STAGE_CACHE_MAX_BYTES, StageCache
+from bsedic.utils.process_pool import get_process_pool_context, get_process_pool_worker_count
 
 
+class CompilerWorkerPool(Enum):
+    SERIAL = 0
+    THREAD = 1
+    PROCESS = 2  # uses every core; the router must be picklable (e.g. an `IndexedRouter`, not a `LocalRouter`)
+
+
+@dataclass
 class SedCompilerSettings:
-    pass
+    router: Optional[AbstractRouter] = None  # `None` routes with an `IndexedRouter` over the local catalog
+    stage_cache_path: Optional[str] = None  # per-node stage outputs; `None` compiles every node on every compile
+    stage_cache_max_bytes: int = DEFAULT_STAGE_CACHE_MAX_BYTES
+    # Validation (stage 0) and routing (stage 2) are per node, so they run on chunks of nodes on a pool of workers
+    worker_pool: CompilerWorkerPool = CompilerWorkerPool.SERIAL
+    max_workers: Optional[int] = None
+    nodes_per_task: int = 256
+
+    def __post_init__(self) -> None:
+        if self.nodes_per_task <= 0:
+            err_msg = f"Nodes per compiler task must be positive, not {self.nodes_per_task}"
+            raise ValueError(err_msg)
+
 
+class SedCompilationError(ValueError):
+    def __init__(self, error_messages: list[str]) -> None:
+        self.error_messages = error_messages
+        super().__init__("Invalid experiment:\n\t" + "\n\t".join(error_messages))
 
+
+_TaskArgument = TypeVar("_TaskArgument")
+_TaskResult = TypeVar("_TaskResult")
 _schema_element = Union[str, list[str], "_schema"]
 _schema: TypeAlias = dict[str, _schema_element]
 
@@ -16,12 +56,70 @@ class SedCompiler:
     def __init__(self, settings: SedCompilerSettings, shims: Any) -> None:
         self._settings = settings
         self._shims = shims
+        self._router = settings.router
+        self._stage_cache = (
+            None
+            if settings.stage_cache_path is None
+            else StageCache(settings.stage_cache_path, settings.stage_cache_max_bytes)
+        )
 
-    def compile(self) -> str:
-        raise NotImplementedError()
+    def __enter__(self) -> "SedCompiler":
+        return self
 
-    def _compile_stage_0(self) -> list[str]:  # Validate Sed2, return list of error messages
-        raise NotImplementedError()
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        # Closes the stage cache; the compiler can not compile afterwards
+        if self._stage_cache is not None:
+            self._stage_cache.close()
+
+    # TODO: Start from Sed2 (stage 1) once it has a representation; compilation starts from the abstract entity list
+    def compile(self, abstract_entity_list: ExperimentEntityList) -> str:
+        error_messages = self._compile_stage_0(abstract_entity_list)
+        if len(error_messages) > 0:
+            raise SedCompilationError(error_messages)
+        return self._compile_stage_3(self._compile_stage_2(abstract_entity_list))
+
+    def compile_to_stream(
+        self,
+        abstract_entity_list: ExperimentEntityList,
+        destination: Union[BinaryIO, socket.socket],
+        buffer_bytes: int = DEFAULT_PBIF_BUFFER_BYTES,
+    ) -> int:
+        # Like `compile`, but the PBIF is written to `destination` as it is generated; returns the bytes written
+        error_messages = self._compile_stage_0(abstract_entity_list)
+        if len(error_messages) > 0:
+            raise SedCompilationError(error_messages)
+        return self._compile_stage_3_streaming(self._compile_stage_2(abstract_entity_list), destination, buffer_bytes)
+
+    def _compile_stage_0(
+        self, abstract_entity_list: ExperimentEntityList
+    ) -> list[str]:  # Validate, return list of error messages
+        node_id_counts = Counter(node.id for node in abstract_entity_list.nodes)
+        duplicate_node_ids = sorted(node_id for node_id, count in node_id_counts.items() if count > 1)
+        if len(duplicate_node_ids) > 0:  # nodes can not be told apart, so nothing else can be checked
+            return [f"node id `{node_id}` is used more than once" for node_id in duplicate_node_ids]
+        error_messages: list[str] = []
+        node_error_messages = self._compile_incrementally(
+            0,
+            abstract_entity_list,
+            lambda nodes: {
+                node_id: output
+                for chunk_outputs in self._map_node_chunks(_validate_nodes, abstract_entity_list.definitions, nodes)
+                for node_id, output in chunk_outputs.items()
+            },
+        )
+        for node in abstract_entity_list.nodes:
+            error_messages += json.loads(node_error_messages[node.id])
+        # Not cached per node: whether a wiring's end exists is not part of the fingerprint of the node at its other end
+        for wiring in abstract_entity_list.wirings:
+            error_messages += [
+                f"wiring `{wiring.id}` {direction} unknown node `{node_id}`"
+                for direction, node_id in (("comes from", wiring.output), ("leads into", wiring.input))
+                if node_id not in node_id_counts
+            ]
+        return error_messages
 
     def _compile_stage_1(self) -> ExperimentEntityList:  # Sed2 -> Abstract Entity List
         raise NotImplementedError()
@@ -29,13 +127,45 @@ class SedCompiler:
     def _compile_stage_2(
         self, abstract_entity_list: ExperimentEntityList
     ) -> ExperimentEntityList:  # Abstract Entity List -> Implementation Entity List
-        raise NotImplementedError()
+        if self._router is None:
+            self._router = IndexedRouter()
+        router = self._router
+
+        def route_nodes(nodes: list[ExperimentNode]) -> dict[str, str]:
+            # Every chunk is routed in full, so that every unroutable node is reported, in node order
+            routed_nodes: dict[str, str] = {}
+            unroutable_nodes: list[ExperimentNode] = []
+            for chunk_routed_nodes, chunk_unroutable_nodes in self._map_node_chunks(
+                _route_nodes, (router, abstract_entity_list.definitions), nodes
+            ):
+                routed_nodes.update(chunk_routed_nodes)
+                unroutable_nodes += chunk_unroutable_nodes
+            if len(unroutable_nodes) > 0:
+                raise RoutingError(unroutable_nodes)
+            return routed_nodes
+
+        # Routing results depend on the router's implementations and policy, not only on the node, so they are cached per
+        # router state, and not at all when a router can not tell its state
+        routing_digest = router.get_routing_digest()
+        if routing_digest is None:
+            routed_implementations = route_nodes(abstract_entity_list.nodes)
+        else:
+            routed_implementations = self._compile_incrementally(2, abstract_entity_list, route_nodes, routing_digest)
+        return abstract_entity_list.model_copy(
+            update={
+                "nodes": [
+                    ExperimentNodeImplementation.model_validate_json(routed_implementations[node.id])
+                    for node in abstract_entity_list.nodes
+                ]
+            }
+        )
 
     # TODO: This seems to need some level of processing from stage 2; especially if we're doing true compilation
     #   The `ExperimentEntityList` should be adjusted as such.
     def _compile_stage_3(
         self, implementation_entity_list: ExperimentEntityList
     ) -> str:  # Implementation Entity List -> Absolute-path PBIF (APPBIF)
+        # Not cached, as emitting a node is cheaper than looking it up (see `_compile_stage_3_streaming`)
         composition_schema: _schema = {"state": {}, "composition": {}, "bridge": {}, "interface": {}}
         for node in implementation_entity_list.nodes:
             composition = composition_schema["composition"]
@@ -44,16 +174,96 @@ class SedCompiler:
             state = composition_schema["state"]
             if not isinstance(state, dict):
                 raise TypeError()  # should never be reached
-            composition[node.id] = {
-                "_type": "step",
-                "config": {},
-                "inputs": "",  # this should be the type of
-                "outputs": "",
-            }
-            state[node.id] = {
-                "_type": "step",
-                "config": {},
-                "inputs": [],  #
-                "outputs": [],
+            node_fragment = emit_node_fragments(node)
+            composition[node.id] = node_fragment["composition"]
+            state[node.id] = node_fragment["state"]
+        return json.dumps(composition_schema)
+
+    def _compile_stage_3_streaming(
+        self,
+        implementation_entity_list: ExperimentEntityList,
+        destination: Union[BinaryIO, socket.socket],
+        buffer_bytes: int = DEFAULT_PBIF_BUFFER_BYTES,
+    ) -> int:  # Implementation Entity List -> APPBIF, node by node; not cached, as emitting a node is cheaper than that
+        return write_pbif_stream(iter_pbif_json(implementation_entity_list.nodes), destination, buffer_bytes)
+
+    def _compile_incrementally(
+        self,
+        stage: int,
+        entity_list: ExperimentEntityList,
+        compile_nodes: Callable[[list[ExperimentNode]], dict[str, str]],
+        context_digest: Optional[str] = None,
+    ) -> dict[str, str]:
+        # Serialized stage output by node id. Only nodes whose effective fingerprint (which covers every node upstream)
+        # is not in the stage cache are compiled, all at once. Outputs that also depend on something besides the nodes
+        # are cached under the `context_digest` of that too.
+        if self._stage_cache is None:
+            return compile_nodes(entity_list.nodes)
+        node_fingerprints = compute_node_fingerprints(entity_list)
+        if context_digest is not None:
+            node_fingerprints = {
+                node_id: hashlib.sha256(f"{fingerprint}:{context_digest}".encode()).hexdigest()
+                for node_id, fingerprint in node_fingerprints.items()
             }
-        return ""
+        cached_outputs = self._stage_cache.get_many(stage, node_fingerprints.values())
+        stage_outputs = {
+            node_id: cached_outputs[fingerprint]
+            for node_id, fingerprint in node_fingerprints.items()
+            if fingerprint in cached_outputs
+        }
+        stale_nodes = [node for node in entity_list.nodes if node.id not in stage_outputs]
+        if len(stale_nodes) > 0:
+            compiled_outputs = compile_nodes(stale_nodes)
+            self._stage_cache.put_many(
+                stage, {node_fingerprints[node_id]: output for node_id, output in compiled_outputs.items()}
+            )
+            stage_outputs.update(compiled_outputs)
+        return stage_outputs
+
+    def _map_node_chunks(
+        self,
+        task: Callable[[_TaskArgument, list[ExperimentNode]], _TaskResult],
+        task_argument: _TaskArgument,
+        nodes: list[ExperimentNode],
+    ) -> list[_TaskResult]:
+        # Results come back in chunk order, whichever chunk finishes first, so errors are reported deterministically
+        nodes_per_task = self._settings.nodes_per_task
+        chunks = [nodes[start : start + nodes_per_task] for start in range(0, len(nodes), nodes_per_task)]
+        if self._settings.worker_pool == CompilerWorkerPool.SERIAL or len(chunks) <= 1:
+            return [task(task_argument, chunk) for chunk in chunks]
+        executor: Executor
+        if self._settings.worker_pool == CompilerWorkerPool.THREAD:
+            executor = ThreadPoolExecutor(max_workers=self._settings.max_workers)
+        else:
+            worker_count = get_process_pool_worker_count(len(chunks), self._settings.max_workers)
+            if worker_count == 1:
+                return [task(task_argument, chunk) for chunk in chunks]
+            executor = ProcessPoolExecutor(max_workers=worker_count, mp_context=get_process_pool_context())
+        with executor:
+            return list(executor.map(task, itertools.repeat(task_argument), chunks))
+
+
+# Chunk tasks are module-level functions, so that process pools can pickle them
+def _validate_nodes(definitions: dict[str, str], nodes: list[ExperimentNode]) -> dict[str, str]:
+    return {node.id: json.dumps(_validate_node(node, definitions)) for node in nodes}
+
+
+def _route_nodes(
+    routing_context: tuple[AbstractRouter, dict[str, str]], nodes: list[ExperimentNode]
+) -> tuple[dict[str, str], list[ExperimentNode]]:
+    # Unroutable nodes are returned rather than raised, since `RoutingError` does not survive pickling
+    router, definitions = routing_context
+    try:
+        implementation_entity_list = router.route_entity_list(
+            ExperimentEntityList(definitions=definitions, nodes=nodes, wirings=[])
+        )
+    except RoutingError as e:
+        return {}, e.unroutable_nodes
+    return {node.id: node.model_dump_json() for node in implementation_entity_list.nodes}, []
+
+
+def _validate_node(node: ExperimentNode, definitions: dict[str, str]) -> list[str]:
+    error_messages: list[str] = []
+    if node.definition not in definitions:
+        error_messages.append(f"node `{node.id}` uses undeclared definition `{node.definition}`")
+    return error_messages
@@ -5,6 +5,10 @@ import pydantic
 
 _ID_TYPE: typing.TypeAlias = typing.Annotated[str, pydantic.Field(pattern=re.compile(r"^[_a-zA-Z]+\w*$"))]
 _SOURCE_TYPE: typing.TypeAlias = typing.Annotated[str, pydantic.Field(pattern=re.compile(r"^[_a-zA-Z]+[\w\-]*$"))]
+# A source, optionally with a `scheme:` prefix, e.g. `local:my_package.module.MyProcess`
+_ADDRESS_TYPE: typing.TypeAlias = typing.Annotated[
+    str, pydantic.Field(pattern=re.compile(r"^[_a-zA-Z]+[\w\-]*(:\S+)?$"))
+]
 _TYPE_TYPE: typing.TypeAlias = typing.Annotated[str, pydantic.Field(pattern=re.compile(r"^[_a-zA-Z]+[\w\-]*$"))]
 
 
@@ -24,9 +28,15 @@ class ExperimentNode(pydantic.BaseModel):
     outputs: set[_ID_TYPE]
 
 
-class ExperimentNodeImplementation(ExperimentNode):
-    address: _SOURCE_TYPE
+class PredictedCost(pydantic.BaseModel):
+    runtime_seconds: float
+    peak_memory_bytes: int
+    measurement_count: int
+
 
+class ExperimentNodeImplementation(ExperimentNode):
+    address: _ADDRESS_TYPE
+    predicted_cost: typing.Optional[PredictedCost] = None  # set when routed with a policy that predicts costs
 
 
 class ExperimentWiring(pydantic.BaseModel):
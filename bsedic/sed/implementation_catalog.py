@@ -0,0 +1,218 @@
+### Local SQLite catalog of the implementations installed packages provide, so routing is a pair of indexed lookups
+### rather than a scan of every plugin. Implementations are recorded per distribution, along with the distribution's
+### metadata modification time, so that a registry scan only has to rediscover (and upsert) the distributions that
+### changed since the catalog was last brought up to date. Implementations whose ports could not be read statically are
+### kept too, apart, so they can be listed; they can not be routed to by port.
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Iterable
+from typing import Optional
+
+from pydantic import BaseModel
+
+from bsedic.sed.data_structure import ExperimentNodeImplementation
+
+IMPLEMENTATION_CATALOG_FORMAT_VERSION = 2
+IMPLEMENTATION_CATALOG_PATH_ENVIRONMENT_VARIABLE = "BSEDIC_IMPLEMENTATION_CATALOG"
+_CONNECT_TIMEOUT_SECONDS = 30.0  # batch workers may wait on each other's writes
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS distributions (
+    name TEXT PRIMARY KEY,
+    metadata_mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS implementations (
+    address TEXT PRIMARY KEY,
+    distribution TEXT NOT NULL REFERENCES distributions (name) ON DELETE CASCADE,
+    id TEXT NOT NULL,
+    definition TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    outputs TEXT NOT NULL,
+    port_signature TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS implementations_by_definition ON implementations (definition, port_signature);
+CREATE INDEX IF NOT EXISTS implementations_by_port_signature ON implementations (port_signature);
+CREATE INDEX IF NOT EXISTS implementations_by_distribution ON implementations (distribution);
+CREATE TABLE IF NOT EXISTS unknown_port_implementations (
+    address TEXT PRIMARY KEY,
+    distribution TEXT NOT NULL REFERENCES distributions (name) ON DELETE CASCADE,
+    id TEXT NOT NULL,
+    definition TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS unknown_port_implementations_by_definition ON unknown_port_implementations (definition);
+CREATE INDEX IF NOT EXISTS unknown_port_implementations_by_distribution ON unknown_port_implementations (distribution);
+PRAGMA user_version = {IMPLEMENTATION_CATALOG_FORMAT_VERSION};
+"""
+
+
+class UnknownPortImplementation(BaseModel):
+    # An implementation of a definition whose ports are not known without importing it
+    id: str
+    definition: str
+    address: str
+
+
+def compute_port_signature(inputs: Iterable[str], outputs: Iterable[str]) -> str:
+    # Port order does not matter, so equal port sets always give the same signature
+    return json.dumps([sorted(inputs), sorted(outputs)], separators=(",", ":"))
+
+
+def get_implementation_catalog_path() -> str:
+    implementation_catalog_path = os.environ.get(IMPLEMENTATION_CATALOG_PATH_ENVIRONMENT_VARIABLE)
+    if implementation_catalog_path is not None:
+        return implementation_catalog_path
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "bsedic", "implementation_catalog.sqlite")
+
+
+class ImplementationCatalog:
+    # One connection per catalog, shared by the threads of a long-lived process (e.g. the daemon) under a lock
+    def __init__(self, catalog_path: Optional[str] = None) -> None:
+        self.catalog_path = get_implementation_catalog_path() if catalog_path is None else catalog_path
+        if self.catalog_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.catalog_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.catalog_path, timeout=_CONNECT_TIMEOUT_SECONDS, check_same_thread=False)
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        with self._lock, self._connection:
+            format_version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+            if format_version not in (0, IMPLEMENTATION_CATALOG_FORMAT_VERSION):
+                # An incompatible catalog is only a cache of a registry scan; start over
+                self._connection.executescript(
+                    "DROP TABLE IF EXISTS unknown_port_implementations; DROP TABLE IF EXISTS implementations; "
+                    "DROP TABLE IF EXISTS distributions;"
+                )
+            self._connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> "ImplementationCatalog":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def get_distribution_mtimes(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._connection.execute("SELECT name, metadata_mtime_ns FROM distributions").fetchall()
+        return dict(rows)
+
+    def upsert_distributions(
+        self,
+        distribution_implementations: dict[str, tuple[int, list[ExperimentNodeImplementation]]],
+        unknown_port_implementations: Optional[dict[str, list[UnknownPortImplementation]]] = None,
+    ) -> int:
+        # Bulk upsert from a registry scan, `name -> (metadata mtime, implementations)`, in one transaction; a
+        # distribution's implementations (with known ports or not) replace whatever it provided before. Returns how many
+        # implementations with known ports were written.
+        implementation_rows = [
+            (
+                implementation.address,
+                distribution_name,
+                implementation.id,
+                implementation.definition,
+                json.dumps(sorted(implementation.inputs)),
+                json.dumps(sorted(implementation.outputs)),
+                compute_port_signature(implementation.inputs, implementation.outputs),
+            )
+            for distribution_name, (_, implementations) in distribution_implementations.items()
+            for implementation in implementations
+        ]
+        unknown_port_rows = [
+            (implementation.address, distribution_name, implementation.id, implementation.definition)
+            for distribution_name, implementations in (unknown_port_implementations or {}).items()
+            if distribution_name in distribution_implementations
+            for implementation in implementations
+        ]
+        with self._lock, self._connection:
+            for table_name in ("implementations", "unknown_port_implementations"):
+                self._connection.executemany(
+                    f"DELETE FROM {table_name} WHERE distribution = ?",  # noqa: S608
+                    [(distribution_name,) for distribution_name in distribution_implementations],
+                )
+            self._connection.executemany(
+                "INSERT INTO distributions (name, metadata_mtime_ns) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET metadata_mtime_ns = excluded.metadata_mtime_ns",
+                [(name, metadata_mtime_ns) for name, (metadata_mtime_ns, _) in distribution_implementations.items()],
+            )
+            # An address provided by two distributions belongs to whichever was upserted last
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO implementations "
+                "(address, distribution, id, definition, inputs, outputs, port_signature) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                implementation_rows,
+            )
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO unknown_port_implementations (address, distribution, id, definition) "
+                "VALUES (?, ?, ?, ?)",
+                unknown_port_rows,
+            )
+        return len(implementation_rows)
+
+    def remove_distributions(self, distribution_names: Iterable[str]) -> None:
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "DELETE FROM distributions WHERE name = ?",
+                [(distribution_name,) for distribution_name in distribution_names],
+            )
+
+    def list_implementations(self) -> list[ExperimentNodeImplementation]:
+        return self._query("", ())
+
+    def find_by_definition(self, definition: str) -> list[ExperimentNodeImplementation]:
+        return self._query("WHERE definition = ?", (definition,))
+
+    def find_by_port_signature(
+        self, inputs: Iterable[str], outputs: Iterable[str], definition: Optional[str] = None
+    ) -> list[ExperimentNodeImplementation]:
+        port_signature = compute_port_signature(inputs, outputs)
+        if definition is None:
+            return self._query("WHERE port_signature = ?", (port_signature,))
+        return self._query("WHERE definition = ? AND port_signature = ?", (definition, port_signature))
+
+    def find_unknown_port_implementations(self, definition: Optional[str] = None) -> list[UnknownPortImplementation]:
+        condition, parameters = ("", ()) if definition is None else ("WHERE definition = ?", (definition,))
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT id, definition, address FROM unknown_port_implementations {condition} ORDER BY address",  # noqa: S608
+                parameters,
+            ).fetchall()
+        return [
+            UnknownPortImplementation(id=implementation_id, definition=definition, address=address)
+            for implementation_id, definition, address in rows
+        ]
+
+    def get_digest(self) -> str:
+        # Changes whenever any implementation (with known ports) is added, removed, or changed
+        hasher = hashlib.sha256()
+        with self._lock:
+            for row in self._connection.execute(
+                "SELECT address, id, definition, port_signature FROM implementations ORDER BY address"
+            ):
+                hasher.update(json.dumps(row).encode("utf-8"))
+        return hasher.hexdigest()
+
+    def get_implementation(self, address: str) -> Optional[ExperimentNodeImplementation]:
+        implementations = self._query("WHERE address = ?", (address,))
+        return implementations[0] if len(implementations) > 0 else None
+
+    def _query(self, condition: str, parameters: tuple[str, ...]) -> list[ExperimentNodeImplementation]:
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT id, definition, inputs, outputs, address FROM implementations {condition} ORDER BY address",  # noqa: S608
+                parameters,
+            ).fetchall()
+        return [
+            ExperimentNodeImplementation(
+                id=implementation_id,
+                definition=definition,
+                inputs=set(json.loads(inputs)),
+                outputs=set(json.loads(outputs)),
+                address=address,
+            )
+            for implementation_id, definition, inputs, outputs, address in rows
+        ]
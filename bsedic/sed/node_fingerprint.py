@@ -0,0 +1,115 @@
+### Per-node fingerprints of an entity list, for incremental compilation. A node's own fingerprint covers the node, the
+### source of its definition, and every wiring touching it; its effective fingerprint also covers the own fingerprints
+### of every node upstream of it (through wirings, from `output` to `input`), so editing a node changes the effective
+### fingerprint of exactly that node and everything downstream of it. Wiring cycles are collapsed into one unit first.
+import hashlib
+import json
+
+from bsedic.sed.data_structure import ExperimentEntityList
+
+NODE_FINGERPRINT_VERSION = "bsedic-node-fingerprint-v1"  # bump when what a fingerprint covers changes
+
+
+def compute_node_fingerprints(entity_list: ExperimentEntityList) -> dict[str, str]:
+    # Effective fingerprint by node id
+    own_fingerprints = _compute_own_fingerprints(entity_list)
+    upstream_ids: dict[str, list[str]] = {node_id: [] for node_id in own_fingerprints}
+    for wiring in entity_list.wirings:
+        if wiring.input in upstream_ids and wiring.output in upstream_ids:
+            upstream_ids[wiring.input].append(wiring.output)
+    component_fingerprints: dict[int, str] = {}
+    effective_fingerprints: dict[str, str] = {}
+    components = _find_strongly_connected_components(upstream_ids)  # every component after those upstream of it
+    component_of: dict[str, int] = {
+        node_id: index for index, component in enumerate(components) for node_id in component
+    }
+    for index, component in enumerate(components):
+        upstream_component_fingerprints = {
+            component_fingerprints[component_of[upstream_id]]
+            for node_id in component
+            for upstream_id in upstream_ids[node_id]
+            if component_of[upstream_id] != index
+        }
+        component_fingerprints[index] = _hash_fields([
+            *sorted(own_fingerprints[node_id] for node_id in component),
+            "<upstream>",
+            *sorted(upstream_component_fingerprints),
+        ])
+        for node_id in component:
+            effective_fingerprints[node_id] = _hash_fields([own_fingerprints[node_id], component_fingerprints[index]])
+    return effective_fingerprints
+
+
+def _compute_own_fingerprints(entity_list: ExperimentEntityList) -> dict[str, str]:
+    wiring_reprs: dict[str, list[str]] = {node.id: [] for node in entity_list.nodes}
+    for wiring in entity_list.wirings:
+        wiring_repr = json.dumps(wiring.model_dump(mode="json"), sort_keys=True)
+        for node_id in {wiring.output, wiring.input}:
+            if node_id in wiring_reprs:
+                wiring_reprs[node_id].append(wiring_repr)
+    own_fingerprints: dict[str, str] = {}
+    for node in entity_list.nodes:
+        node_repr = node.model_dump(mode="json")
+        node_repr["inputs"], node_repr["outputs"] = sorted(node.inputs), sorted(node.outputs)
+        own_fingerprints[node.id] = _hash_fields([
+            NODE_FINGERPRINT_VERSION,
+            json.dumps(node_repr, sort_keys=True),
+            entity_list.definitions.get(node.definition, "<undefined>"),
+            *sorted(wiring_reprs[node.id]),
+        ])
+    return own_fingerprints
+
+
+def _find_strongly_connected_components(upstream_ids: dict[str, list[str]]) -> list[list[str]]:
+    # Tarjan's algorithm, iteratively, since wiring chains can be far deeper than the recursion limit. Components come
+    # out upstream first, as Tarjan emits a component only after every component it reaches.
+    indices: dict[str, int] = {}
+    low_links: dict[str, int] = {}
+    stack: list[str] = []
+    on_stack: set[str] = set()
+    components: list[list[str]] = []
+    for root_id in upstream_ids:
+        if root_id in indices:
+            continue
+        work: list[tuple[str, int]] = [(root_id, 0)]
+        while len(work) > 0:
+            node_id, next_upstream = work.pop()
+            if next_upstream == 0:
+                indices[node_id] = low_links[node_id] = len(indices)
+                stack.append(node_id)
+                on_stack.add(node_id)
+            node_upstream_ids = upstream_ids[node_id]
+            if next_upstream < len(node_upstream_ids):
+                work.append((node_id, next_upstream + 1))
+                upstream_id = node_upstream_ids[next_upstream]
+                if upstream_id not in indices:
+                    work.append((upstream_id, 0))
+                elif upstream_id in on_stack:
+                    low_links[node_id] = min(low_links[node_id], indices[upstream_id])
+                continue
+            if low_links[node_id] == indices[node_id]:
+                components.append(_pop_component(node_id, stack, on_stack))
+            if len(work) > 0:
+                parent_id = work[-1][0]
+                low_links[parent_id] = min(low_links[parent_id], low_links[node_id])
+    return components
+
+
+def _pop_component(root_id: str, stack: list[str], on_stack: set[str]) -> list[str]:
+    root_position = len(stack) - 1
+    while stack[root_position] != root_id:  # from the top, where the component is
+        root_position -= 1
+    component = stack[root_position:]
+    del stack[root_position:]
+    on_stack.difference_update(component)
+    return component
+
+
+def _hash_fields(fields: list[str]) -> str:
+    hasher = hashlib.sha256()
+    for field in fields:
+        encoded_field = field.encode("utf-8")
+        # length-prefix every field so that no two different combinations of fields hash the same byte stream
+        hasher.update(len(encoded_field).to_bytes(8, "big"))
+        hasher.update(encoded_field)
+    return hasher.hexdigest()
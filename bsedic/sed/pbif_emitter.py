@@ -0,0 +1,68 @@
+### Streaming PBIF emitter for compiler stage 3: instead of building the whole `state`/`composition` dict and then the
+### whole string, the document is generated node by node and written through a bounded buffer, straight to a file or a
+### socket, so memory use does not grow with the number of nodes. The output is byte for byte what `json.dumps` makes
+### of the equivalent dict.
+import json
+import socket
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any, BinaryIO, Union
+
+from bsedic.sed.data_structure import ExperimentNode, ExperimentNodeImplementation
+
+DEFAULT_PBIF_BUFFER_BYTES = 64 * 1024
+
+
+def emit_node_fragments(node: ExperimentNode) -> dict[str, Any]:
+    # The node's `composition` and `state` entries
+    if not isinstance(node, ExperimentNodeImplementation):
+        err_msg = f"node `{node.id}` was not routed to an implementation"
+        raise TypeError(err_msg)
+    return {
+        "composition": {
+            "_type": "step",
+            "config": {},
+            "inputs": "",  # this should be the type of
+            "outputs": "",
+        },
+        "state": {
+            "_type": "step",
+            "address": node.address,
+            "config": {},
+            "inputs": sorted(node.inputs),
+            "outputs": sorted(node.outputs),
+        },
+    }
+
+
+def iter_pbif_json(implementation_nodes: Sequence[ExperimentNode]) -> Iterator[str]:
+    # Two passes over the nodes, one per section, so only one node's fragments exist at a time
+    for section_index, section in enumerate(("state", "composition")):
+        yield ("{" if section_index == 0 else "}, ") + json.dumps(section) + ": {"
+        for node_index, node in enumerate(implementation_nodes):
+            separator = "" if node_index == 0 else ", "
+            yield f"{separator}{json.dumps(node.id)}: {json.dumps(emit_node_fragments(node)[section])}"
+    yield '}, "bridge": {}, "interface": {}}'
+
+
+def write_pbif_stream(
+    pbif_chunks: Iterable[str],
+    destination: Union[BinaryIO, socket.socket],
+    buffer_bytes: int = DEFAULT_PBIF_BUFFER_BYTES,
+) -> int:
+    # Chunks are UTF-8 encoded and flushed whenever the buffer fills up; returns how many bytes were written
+    if buffer_bytes <= 0:
+        err_msg = f"PBIF buffer size must be positive, not {buffer_bytes}"
+        raise ValueError(err_msg)
+    write = destination.sendall if isinstance(destination, socket.socket) else destination.write
+    buffer = bytearray()
+    written_bytes = 0
+    for pbif_chunk in pbif_chunks:
+        buffer += pbif_chunk.encode("utf-8")
+        if len(buffer) >= buffer_bytes:
+            write(bytes(buffer))
+            written_bytes += len(buffer)
+            buffer.clear()
+    if len(buffer) > 0:
+        write(bytes(buffer))
+        written_bytes += len(buffer)
+    return written_bytes
@@ -0,0 +1,226 @@
+### Policies deciding which of the implementations matching a node a router picks. Besides taking the first match, a
+### policy can rank the candidates with a local cost model: runtime and peak memory measurements of earlier runs of
+### each implementation, kept on disk, so that e.g. large parameter scans end up on the fastest simulator backend.
+### Measurements are kept in SQLite and only ever added (trimmed per implementation), so that concurrent runs recording
+### them never lose each other's.
+import contextlib
+import hashlib
+import os
+import sqlite3
+import statistics
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from typing import Optional
+
+from pydantic import BaseModel, PrivateAttr
+
+from bsedic.sed.data_structure import ExperimentNode, ExperimentNodeImplementation, PredictedCost
+
+COST_MODEL_FORMAT_VERSION = 1
+COST_MODEL_PATH_ENVIRONMENT_VARIABLE = "BSEDIC_COST_MODEL"
+MAX_MEASUREMENTS_PER_IMPLEMENTATION = 32  # only the most recent runs count, so an upgraded implementation catches up
+_CONNECT_TIMEOUT_SECONDS = 30.0
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS measurements (
+    sequence INTEGER PRIMARY KEY AUTOINCREMENT,
+    address TEXT NOT NULL,
+    runtime_seconds REAL NOT NULL,
+    peak_memory_bytes INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS measurements_by_address ON measurements (address, sequence);
+PRAGMA user_version = {COST_MODEL_FORMAT_VERSION};
+"""
+
+
+class CostMeasurement(BaseModel):
+    runtime_seconds: float
+    peak_memory_bytes: int
+
+
+class SelectionResult(BaseModel):
+    implementation: ExperimentNodeImplementation
+    predicted_cost: Optional[PredictedCost] = None  # `None` when the policy does not predict, or nothing was measured
+
+
+class CostModel(BaseModel):
+    measurements: dict[str, list[CostMeasurement]] = {}  # by implementation address, oldest first
+    # How many of each address's (most recent) measurements are not stored yet; only those are saved
+    _unsaved_counts: dict[str, int] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context: object) -> None:
+        self._unsaved_counts = {address: len(measurements) for address, measurements in self.measurements.items()}
+
+    def record_measurement(self, address: str, runtime_seconds: float, peak_memory_bytes: int) -> None:
+        _check_measurement(address, runtime_seconds, peak_memory_bytes)
+        address_measurements = self.measurements.setdefault(address, [])
+        address_measurements.append(
+            CostMeasurement(runtime_seconds=runtime_seconds, peak_memory_bytes=peak_memory_bytes)
+        )
+        del address_measurements[:-MAX_MEASUREMENTS_PER_IMPLEMENTATION]
+        self._unsaved_counts[address] = min(self._unsaved_counts.get(address, 0) + 1, len(address_measurements))
+
+    def get_unsaved_measurements(self) -> dict[str, list[CostMeasurement]]:
+        return {
+            address: self.measurements[address][-unsaved_count:]
+            for address, unsaved_count in self._unsaved_counts.items()
+            if unsaved_count > 0
+        }
+
+    def mark_saved(self) -> None:
+        self._unsaved_counts.clear()
+
+    def predict(self, address: str) -> Optional[PredictedCost]:
+        # Medians, so that a single outlier run (a cold cache, a busy machine) does not flip the choice
+        address_measurements = self.measurements.get(address, [])
+        if len(address_measurements) == 0:
+            return None
+        return PredictedCost(
+            runtime_seconds=statistics.median(measurement.runtime_seconds for measurement in address_measurements),
+            peak_memory_bytes=int(
+                statistics.median(measurement.peak_memory_bytes for measurement in address_measurements)
+            ),
+            measurement_count=len(address_measurements),
+        )
+
+    def get_digest(self) -> str:
+        return hashlib.sha256(self.model_dump_json().encode("utf-8")).hexdigest()
+
+
+class SelectionPolicy(ABC):
+    @abstractmethod
+    def select(
+        self, abstract_representation: ExperimentNode, candidates: list[ExperimentNodeImplementation]
+    ) -> SelectionResult:
+        # `candidates` all match the node, and are never empty
+        pass
+
+    def get_digest(self) -> str:
+        # Changes whenever the policy could select differently from the same candidates, e.g. for compiler stage caches
+        return type(self).__qualname__
+
+
+class FirstMatchPolicy(SelectionPolicy):
+    def select(
+        self, abstract_representation: ExperimentNode, candidates: list[ExperimentNodeImplementation]
+    ) -> SelectionResult:
+        return SelectionResult(implementation=candidates[0])
+
+
+class CostModelPolicy(SelectionPolicy):
+    # Lowest predicted runtime first, then lowest peak memory; candidates never measured rank last, in their given
+    # order, so they are only picked when nothing better is known
+    def __init__(self, cost_model: Optional[CostModel] = None) -> None:
+        self.cost_model = load_cost_model() if cost_model is None else cost_model
+
+    def select(
+        self, abstract_representation: ExperimentNode, candidates: list[ExperimentNodeImplementation]
+    ) -> SelectionResult:
+        predicted_costs = [self.cost_model.predict(candidate.address) for candidate in candidates]
+        ranking = [
+            (predicted_cost.runtime_seconds, predicted_cost.peak_memory_bytes, index)
+            for index, predicted_cost in enumerate(predicted_costs)
+            if predicted_cost is not None
+        ]
+        if len(ranking) == 0:
+            return SelectionResult(implementation=candidates[0])
+        best_index = min(ranking)[2]
+        return SelectionResult(implementation=candidates[best_index], predicted_cost=predicted_costs[best_index])
+
+    def get_digest(self) -> str:
+        return f"{type(self).__qualname__}:{self.cost_model.get_digest()}"
+
+
+def get_cost_model_path() -> str:
+    cost_model_path = os.environ.get(COST_MODEL_PATH_ENVIRONMENT_VARIABLE)
+    if cost_model_path is not None:
+        return cost_model_path
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "bsedic", "cost_model.sqlite")
+
+
+def load_cost_model(cost_model_path: Optional[str] = None) -> CostModel:
+    # A missing or unreadable cost model is an empty one; it only ever guides a choice
+    if cost_model_path is None:
+        cost_model_path = get_cost_model_path()
+    if not os.path.exists(cost_model_path):
+        return CostModel()
+    cost_model = CostModel()
+    try:
+        with _connect(cost_model_path) as connection:
+            rows = connection.execute(
+                "SELECT address, runtime_seconds, peak_memory_bytes FROM measurements ORDER BY sequence"
+            ).fetchall()
+    except sqlite3.Error:
+        return CostModel()
+    for address, runtime_seconds, peak_memory_bytes in rows:
+        cost_model.measurements.setdefault(address, []).append(
+            CostMeasurement(runtime_seconds=runtime_seconds, peak_memory_bytes=peak_memory_bytes)
+        )
+    cost_model.mark_saved()
+    return cost_model
+
+
+def save_cost_model(cost_model: CostModel, cost_model_path: Optional[str] = None) -> None:
+    # Only adds the measurements recorded since the model was loaded (or last saved), in one transaction, so that
+    # measurements other runs stored meanwhile are kept
+    with _connect(get_cost_model_path() if cost_model_path is None else cost_model_path) as connection:
+        for address, measurements in cost_model.get_unsaved_measurements().items():
+            _insert_measurements(connection, address, measurements)
+    cost_model.mark_saved()
+
+
+def record_cost_measurement(
+    address: str, runtime_seconds: float, peak_memory_bytes: int, cost_model_path: Optional[str] = None
+) -> Optional[PredictedCost]:
+    # For whatever runs the implementations, after each run; one transaction, so concurrent runs are all recorded.
+    # Returns the implementation's updated prediction.
+    _check_measurement(address, runtime_seconds, peak_memory_bytes)
+    measurement = CostMeasurement(runtime_seconds=runtime_seconds, peak_memory_bytes=peak_memory_bytes)
+    with _connect(get_cost_model_path() if cost_model_path is None else cost_model_path) as connection:
+        _insert_measurements(connection, address, [measurement])
+        rows = connection.execute(
+            "SELECT runtime_seconds, peak_memory_bytes FROM measurements WHERE address = ? ORDER BY sequence",
+            (address,),
+        ).fetchall()
+    address_measurements = [
+        CostMeasurement(runtime_seconds=row_runtime_seconds, peak_memory_bytes=row_peak_memory_bytes)
+        for row_runtime_seconds, row_peak_memory_bytes in rows
+    ]
+    return CostModel(measurements={address: address_measurements}).predict(address)
+
+
+def _insert_measurements(connection: sqlite3.Connection, address: str, measurements: list[CostMeasurement]) -> None:
+    # Only the most recent measurements of the address are kept
+    connection.executemany(
+        "INSERT INTO measurements (address, runtime_seconds, peak_memory_bytes) VALUES (?, ?, ?)",
+        [(address, measurement.runtime_seconds, measurement.peak_memory_bytes) for measurement in measurements],
+    )
+    connection.execute(
+        "DELETE FROM measurements WHERE address = ? AND sequence NOT IN "
+        "(SELECT sequence FROM measurements WHERE address = ? ORDER BY sequence DESC LIMIT ?)",
+        (address, address, MAX_MEASUREMENTS_PER_IMPLEMENTATION),
+    )
+
+
+@contextlib.contextmanager
+def _connect(cost_model_path: str) -> Iterator[sqlite3.Connection]:
+    # One transaction, committed (or rolled back) and closed on leaving the `with` block
+    if cost_model_path != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(cost_model_path)), exist_ok=True)
+    connection = sqlite3.connect(cost_model_path, timeout=_CONNECT_TIMEOUT_SECONDS)
+    try:
+        with connection:
+            if connection.execute("PRAGMA user_version").fetchone()[0] not in (0, COST_MODEL_FORMAT_VERSION):
+                connection.execute("DROP TABLE IF EXISTS measurements")
+            connection.executescript(_SCHEMA)
+        with connection:
+            yield connection
+    finally:
+        connection.close()
+
+
+def _check_measurement(address: str, runtime_seconds: float, peak_memory_bytes: int) -> None:
+    if runtime_seconds < 0 or peak_memory_bytes < 0:
+        err_msg = f"Invalid measurement for `{address}`: {runtime_seconds} s, {peak_memory_bytes} bytes"
+        raise ValueError(err_msg)
@@ -0,0 +1,122 @@
+### Persistent cache of per-node compiler stage outputs, keyed on the stage and a node's effective fingerprint (see
+### `node_fingerprint`), so a recompile only redoes the nodes that changed or are downstream of a change. It is content
+### addressed: any experiment containing the same node, with the same upstream, reuses the same outputs. Outputs that
+### depend on more than the node (e.g. routing, on the router's implementations) are keyed on a digest of that too.
+### Since every edit adds outputs for the edited node and everything downstream of it, the cache is bounded in size, and
+### the least recently used outputs are evicted first.
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+
+STAGE_CACHE_FORMAT_VERSION = 3
+DEFAULT_STAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+_CONNECT_TIMEOUT_SECONDS = 30.0
+_MAX_QUERY_PARAMETERS = 500  # well below SQLite's limit on bound parameters
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS stage_outputs (
+    stage INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    output TEXT NOT NULL,
+    output_bytes INTEGER NOT NULL,
+    last_access_ns INTEGER NOT NULL,
+    PRIMARY KEY (stage, fingerprint)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS stage_outputs_by_last_access ON stage_outputs (last_access_ns);
+PRAGMA user_version = {STAGE_CACHE_FORMAT_VERSION};
+"""
+
+
+class StageCache:
+    def __init__(self, cache_path: str, max_bytes: int = DEFAULT_STAGE_CACHE_MAX_BYTES) -> None:
+        if max_bytes <= 0:
+            err_msg = f"Stage cache size cap must be positive, not {max_bytes}"
+            raise ValueError(err_msg)
+        self.cache_path = cache_path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        if cache_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(cache_path, timeout=_CONNECT_TIMEOUT_SECONDS, check_same_thread=False)
+        with self._lock, self._connection:
+            if self._connection.execute("PRAGMA user_version").fetchone()[0] not in (0, STAGE_CACHE_FORMAT_VERSION):
+                self._connection.executescript("DROP TABLE IF EXISTS stage_outputs;")
+            self._connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> "StageCache":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def get_many(self, stage: int, fingerprints: Iterable[str]) -> dict[str, str]:
+        # Serialized outputs by fingerprint, for every fingerprint that is cached; those are marked as just used
+        unique_fingerprints = list(dict.fromkeys(fingerprints))
+        outputs: dict[str, str] = {}
+        with self._lock, self._connection:
+            for start in range(0, len(unique_fingerprints), _MAX_QUERY_PARAMETERS):
+                chunk = unique_fingerprints[start : start + _MAX_QUERY_PARAMETERS]
+                placeholders = ", ".join("?" * len(chunk))
+                chunk_outputs = self._connection.execute(
+                    f"SELECT fingerprint, output FROM stage_outputs WHERE stage = ? AND fingerprint IN ({placeholders})",  # noqa: S608
+                    [stage, *chunk],
+                ).fetchall()
+                if len(chunk_outputs) > 0:
+                    self._connection.execute(
+                        "UPDATE stage_outputs SET last_access_ns = ? "  # noqa: S608
+                        f"WHERE stage = ? AND fingerprint IN ({placeholders})",
+                        [time.time_ns(), stage, *chunk],
+                    )
+                outputs.update(chunk_outputs)
+        self.hits += len(outputs)
+        self.misses += len(unique_fingerprints) - len(outputs)
+        return outputs
+
+    def put_many(self, stage: int, outputs: dict[str, str]) -> None:
+        last_access_ns = time.time_ns()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO stage_outputs (stage, fingerprint, output, output_bytes, last_access_ns) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (stage, fingerprint, output, len(fingerprint) + len(output.encode("utf-8")), last_access_ns)
+                    for fingerprint, output in outputs.items()
+                ],
+            )
+            self._evict_least_recently_used()
+
+    def get_total_bytes(self) -> int:
+        with self._lock:
+            return int(
+                self._connection.execute("SELECT COALESCE(SUM(output_bytes), 0) FROM stage_outputs").fetchone()[0]
+            )
+
+    def _evict_least_recently_used(self) -> None:
+        # Keeps the most recently used outputs that fit within the size cap; called within a transaction
+        total_bytes = self._connection.execute("SELECT COALESCE(SUM(output_bytes), 0) FROM stage_outputs").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+        self._connection.execute(
+            """
+            DELETE FROM stage_outputs WHERE (stage, fingerprint) IN (
+                SELECT stage, fingerprint FROM (
+                    SELECT stage, fingerprint, SUM(output_bytes) OVER (
+                        ORDER BY last_access_ns DESC, stage DESC, fingerprint ROWS UNBOUNDED PRECEDING
+                    ) AS newer_bytes
+                    FROM stage_outputs
+                ) WHERE newer_bytes > ?
+            )
+            """,
+            [self.max_bytes],
+        )
+
+    def get_statistics(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,43 @@
+### Atomic file replacement: contents are written to a temporary file next to the destination, which is then moved into
+### place, so readers never see a partial file. `tempfile.mkstemp` creates files only their owner can read, so before
+### the move, the temporary file gets the permissions the destination already has, or else those a plain `open` gives.
+import os
+import stat
+import threading
+from typing import Optional
+
+_DEFAULT_FILE_MODE = 0o666  # before the umask, as `open` creates files
+_umask_lock = threading.Lock()
+
+
+def replace_file(temp_path: str, destination_path: str) -> None:
+    # Moves a temporary file (from `tempfile.mkstemp`, in the same directory) to `destination_path`
+    try:
+        file_mode = stat.S_IMODE(os.stat(destination_path).st_mode)
+    except FileNotFoundError:
+        file_mode = _DEFAULT_FILE_MODE & ~get_umask()
+    os.chmod(temp_path, file_mode)
+    os.replace(temp_path, destination_path)
+
+
+def get_umask() -> int:
+    # Read rather than set where possible, since setting it (to read it back) is process-wide, and threads may be
+    # creating files meanwhile
+    umask = _read_umask_from_proc()
+    if umask is not None:
+        return umask
+    with _umask_lock:
+        umask = os.umask(0o022)
+        os.umask(umask)
+    return umask
+
+
+def _read_umask_from_proc() -> Optional[int]:
+    try:
+        with open("/proc/self/status") as status_file:
+            for line in status_file:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
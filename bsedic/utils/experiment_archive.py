@@ -1,36 +1,341 @@
 # This file contains utility functions to deal with parsing input archives for relevant info
+import copy
 import os
+import shutil
+import struct
+import sys
+import tempfile
 import zipfile
+import zlib
+from collections.abc import Iterable
+from typing import BinaryIO, Optional
+from xml.etree import ElementTree
 
+from bsedic.utils.atomic_file import replace_file
 
-def _extract_pbif_from_zip(archive_path: str, output_dir: str) -> str:
+_LOCAL_FILE_HEADER_SIZE = 30  # fixed-size part of a zip local file header
+_LOCAL_FILE_HEADER_NAME_LENGTHS_OFFSET = 26  # file name length, then extra field length; both little-endian uint16
+_DATA_DESCRIPTOR_FLAG = 0x08
+_ZIP64_EXTRA_FIELD_ID = 0x0001
+_COPY_CHUNK_SIZE = 1024 * 1024
+# Copying a member's raw data relies on `ZipFile` internals (`fp`, `start_dir`, `filelist`, `NameToInfo`), which are
+# only known to work as expected on these Python versions; on others, members are streamed through `ZipFile.open`
+_RAW_COPY_PYTHON_VERSIONS = ((3, 11), (3, 13))
+_RAW_COPY_ZIPFILE_ATTRIBUTES = ("fp", "start_dir", "filelist", "NameToInfo")
+_OMEX_MANIFEST_NAME = "manifest.xml"
+_PBIF_SUFFIXES = (".pbif", ".json")
+
+
+def get_extraction_destination(archive_path: str, output_dir: str) -> str:
     archive_shortname = os.path.basename(archive_path).split(".")[0]
-    extraction_destination = os.path.join(output_dir, archive_shortname)
+    return os.path.join(output_dir, archive_shortname)
+
+
+def _extract_pbifs_from_zip(archive_path: str, output_dir: str) -> list[str]:
+    extraction_destination = get_extraction_destination(archive_path, output_dir)
     os.makedirs(extraction_destination, exist_ok=True)
-    target_pbif = None
+    target_pbifs: list[str] = []
     with zipfile.ZipFile(archive_path) as archive:
         for name in archive.namelist():
             current_file = archive.extract(name, extraction_destination)
             if (not name.endswith(".pbif") and not name.endswith(".json")) or "/__MACOSX/._" in current_file:
                 continue
-            target_pbif = current_file  # Note: This scheme does not support multiple pbif!
-            # TODO: Allow for multi-pbif files? May require omex enforcment...
-    if target_pbif is None:
+            target_pbifs.append(current_file)
+    if len(target_pbifs) == 0:
         err_msg = f"Could not locate Process Bigraph Intermediate Format file within archive: {archive_path}"
         raise ValueError(err_msg)
-    return target_pbif
+    return target_pbifs
 
 
-def _extract_pbif_from_omex(archive_path: str, output_dir: str) -> str:
+def _extract_pbifs_from_omex(archive_path: str, output_dir: str) -> list[str]:
     # At the moment, we're not doing anything complicated...
-    return _extract_pbif_from_zip(archive_path, output_dir)
+    return _extract_pbifs_from_zip(archive_path, output_dir)
 
 
-def extract_archive_returning_pbif_path(archive_path: str, output_dir: str) -> str:
+def extract_archive_returning_pbif_paths(archive_path: str, output_dir: str) -> list[str]:
+    # Every PBIF in the archive, in archive order
     if archive_path.endswith(".omex"):
-        return _extract_pbif_from_omex(archive_path, output_dir)
+        return _extract_pbifs_from_omex(archive_path, output_dir)
     elif archive_path.endswith(".zip"):
-        return _extract_pbif_from_zip(archive_path, output_dir)
+        return _extract_pbifs_from_zip(archive_path, output_dir)
     else:
         err_msg = f"Unsupported archive: {archive_path}"
         raise TypeError(err_msg)
+
+
+def extract_archive_returning_pbif_path(archive_path: str, output_dir: str) -> str:
+    return extract_archive_returning_pbif_paths(archive_path, output_dir)[-1]  # the last PBIF, if there are several
+
+
+def read_pbifs_from_archive(archive_path: str) -> list[tuple[str, str]]:
+    # Selective alternative to `extract_archive_returning_pbif_paths`: only the central directory, the OMEX manifest (if
+    # any), and the PBIFs themselves are read, and nothing is written to disk. Returns each PBIF's member name and
+    # contents.
+    _validate_archive_path(archive_path)
+    with zipfile.ZipFile(archive_path) as archive:
+        return [(name, archive.read(name).decode("utf-8")) for name in locate_pbif_members(archive)]
+
+
+def read_pbif_from_archive(archive_path: str) -> tuple[str, str]:
+    _validate_archive_path(archive_path)
+    with zipfile.ZipFile(archive_path) as archive:
+        pbif_member_name = locate_pbif_member(archive)
+        return pbif_member_name, archive.read(pbif_member_name).decode("utf-8")
+
+
+def locate_pbif_members(archive: zipfile.ZipFile) -> list[str]:
+    # Every PBIF the OMEX manifest declares or, without a (usable) manifest, every PBIF in the central directory
+    pbif_member_names, _ = _get_pbif_members_from_manifest(archive)
+    if len(pbif_member_names) == 0:
+        pbif_member_names = [name for name in archive.namelist() if _is_pbif_member_name(name)]
+    if len(pbif_member_names) == 0:
+        err_msg = f"Could not locate Process Bigraph Intermediate Format file within archive: {archive.filename}"
+        raise ValueError(err_msg)
+    return pbif_member_names
+
+
+def locate_pbif_member(archive: zipfile.ZipFile) -> str:
+    _, master_member_names = _get_pbif_members_from_manifest(archive)
+    return (master_member_names or locate_pbif_members(archive))[-1]  # Like full extraction, the last PBIF wins
+
+
+def extract_archive_members(
+    archive_path: str, output_dir: str, member_names: Optional[Iterable[str]] = None
+) -> list[str]:
+    # Lazily materializes members of an archive that was read selectively, into the same location full extraction
+    # would have used; members already on disk are left alone. By default, every member is extracted.
+    extraction_destination = get_extraction_destination(archive_path, output_dir)
+    extracted_paths: list[str] = []
+    with zipfile.ZipFile(archive_path) as archive:
+        for name in archive.namelist() if member_names is None else member_names:
+            member_path = get_archive_member_path(extraction_destination, name)
+            if not os.path.exists(member_path):
+                member_path = archive.extract(name, extraction_destination)
+            extracted_paths.append(member_path)
+    return extracted_paths
+
+
+def get_archive_member_path(extraction_destination: str, member_name: str) -> str:
+    member_path = os.path.normpath(os.path.join(extraction_destination, member_name))
+    if os.path.commonpath([os.path.abspath(extraction_destination), os.path.abspath(member_path)]) != os.path.abspath(
+        extraction_destination
+    ):
+        err_msg = f"Archive member `{member_name}` would be extracted outside of `{extraction_destination}`"
+        raise ValueError(err_msg)
+    return member_path
+
+
+def _validate_archive_path(archive_path: str) -> None:
+    if not archive_path.endswith(".omex") and not archive_path.endswith(".zip"):
+        err_msg = f"Unsupported archive: {archive_path}"
+        raise TypeError(err_msg)
+
+
+def _is_pbif_member_name(member_name: str) -> bool:
+    return member_name.endswith(_PBIF_SUFFIXES) and "/__MACOSX/._" not in f"/{member_name}"
+
+
+def _get_pbif_members_from_manifest(archive: zipfile.ZipFile) -> tuple[list[str], list[str]]:
+    # COMBINE archives list their contents in `manifest.xml`; returns the declared PBIFs, and those flagged as `master`
+    if _OMEX_MANIFEST_NAME not in archive.NameToInfo:
+        return [], []
+    try:
+        # The bundled expat refuses external entities and bounds entity expansion, so `defusedxml` is not needed here
+        manifest = ElementTree.fromstring(archive.read(_OMEX_MANIFEST_NAME))  # noqa: S314
+    except ElementTree.ParseError:
+        return [], []
+    pbif_member_names: list[str] = []
+    master_member_names: list[str] = []
+    for content in manifest.iter():
+        if not content.tag.endswith("content"):  # tags are namespaced, e.g. `{http://...omex-manifest}content`
+            continue
+        member_name = content.get("location", "").removeprefix("./").lstrip("/")
+        if member_name not in archive.NameToInfo or not _is_pbif_member_name(member_name):
+            continue
+        pbif_member_names.append(member_name)
+        if content.get("master", "false").lower() == "true":
+            master_member_names.append(member_name)
+    return pbif_member_names, master_member_names
+
+
+def reconstitute_archive(
+    original_archive_path: str,
+    extracted_dir: Optional[str],
+    destination_path: str,
+    member_overrides: Optional[dict[str, bytes]] = None,
+    member_override_files: Optional[dict[str, str]] = None,
+) -> None:
+    # Rebuilds `destination_path` from the original archive and its (possibly modified) extraction in `extracted_dir`.
+    # Members whose extracted file is unchanged are copied as their original compressed bytes, so only modified or
+    # added files are recompressed; members whose extracted file was removed are dropped. When the archive was read
+    # selectively, `extracted_dir` is `None`: every member is copied as-is, except those replaced by `member_overrides`
+    # (contents) or `member_override_files` (paths of files on disk, which are never read into memory as a whole).
+    # The archive is written to a temporary file next to `destination_path` and moved into place, so readers never see
+    # a partial archive.
+    member_overrides = {} if member_overrides is None else member_overrides
+    member_override_files = {} if member_override_files is None else member_override_files
+    destination_dir = os.path.dirname(os.path.abspath(destination_path))
+    file_descriptor, temp_path = tempfile.mkstemp(dir=destination_dir, suffix=".zip.tmp")
+    os.close(file_descriptor)
+    try:
+        with (
+            zipfile.ZipFile(original_archive_path) as original_archive,
+            open(original_archive_path, "rb") as original_archive_file,
+            zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED) as new_archive,
+        ):
+            original_names: set[str] = set()
+            for member in original_archive.infolist():
+                original_names.add(member.filename.rstrip("/"))
+                _write_original_member(
+                    original_archive,
+                    original_archive_file,
+                    member,
+                    new_archive,
+                    extracted_dir,
+                    member_overrides,
+                    member_override_files,
+                )
+            for added_name, added_contents in member_overrides.items():
+                if added_name not in original_names:
+                    new_archive.writestr(added_name, added_contents)
+            for added_name, added_path in member_override_files.items():
+                if added_name not in original_names and added_name not in member_overrides:
+                    new_archive.write(added_path, added_name)
+            if extracted_dir is not None:
+                for added_path, added_name in _walk_extracted_dir(extracted_dir):
+                    if (
+                        added_name.rstrip("/") not in original_names
+                        and added_name not in member_overrides
+                        and added_name not in member_override_files
+                    ):
+                        new_archive.write(added_path, added_name)
+        replace_file(temp_path, destination_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _write_original_member(
+    original_archive: zipfile.ZipFile,
+    original_archive_file: BinaryIO,
+    member: zipfile.ZipInfo,
+    new_archive: zipfile.ZipFile,
+    extracted_dir: Optional[str],
+    member_overrides: dict[str, bytes],
+    member_override_files: dict[str, str],
+) -> None:
+    if member.filename in member_overrides:
+        new_archive.writestr(member.filename, member_overrides[member.filename])
+        return
+    if member.filename in member_override_files:
+        new_archive.write(member_override_files[member.filename], member.filename)
+        return
+    if extracted_dir is None:
+        _copy_member(original_archive, original_archive_file, member, new_archive)
+        return
+    extracted_path = os.path.join(extracted_dir, member.filename)
+    if not os.path.exists(extracted_path):
+        return  # removed since extraction
+    if member.is_dir() or _is_extracted_member_unchanged(member, extracted_path):
+        _copy_member(original_archive, original_archive_file, member, new_archive)
+    else:
+        new_archive.write(extracted_path, member.filename)
+
+
+def _is_extracted_member_unchanged(member: zipfile.ZipInfo, extracted_path: str) -> bool:
+    if os.path.getsize(extracted_path) != member.file_size:
+        return False
+    crc = 0
+    with open(extracted_path, "rb") as extracted_file:
+        while chunk := extracted_file.read(_COPY_CHUNK_SIZE):
+            crc = zlib.crc32(chunk, crc)
+    return crc == member.CRC
+
+
+def _copy_member(
+    original_archive: zipfile.ZipFile,
+    original_archive_file: BinaryIO,
+    member: zipfile.ZipInfo,
+    new_archive: zipfile.ZipFile,
+) -> None:
+    if _can_copy_raw(new_archive):
+        _copy_member_raw(original_archive_file, member, new_archive)
+    else:
+        _copy_member_streaming(original_archive, member, new_archive)
+
+
+def _can_copy_raw(new_archive: zipfile.ZipFile) -> bool:
+    lowest_version, highest_version = _RAW_COPY_PYTHON_VERSIONS
+    return lowest_version <= sys.version_info[:2] <= highest_version and all(
+        hasattr(new_archive, attribute) for attribute in _RAW_COPY_ZIPFILE_ATTRIBUTES
+    )
+
+
+def _copy_member_streaming(
+    original_archive: zipfile.ZipFile, member: zipfile.ZipInfo, new_archive: zipfile.ZipFile
+) -> None:
+    # Decompressed and recompressed (with the member's own compression), but never held in memory as a whole
+    new_member = copy.copy(member)
+    new_member.extra = _strip_zip64_extra_field(member.extra)
+    if member.is_dir():
+        new_archive.writestr(new_member, b"")
+        return
+    with (
+        original_archive.open(member) as original_member_file,
+        new_archive.open(new_member, "w", force_zip64=member.file_size > zipfile.ZIP64_LIMIT) as new_member_file,
+    ):
+        shutil.copyfileobj(original_member_file, new_member_file, _COPY_CHUNK_SIZE)
+
+
+def _copy_member_raw(original_archive_file: BinaryIO, member: zipfile.ZipInfo, new_archive: zipfile.ZipFile) -> None:
+    # Locate the member's compressed data after its local header, whose variable-length fields may differ from the
+    # central directory's copy
+    original_archive_file.seek(member.header_offset + _LOCAL_FILE_HEADER_NAME_LENGTHS_OFFSET)
+    name_length, extra_length = struct.unpack("<HH", original_archive_file.read(4))
+    original_archive_file.seek(member.header_offset + _LOCAL_FILE_HEADER_SIZE + name_length + extra_length)
+
+    new_member = copy.copy(member)
+    new_member.flag_bits &= ~_DATA_DESCRIPTOR_FLAG  # sizes and CRC are known up front, so no descriptor is written
+    new_member.extra = _strip_zip64_extra_field(member.extra)  # `FileHeader` re-adds it when the sizes need it
+    if new_archive.fp is None:
+        err_msg = "Can not copy into a closed archive"
+        raise ValueError(err_msg)
+    new_archive.fp.seek(new_archive.start_dir)
+    new_member.header_offset = new_archive.fp.tell()
+    new_archive.fp.write(new_member.FileHeader())
+    remaining_bytes = member.compress_size
+    while remaining_bytes > 0:
+        chunk = original_archive_file.read(min(_COPY_CHUNK_SIZE, remaining_bytes))
+        if not chunk:
+            err_msg = f"Archive member `{member.filename}` is truncated"
+            raise zipfile.BadZipFile(err_msg)
+        new_archive.fp.write(chunk)
+        remaining_bytes -= len(chunk)
+    # Register the member, so it is included in the central directory written when the archive is closed
+    new_archive.start_dir = new_archive.fp.tell()
+    new_archive.filelist.append(new_member)
+    new_archive.NameToInfo[new_member.filename] = new_member
+
+
+def _strip_zip64_extra_field(extra: bytes) -> bytes:
+    stripped = b""
+    position = 0
+    while position + 4 <= len(extra):
+        field_id, field_length = struct.unpack("<HH", extra[position : position + 4])
+        if field_id != _ZIP64_EXTRA_FIELD_ID:
+            stripped += extra[position : position + 4 + field_length]
+        position += 4 + field_length
+    return stripped
+
+
+def _walk_extracted_dir(extracted_dir: str) -> list[tuple[str, str]]:
+    entries: list[tuple[str, str]] = []
+    for dir_path, dir_names, file_names in os.walk(extracted_dir):
+        dir_names.sort()
+        relative_dir = os.path.relpath(dir_path, extracted_dir)
+        if relative_dir != ".":
+            entries.append((dir_path, relative_dir.replace(os.sep, "/") + "/"))
+        for file_name in sorted(file_names):
+            relative_path = os.path.normpath(os.path.join(relative_dir, file_name))
+            entries.append((os.path.join(dir_path, file_name), relative_path.replace(os.sep, "/")))
+    return entries
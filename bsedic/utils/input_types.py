@@ -1,7 +1,7 @@
+# Kept free of heavy imports (e.g. pydantic), since the CLI imports this module on every invocation, even `--help`.
 from dataclasses import dataclass
 from enum import Enum
-
-from pydantic import BaseModel
+from typing import Any
 
 
 class ContainerizationTypes(Enum):
@@ -17,49 +17,25 @@ class ContainerizationEngine(Enum):
     BOTH = 3
 
 
-class ContainerizationFileRepr(BaseModel):
-    representation: str
-
-
-class ExperimentPrimaryDependencies(BaseModel):
-    pypi_dependencies: list[str]
-    conda_dependencies: list[str]
-    _compact_repr: str
-
-    @staticmethod
-    def from_compact_repr(representation: str) -> "ExperimentPrimaryDependencies":
-        split_dep_type = representation.split(";")
-        if len(split_dep_type) != 2:
-            err_msg = f"Invalid primary dependency representation: {representation}"
-            raise ValueError(err_msg)
-        pypi_dependencies = split_dep_type[0].split(",")
-        conda_dependencies = split_dep_type[1].split(",")
-        return ExperimentPrimaryDependencies(pypi_dependencies=pypi_dependencies, conda_dependencies=conda_dependencies)
+class ArchiveExtractionMode(Enum):
+    FULL = 0  # every archive member is extracted to disk
+    SELECTIVE = 1  # only the PBIF is read, in memory; other members are copied from the archive when needed
 
-    def __init__(self, pypi_dependencies: list[str], conda_dependencies: list[str]) -> None:
-        super().__init__(pypi_dependencies=pypi_dependencies, conda_dependencies=conda_dependencies)
-        self.pypi_dependencies = pypi_dependencies
-        self.conda_dependencies = conda_dependencies
-        self._compact_repr = ",".join(pypi_dependencies) + ";" + ",".join(conda_dependencies)
 
-    def __str__(self) -> str:
-        pypi_dependencies: str = "PyPi Dependencies:\n\t" + "\n\t".join(self.pypi_dependencies)
-        conda_dependencies: str = "Conda Dependencies:\n\t" + "\n\t".join(self.conda_dependencies)
-        return pypi_dependencies + "\n" + ("-" * 25) + "\n" + conda_dependencies
+class DockerfileLayout(Enum):
+    MONOLITHIC = 0  # every dependency of a source in one `RUN`, in document order
+    LAYERED = 1  # a common base, then deterministic layers of dependencies, the most widely shared first
 
-    def __repr__(self) -> str:
-        pypi_dependencies: str = "pypi:" + ",pypi:".join(self.pypi_dependencies)
-        conda_dependencies: str = "conda:" + ",conda:".join(self.conda_dependencies)
-        return pypi_dependencies + "," + conda_dependencies
 
-    def get_compact_repr(self) -> str:
-        return self._compact_repr
+class DependencyScanMode(Enum):
+    TEXT = 0  # every address anywhere in the document text
+    STRUCTURED = 1  # only the `address` of process/step nodes in a JSON document; bulk numeric arrays are skipped
+    STREAMING = 2  # like `TEXT`, but the file is rewritten in place chunk by chunk, so memory use stays bounded
 
-    def get_pypi_dependencies(self) -> list[str]:
-        return self.pypi_dependencies
 
-    def get_conda_dependencies(self) -> list[str]:
-        return self.conda_dependencies
+class RegistryDiscoveryMode(Enum):
+    IMPORT = 0  # every submodule of every package that requires BSail is imported up front
+    STATIC = 1  # package sources are parsed instead; an implementation's module is imported only once it is selected
 
 
 @dataclass
@@ -69,3 +45,24 @@ class ProgramArguments:
     passlist_entries: list[str]
     containerization_type: ContainerizationTypes
     containerization_engine: ContainerizationEngine
+    result_cache_dir: str | None = None
+    result_cache_max_bytes: int | None = None
+    archive_extraction_mode: ArchiveExtractionMode = ArchiveExtractionMode.FULL
+    dependency_scan_mode: DependencyScanMode = DependencyScanMode.TEXT
+    package_index_snapshot_path: str | None = None
+    dockerfile_layout: DockerfileLayout = DockerfileLayout.MONOLITHIC
+    dockerfile_template: str | None = None  # a registered template name or a template file path; `None` is generic
+    offline_artifacts_dir: str | None = None  # wheelhouse, conda channel, micromamba, and runtime for offline builds
+    registry_discovery_mode: RegistryDiscoveryMode = RegistryDiscoveryMode.IMPORT
+    compiled_passlist_path: str | None = None  # a compiled passlist (JSON), used instead of `passlist_entries`
+
+
+def __getattr__(name: str) -> Any:
+    # The pydantic result models used to live here; they are re-exported lazily, so that importing the lightweight
+    # types above does not pay for importing pydantic.
+    if name in ("ContainerizationFileRepr", "ExperimentPrimaryDependencies"):
+        from bsedic.utils import result_types
+
+        return getattr(result_types, name)
+    err_msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(err_msg)
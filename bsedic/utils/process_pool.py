@@ -0,0 +1,21 @@
+### Worker pools that compilations start (dependency scans, implementation discovery). Compilations also run on the
+### threads of the compile daemon, and forking a process while other threads run can leave the workers with locks that
+### are never released; workers are started from a single-threaded fork server (or spawned) instead. Compilations that
+### already run in a worker (e.g. of a batch) do their work in-process, rather than multiplying the process count.
+import multiprocessing
+import os
+from multiprocessing.context import BaseContext
+from typing import Optional
+
+
+def get_process_pool_context() -> BaseContext:
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def get_process_pool_worker_count(task_count: int, max_workers: Optional[int] = None) -> int:
+    # How many workers to spread `task_count` tasks over; `1` means working in-process, without a pool
+    if multiprocessing.parent_process() is not None:
+        return 1
+    return max(1, min(task_count, max_workers or os.cpu_count() or 1))
@@ -0,0 +1,140 @@
+# This file contains an on-disk, content-addressed cache of compilation results, so that unchanged inputs skip
+# dependency determination, template filling, and container file conversion entirely.
+import contextlib
+import functools
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+from pydantic import BaseModel
+
+from bsedic.utils.atomic_file import replace_file
+from bsedic.utils.input_types import (
+    ContainerizationEngine,
+    ContainerizationTypes,
+    DependencyScanMode,
+    DockerfileLayout,
+)
+from bsedic.utils.result_types import ContainerizationFileRepr, ExperimentPrimaryDependencies
+
+DEFAULT_RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+_CACHE_KEY_VERSION = "bsedic-result-cache-v2"  # bump when the shape of cached results changes
+_ENTRY_SUFFIX = ".json"
+
+
+class CachedResult(BaseModel):
+    updated_documents: list[str]  # one per PBIF document, in the order they were compiled
+    dockerfile: str
+    singularity_definition: Optional[str] = None
+    pypi_dependencies: list[str]
+    conda_dependencies: list[str]
+
+    def get_primary_dependencies(self) -> ExperimentPrimaryDependencies:
+        return ExperimentPrimaryDependencies(self.pypi_dependencies, self.conda_dependencies)
+
+    def get_returned_template(self) -> ContainerizationFileRepr:
+        if self.singularity_definition is not None:
+            return ContainerizationFileRepr(representation=self.singularity_definition)
+        return ContainerizationFileRepr(representation=self.dockerfile)
+
+
+def compute_result_cache_key(
+    pb_document_strs: list[str],
+    passlist_entries: Optional[list[str]],
+    docker_template: str,
+    containerization_type: ContainerizationTypes,
+    containerization_engine: ContainerizationEngine,
+    dependency_scan_mode: DependencyScanMode = DependencyScanMode.TEXT,
+    package_index_snapshot_digest: Optional[str] = None,
+    dockerfile_layout: DockerfileLayout = DockerfileLayout.MONOLITHIC,
+) -> str:
+    hasher = hashlib.sha256()
+    fields: list[str] = [
+        _CACHE_KEY_VERSION,
+        str(len(pb_document_strs)),
+        *pb_document_strs,
+        "<no passlist>" if passlist_entries is None else "\n".join(passlist_entries),
+        docker_template,
+        containerization_type.name,
+        containerization_engine.name,
+        dependency_scan_mode.name,
+        "<no package index snapshot>" if package_index_snapshot_digest is None else package_index_snapshot_digest,
+        dockerfile_layout.name,
+    ]
+    for field in fields:
+        encoded_field = field.encode("utf-8")
+        # length-prefix every field so that no two different combinations of fields hash the same byte stream
+        hasher.update(len(encoded_field).to_bytes(8, "big"))
+        hasher.update(encoded_field)
+    return hasher.hexdigest()
+
+
+class ResultCache:
+    # Entries are single JSON files named by their key; an entry's mtime is its last use, which drives LRU eviction.
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_RESULT_CACHE_MAX_BYTES) -> None:
+        if max_bytes <= 0:
+            err_msg = f"Result cache size cap must be positive, not {max_bytes}"
+            raise ValueError(err_msg)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, cache_key: str) -> Optional[CachedResult]:
+        entry_path = self._get_entry_path(cache_key)
+        try:
+            with open(entry_path) as entry_file:
+                cached_result = CachedResult.model_validate_json(entry_file.read())
+            os.utime(entry_path)  # mark as most recently used
+        except (FileNotFoundError, ValueError):  # missing, evicted concurrently, or corrupt; all count as a miss
+            self.misses += 1
+            return None
+        self.hits += 1
+        return cached_result
+
+    def put(self, cache_key: str, cached_result: CachedResult) -> None:
+        # Write atomically, so concurrent readers (batch workers, the daemon) never observe a partial entry
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "w") as temp_file:
+                temp_file.write(cached_result.model_dump_json())
+            replace_file(temp_path, self._get_entry_path(cache_key))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self._evict_least_recently_used()
+
+    def get_statistics(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _get_entry_path(self, cache_key: str) -> str:
+        return os.path.join(self.cache_dir, cache_key + _ENTRY_SUFFIX)
+
+    def _evict_least_recently_used(self) -> None:
+        entries: list[tuple[float, int, str]] = []
+        total_bytes = 0
+        with os.scandir(self.cache_dir) as directory_entries:
+            for directory_entry in directory_entries:
+                if not directory_entry.name.endswith(_ENTRY_SUFFIX):
+                    continue
+                try:
+                    entry_stat = directory_entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry_stat.st_mtime, entry_stat.st_size, directory_entry.path))
+                total_bytes += entry_stat.st_size
+        entries.sort()
+        for _, entry_size, entry_path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):  # another process may have evicted it first
+                os.remove(entry_path)
+            total_bytes -= entry_size
+
+
+@functools.cache
+def get_result_cache(cache_dir: str, max_bytes: int = DEFAULT_RESULT_CACHE_MAX_BYTES) -> ResultCache:
+    # One instance per cache directory per process, so hit/miss counters accumulate in long-lived processes
+    return ResultCache(os.path.abspath(cache_dir), max_bytes)
@@ -0,0 +1,72 @@
+from pydantic import BaseModel
+
+
+class ContainerizationFileRepr(BaseModel):
+    representation: str
+
+
+class ExperimentPrimaryDependencies(BaseModel):
+    pypi_dependencies: list[str]
+    conda_dependencies: list[str]
+    _compact_repr: str
+
+    @staticmethod
+    def from_compact_repr(representation: str) -> "ExperimentPrimaryDependencies":
+        split_dep_type = representation.split(";")
+        if len(split_dep_type) != 2:
+            err_msg = f"Invalid primary dependency representation: {representation}"
+            raise ValueError(err_msg)
+        pypi_dependencies = split_dep_type[0].split(",")
+        conda_dependencies = split_dep_type[1].split(",")
+        return ExperimentPrimaryDependencies(pypi_dependencies=pypi_dependencies, conda_dependencies=conda_dependencies)
+
+    @staticmethod
+    def merge(all_dependencies: list["ExperimentPrimaryDependencies"]) -> "ExperimentPrimaryDependencies":
+        # Combines the environments of several documents into one; duplicates are dropped, first occurrence order kept
+        pypi_dependencies: dict[str, None] = {}
+        conda_dependencies: dict[str, None] = {}
+        for dependencies in all_dependencies:
+            pypi_dependencies.update(dict.fromkeys(dependencies.get_pypi_dependencies()))
+            conda_dependencies.update(dict.fromkeys(dependencies.get_conda_dependencies()))
+        return ExperimentPrimaryDependencies(list(pypi_dependencies), list(conda_dependencies))
+
+    def __init__(self, pypi_dependencies: list[str], conda_dependencies: list[str]) -> None:
+        super().__init__(pypi_dependencies=pypi_dependencies, conda_dependencies=conda_dependencies)
+        self.pypi_dependencies = pypi_dependencies
+        self.conda_dependencies = conda_dependencies
+        self._compact_repr = ",".join(pypi_dependencies) + ";" + ",".join(conda_dependencies)
+
+    def __str__(self) -> str:
+        pypi_dependencies: str = "PyPi Dependencies:\n\t" + "\n\t".join(self.pypi_dependencies)
+        conda_dependencies: str = "Conda Dependencies:\n\t" + "\n\t".join(self.conda_dependencies)
+        return pypi_dependencies + "\n" + ("-" * 25) + "\n" + conda_dependencies
+
+    def __repr__(self) -> str:
+        pypi_dependencies: str = "pypi:" + ",pypi:".join(self.pypi_dependencies)
+        conda_dependencies: str = "conda:" + ",conda:".join(self.conda_dependencies)
+        return pypi_dependencies + "," + conda_dependencies
+
+    def get_compact_repr(self) -> str:
+        return self._compact_repr
+
+    def get_pypi_dependencies(self) -> list[str]:
+        return self.pypi_dependencies
+
+    def get_conda_dependencies(self) -> list[str]:
+        return self.conda_dependencies
+
+
+class EnvironmentPartition(BaseModel):
+    name: str
+    build_context: str  # relative to the output directory
+    pypi_dependencies: list[str]
+    conda_dependencies: list[str]
+    processes: list[str]  # `local:` addresses of the processes that run in this environment
+
+    def get_primary_dependencies(self) -> ExperimentPrimaryDependencies:
+        return ExperimentPrimaryDependencies(self.pypi_dependencies, self.conda_dependencies)
+
+
+class CoordinationManifest(BaseModel):
+    environments: list[EnvironmentPartition]
+    processes: dict[str, list[str]]  # `local:` address -> names of the environments able to run it
@@ -2,13 +2,27 @@ import argparse
 import os
 import sys
 
-from bsedic.execution import execute_bsedic
-from bsedic.utils.input_types import ContainerizationEngine, ContainerizationTypes, ProgramArguments
+# Only lightweight modules are imported here; the compilation machinery (pydantic, spython, ...) is imported by `main`
+# on the code path that needs it, so `--help`, argument errors, and daemon forwarding start quickly.
+from bsedic.daemon_client import (
+    DAEMON_SOCKET_ENVIRONMENT_VARIABLE,
+    DAEMON_SOCKET_FILE_NAME,
+    forward_to_bsedic_daemon,
+    get_default_daemon_socket_path,
+    parse_daemon_socket_path,
+)
+from bsedic.utils.input_types import (
+    ArchiveExtractionMode,
+    ContainerizationEngine,
+    ContainerizationTypes,
+    DependencyScanMode,
+    DockerfileLayout,
+    ProgramArguments,
+    RegistryDiscoveryMode,
+)
 
 
-def get_program_arguments() -> ProgramArguments:
-    parser = _generate_argparse_parser()
-    args = parser.parse_args()
+def get_program_arguments(parser: argparse.ArgumentParser, args: argparse.Namespace) -> ProgramArguments:
     if args.target_containerization is not None and args.containerize is None:
         parser.print_help()
         print("Error: --target-containerization requires --containerize", file=sys.stderr)
@@ -16,6 +30,97 @@ def get_program_arguments() -> ProgramArguments:
     if args.target_containerization is None and args.containerize is not None:
         args.target_containerization = "docker"  # docker default, because apptainer is only linux
 
+    if args.batch:
+        _validate_batch_arguments(parser, args)
+    else:
+        _validate_input_file_path(parser, args)
+
+    whitelist_contents, compiled_passlist_path = _read_whitelist(parser, args)
+    if args.index_snapshot is not None:
+        args.index_snapshot = os.path.abspath(os.path.expanduser(args.index_snapshot))
+        if not os.path.isfile(args.index_snapshot):
+            parser.print_help()
+            print("`index-snapshot` must be a file that exists!", file=sys.stderr)
+            sys.exit(19)
+    _validate_dockerfile_template(parser, args)
+    _validate_offline_context(parser, args)
+    if args.cache_dir is not None:
+        args.cache_dir = os.path.abspath(os.path.expanduser(args.cache_dir))
+    containerization_type: ContainerizationTypes = ContainerizationTypes.NONE
+    containerization_engine: ContainerizationEngine = ContainerizationEngine.NONE
+    if args.containerize is not None:
+        containerization_type, containerization_engine = _determine_containerization(args)
+
+    return ProgramArguments(
+        input_file_path=args.input_file_path,
+        output_dir=args.output_directory,
+        passlist_entries=whitelist_contents,
+        containerization_type=containerization_type,
+        containerization_engine=containerization_engine,
+        result_cache_dir=args.cache_dir,
+        result_cache_max_bytes=None if args.cache_size is None else args.cache_size * 1024 * 1024,
+        archive_extraction_mode=ArchiveExtractionMode[args.extraction_mode.upper()],
+        dependency_scan_mode=DependencyScanMode[args.scan_mode.upper()],
+        package_index_snapshot_path=args.index_snapshot,
+        dockerfile_layout=DockerfileLayout[args.dockerfile_layout.upper()],
+        dockerfile_template=args.dockerfile_template,
+        offline_artifacts_dir=args.offline_context,
+        registry_discovery_mode=RegistryDiscoveryMode[args.discovery_mode.upper()],
+        compiled_passlist_path=compiled_passlist_path,
+    )
+
+
+def _validate_dockerfile_template(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    # Templates are parsed and their slots checked here, rather than once the first experiment is compiled
+    if args.dockerfile_template is None:
+        return
+    if args.dockerfile_layout != "monolithic":
+        parser.print_help()
+        print("error: `--dockerfile-template` only applies to the monolithic Dockerfile layout!", file=sys.stderr)
+        sys.exit(21)
+    if os.path.isfile(os.path.expanduser(args.dockerfile_template)):
+        args.dockerfile_template = os.path.abspath(os.path.expanduser(args.dockerfile_template))
+    from bsedic.pbif.containerization.template_registry import get_dockerfile_template
+
+    try:
+        get_dockerfile_template(args.dockerfile_template)
+    except ValueError as e:
+        parser.print_help()
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(20)
+
+
+def _read_whitelist(parser: argparse.ArgumentParser, args: argparse.Namespace) -> tuple[list[str] | None, str | None]:
+    # Returns the passlist entries, or the path of a compiled passlist, which is loaded where it is used (and only
+    # once per process) rather than turned back into entries to compile again
+    if args.whitelist is None:
+        return None, None
+    args.whitelist = os.path.abspath(os.path.expanduser(args.whitelist))
+    if not os.path.exists(args.whitelist) or not (os.path.isfile(args.whitelist) or os.path.islink(args.whitelist)):
+        parser.print_help()
+        print("`whitelist` must be a file that exists!", file=sys.stderr)
+        sys.exit(13)
+    if args.whitelist.endswith(".json"):  # a compiled passlist
+        return None, args.whitelist
+    with open(args.whitelist) as f:
+        return f.read().strip().split("\n"), None
+
+
+def _validate_offline_context(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    if args.offline_context is None:
+        return
+    if args.dockerfile_layout != "monolithic":
+        parser.print_help()
+        print("error: `--offline-context` only applies to the monolithic Dockerfile layout!", file=sys.stderr)
+        sys.exit(21)
+    args.offline_context = os.path.abspath(os.path.expanduser(args.offline_context))
+    if not os.path.isdir(args.offline_context):
+        parser.print_help()
+        print("`offline-context` must be a directory that exists!", file=sys.stderr)
+        sys.exit(22)
+
+
+def _validate_input_file_path(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
     args.input_file_path = os.path.abspath(os.path.expanduser(args.input_file_path))
     if (
         not os.path.exists(args.input_file_path)
@@ -41,28 +146,27 @@ def get_program_arguments() -> ProgramArguments:
     else:
         args.output_directory = args.input_file_path.parent
 
-    if args.whitelist is not None:
-        args.whitelist = os.path.abspath(os.path.expanduser(args.whitelist))
-        if not os.path.exists(args.whitelist) or not (os.path.isfile(args.whitelist) or os.path.islink(args.whitelist)):
-            parser.print_help()
-            print("`whitelist` must be a file that exists!", file=sys.stderr)
-            sys.exit(13)
-        with args.whitelist.open() as f:
-            whitelist_contents = f.read().strip().split("\n")
-    else:
-        whitelist_contents = None
-    containerization_type: ContainerizationTypes = ContainerizationTypes.NONE
-    containerization_engine: ContainerizationEngine = ContainerizationEngine.NONE
-    if args.containerize is not None:
-        containerization_type, containerization_engine = _determine_containerization(args)
 
-    return ProgramArguments(
-        input_file_path=args.input_file_path,
-        output_dir=args.output_directory,
-        passlist_entries=whitelist_contents,
-        containerization_type=containerization_type,
-        containerization_engine=containerization_engine,
-    )
+def _validate_batch_arguments(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    # In batch mode, `input_file_path` is a directory, glob pattern, or manifest file; each input found is validated
+    # individually while the batch runs, so that one bad input does not abort the whole batch.
+    if not any(glob_character in args.input_file_path for glob_character in "*?["):
+        args.input_file_path = os.path.abspath(os.path.expanduser(args.input_file_path))
+        if not os.path.exists(args.input_file_path):
+            parser.print_help()
+            print(
+                "error: in batch mode, `input_file_path` must be a directory, glob, or manifest file!", file=sys.stderr
+            )
+            sys.exit(16)
+    if args.output_directory is None:
+        parser.print_help()
+        print("error: batch mode requires `output_directory`!", file=sys.stderr)
+        sys.exit(17)
+    args.output_directory = os.path.abspath(os.path.expanduser(args.output_directory))
+    if not os.path.isdir(args.output_directory):
+        parser.print_help()
+        print("`output_directory` must be a directory that exists!", file=sys.stderr)
+        sys.exit(12)
 
 
 def _generate_argparse_parser() -> argparse.ArgumentParser:
@@ -71,7 +175,7 @@ def _generate_argparse_parser() -> argparse.ArgumentParser:
         description="""BSedic is a BioSimulators project designed to allow users to transform their
 biological experiments written in Sed into Process-Bigraph simulations.""",
     )
-    parser.add_argument("input_file_path", type=str)  # positional argument
+    parser.add_argument("input_file_path", type=str, nargs="?")  # positional argument; not needed with `--serve`
     parser.add_argument(
         "-c",
         "--containerize",
@@ -97,7 +201,109 @@ biological experiments written in Sed into Process-Bigraph simulations.""",
         "-w",
         "--whitelist",
         type=str,
-        help="path to a whitelist file that if specified, will declare valid packages to create an environment with. ",
+        help="path to a whitelist file that if specified, will declare valid packages to create an environment with. "
+        "One `source::package` entry per line; a package may end with `*` to allow every package starting with it, and "
+        "be followed by a range of allowed versions, e.g. `pypi::numpy[>=1.26,<3]`. A `.json` file is read as a "
+        "passlist compiled with `bsedic.pbif.dependency_resolution.whitelist.save_compiled_passlist`.",
+    )
+    parser.add_argument(
+        "--extraction-mode",
+        choices=["full", "selective"],
+        default="full",
+        help="how ZIP/OMEX archives are unpacked. `full` extracts every member to disk. `selective` reads only the "
+        "central directory and `manifest.xml` to find the PBIF, compiles it in memory, and copies every other member "
+        "into the output archive without extracting it; best for archives with large data files.",
+    )
+    parser.add_argument(
+        "--scan-mode",
+        choices=["text", "structured", "streaming"],
+        default="text",
+        help="how documents are searched for dependency addresses. `text` finds addresses anywhere in the document. "
+        "`structured` walks a JSON document and only reads the `address` of process/step nodes, skipping numeric "
+        "data arrays; best for documents carrying large `array` states. `streaming` works like `text`, but reads and "
+        "rewrites documents chunk by chunk, for documents larger than memory; results are not cached.",
+    )
+    parser.add_argument(
+        "--discovery-mode",
+        choices=["import", "static"],
+        default="import",
+        help="how installed packages that provide abstractions are searched for Process/Step implementations. "
+        "`import` imports every one of their modules up front. `static` parses their sources instead, in parallel, "
+        "so no module is imported until one of its implementations is actually selected. With `--serve`, also how the "
+        "daemon warms its registry.",
+    )
+    parser.add_argument(
+        "--dockerfile-layout",
+        choices=["monolithic", "layered"],
+        default="monolithic",
+        help="how generated Dockerfiles install dependencies. `monolithic` installs them in a single step. `layered` "
+        "starts from a base shared by every experiment, installs dependencies in deterministic layers (in batch mode, "
+        "the ones most shared across the batch first), and uses BuildKit cache mounts, so that images of different "
+        "experiments share layers; batch mode also writes a layer reuse report.",
+    )
+    parser.add_argument(
+        "--dockerfile-template",
+        type=str,
+        help="name of a built-in Dockerfile template, or path to a template file, used instead of the generic "
+        "template (e.g. for a different base image); templates must contain the `$${#PYPI_DEPENDENCIES}` and "
+        "`$${#CONDA_FORGE_DEPENDENCIES}` slots, and only apply to the monolithic layout.",
+    )
+    parser.add_argument(
+        "--offline-context",
+        type=str,
+        help="directory of artifacts for air-gapped builds: a `wheelhouse` of wheels/sdists, a local `conda-channel`, "
+        "a `micromamba` binary, and a `runtime` checkout. Generated containers install everything from these "
+        "(copied into the build context) instead of downloading it, with dependencies pinned to the versions "
+        "available, and the build context is checked for missing artifacts; results are not cached.",
+    )
+    parser.add_argument(
+        "--index-snapshot",
+        type=str,
+        help='path to a JSON snapshot of a package index (`{"packages": {"pypi": {"numpy": ["2.0.0", ...]}}}`); '
+        "if specified, every dependency is pinned to the newest version in it that satisfies the experiment.",
+    )
+    parser.add_argument(
+        "-b",
+        "--batch",
+        action="store_true",
+        help="treat `input_file_path` as a directory, glob pattern, or manifest file (one input per line), "
+        "and compile every input found using a pool of worker processes. Each input's outputs are written to its own "
+        "subdirectory of `output_directory`, alongside a summary of the batch.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="maximum number of worker processes to use in batch mode; defaults to the number of CPUs.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        help="directory of an on-disk result cache; inputs identical to a previous compilation "
+        "(same document, whitelist, template, and containerization) reuse its results instead of recompiling.",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        help="maximum size of the result cache in MiB; least recently used results are evicted first.",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="run a long-lived local compile daemon that keeps the registry warm; "
+        "later invocations forward their compile requests to it while it is running.",
+    )
+    parser.add_argument(
+        "--daemon-socket",
+        type=str,
+        help="path of the Unix domain socket of the compile daemon to serve on or forward to; only the user running "
+        f"the daemon can connect to it. Defaults to ${DAEMON_SOCKET_ENVIRONMENT_VARIABLE}, or "
+        f"`bsedic/{DAEMON_SOCKET_FILE_NAME}` in $XDG_RUNTIME_DIR (or the cache directory).",
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="always compile in this process, even if a compile daemon is running.",
     )
     parser.add_argument("-v", "--verbose", action="store_true")
     return parser
@@ -125,9 +331,39 @@ def _determine_containerization(args: argparse.Namespace) -> tuple[Containerizat
 
 
 def main():
-    prog_args = get_program_arguments()
+    parser = _generate_argparse_parser()
+    args = parser.parse_args()
     try:
-        execute_bsedic(prog_args)
+        daemon_socket_path = (
+            get_default_daemon_socket_path()
+            if args.daemon_socket is None
+            else parse_daemon_socket_path(args.daemon_socket)
+        )
+    except ValueError as e:
+        parser.print_help()
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(23)
+    if args.serve:
+        from bsedic.daemon import serve_bsedic_daemon
+
+        serve_bsedic_daemon(daemon_socket_path, RegistryDiscoveryMode[args.discovery_mode.upper()])
+        return
+    if args.input_file_path is None:
+        parser.print_help()
+        print("error: `input_file_path` is required unless running with `--serve`!", file=sys.stderr)
+        sys.exit(18)
+    prog_args = get_program_arguments(parser, args)
+    try:
+        if args.batch:
+            from bsedic.batch import execute_bsedic_batch
+
+            execute_bsedic_batch(prog_args, args.jobs)
+        elif args.no_daemon or forward_to_bsedic_daemon(prog_args, daemon_socket_path) is None:
+            from bsedic.execution import execute_bsedic
+
+            execute_bsedic(prog_args)
+        else:
+            print(f"Compiled by the BSedic daemon at {daemon_socket_path}")
     except Exception as e:
         print(e, file=sys.stderr)
 
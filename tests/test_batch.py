@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+import zipfile
+
+from bsedic.batch import (
+    BATCH_SUMMARY_FILE_NAME,
+    LAYER_REUSE_REPORT_FILE_NAME,
+    collect_batch_inputs,
+    execute_bsedic_batch,
+)
+from bsedic.utils.input_types import ContainerizationEngine, ContainerizationTypes, DockerfileLayout, ProgramArguments
+
+fake_input_file = """
+"python:pypi<numpy[>=2.0.0]>@numpy.random.rand"
+"python:pypi<process-bigraph[<1.0]>@process_bigraph.processes.ParameterScan"
+""".strip()
+
+
+def _write_archive(path: str, contents: str) -> None:
+    with zipfile.ZipFile(path, "w") as zip_ref:
+        zip_ref.writestr("inputFile.pbif", contents)
+
+
+def test_collect_batch_inputs_from_directory_glob_and_manifest() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name in ["b.omex", "a.pbif", "notes.txt"]:
+            with open(os.path.join(tmpdir, name), "w") as f:
+                f.write("")
+        expected = [os.path.join(tmpdir, "a.pbif"), os.path.join(tmpdir, "b.omex")]
+        assert collect_batch_inputs(tmpdir) == expected
+        assert collect_batch_inputs(os.path.join(tmpdir, "*")) == expected
+
+        manifest_path = os.path.join(tmpdir, "manifest.txt")
+        with open(manifest_path, "w") as manifest_file:
+            manifest_file.write("# nightly inputs\nb.omex\n\na.pbif\n")
+        assert collect_batch_inputs(manifest_path) == list(reversed(expected))
+
+
+def test_execute_bsedic_batch_reports_per_input_results() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_dir = os.path.join(tmpdir, "inputs")
+        output_dir = os.path.join(tmpdir, "outputs")
+        os.makedirs(input_dir)
+        os.makedirs(output_dir)
+        _write_archive(os.path.join(input_dir, "first.omex"), fake_input_file)
+        _write_archive(os.path.join(input_dir, "second.zip"), fake_input_file)
+        _write_archive(os.path.join(input_dir, "broken.omex"), "no addresses here")
+
+        batch_args = ProgramArguments(
+            input_dir, output_dir, None, ContainerizationTypes.SINGLE, ContainerizationEngine.DOCKER
+        )
+        summary = execute_bsedic_batch(batch_args, max_workers=2)
+
+        assert [os.path.basename(r.input_file_path) for r in summary.results] == [
+            "broken.omex",
+            "first.omex",
+            "second.zip",
+        ]
+        assert [r.succeeded for r in summary.results] == [False, True, True]
+        assert summary.results[0].error is not None
+        assert summary.results[1].primary_dependencies == "numpy>=2.0.0,process-bigraph<1.0;"
+        for name in ["first", "second"]:
+            assert os.path.isfile(os.path.join(output_dir, name, "Dockerfile"))
+        with open(os.path.join(output_dir, BATCH_SUMMARY_FILE_NAME)) as summary_file:
+            assert len(json.load(summary_file)["results"]) == 3
+
+
+def test_layered_batch_writes_layer_reuse_report() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_dir = os.path.join(tmpdir, "inputs")
+        output_dir = os.path.join(tmpdir, "outputs")
+        os.makedirs(input_dir)
+        os.makedirs(output_dir)
+        _write_archive(os.path.join(input_dir, "first.omex"), fake_input_file)
+        _write_archive(
+            os.path.join(input_dir, "second.omex"),
+            fake_input_file + '\n"python:pypi<scipy>@scipy.optimize.minimize"',
+        )
+
+        batch_args = ProgramArguments(
+            input_dir,
+            output_dir,
+            None,
+            ContainerizationTypes.SINGLE,
+            ContainerizationEngine.DOCKER,
+            dockerfile_layout=DockerfileLayout.LAYERED,
+        )
+        execute_bsedic_batch(batch_args, max_workers=2)
+
+        with open(os.path.join(output_dir, LAYER_REUSE_REPORT_FILE_NAME)) as report_file:
+            report = json.load(report_file)
+        assert report["experiment_count"] == 2
+        assert report["dependency_frequencies"]["pypi::scipy"] == 0.5
+        assert report["layered"]["dependency_reuse_ratio"] > report["monolithic"]["dependency_reuse_ratio"]
+        with open(os.path.join(output_dir, "second", "Dockerfile")) as dockerfile:
+            dockerfile_str = dockerfile.read()
+        assert dockerfile_str.index("install 'numpy>=2.0.0'\n") < dockerfile_str.index("install 'scipy'\n")
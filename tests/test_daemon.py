@@ -0,0 +1,126 @@
+import os
+import socket
+import stat
+import tempfile
+import zipfile
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bsedic.daemon import start_bsedic_daemon_in_background
+from bsedic.daemon_client import (
+    forward_to_bsedic_daemon,
+    is_bsedic_daemon_running,
+    parse_daemon_socket_path,
+    program_arguments_from_json,
+    program_arguments_to_json,
+)
+from bsedic.execution import execute_bsedic
+from bsedic.pbif import local_registry
+from bsedic.utils.input_types import (
+    ContainerizationEngine,
+    ContainerizationTypes,
+    ProgramArguments,
+    RegistryDiscoveryMode,
+)
+
+fake_input_file = """
+"python:pypi<numpy[>=2.0.0]>@numpy.random.rand"
+"python:pypi<process-bigraph[<1.0]>@process_bigraph.processes.ParameterScan"
+""".strip()
+
+
+@pytest.fixture
+def daemon_socket_path() -> Iterator[str]:
+    with tempfile.TemporaryDirectory() as socket_dir:
+        server = start_bsedic_daemon_in_background(os.path.join(socket_dir, "bsedic", "daemon.sock"))
+        yield str(server.server_address)
+        server.shutdown()
+        server.server_close()
+
+
+def _make_arguments(tmpdir: str, name: str, passlist: list[str] | None = None) -> ProgramArguments:
+    output_dir = os.path.join(tmpdir, name)
+    os.makedirs(output_dir)
+    zip_path = os.path.join(tmpdir, f"{name}.omex")
+    with zipfile.ZipFile(zip_path, "w") as zip_ref:
+        zip_ref.writestr("inputFile.pbif", fake_input_file)
+    return ProgramArguments(zip_path, output_dir, passlist, ContainerizationTypes.SINGLE, ContainerizationEngine.DOCKER)
+
+
+def test_program_arguments_round_trip() -> None:
+    program_arguments = ProgramArguments(
+        "in.omex", None, ["pypi::numpy"], ContainerizationTypes.MULTIPLE, ContainerizationEngine.BOTH
+    )
+    assert program_arguments_from_json(program_arguments_to_json(program_arguments)) == program_arguments
+
+
+def test_forward_returns_none_without_daemon() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        assert forward_to_bsedic_daemon(_make_arguments(tmpdir, "a"), os.path.join(tmpdir, "daemon.sock")) is None
+
+
+def test_daemon_socket_is_private(daemon_socket_path: str) -> None:
+    assert stat.S_IMODE(os.stat(daemon_socket_path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(os.path.dirname(daemon_socket_path)).st_mode) == 0o700
+    with pytest.raises(OSError, match="already listening"):
+        start_bsedic_daemon_in_background(daemon_socket_path)
+
+
+def test_daemon_replaces_stale_socket() -> None:
+    with tempfile.TemporaryDirectory() as socket_dir:
+        socket_path = os.path.join(socket_dir, "daemon.sock")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale_socket:
+            stale_socket.bind(socket_path)  # left behind, with nothing listening on it
+        server = start_bsedic_daemon_in_background(socket_path)
+        try:
+            assert is_bsedic_daemon_running(socket_path)
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert not os.path.exists(socket_path)
+
+
+def test_static_daemon_warms_without_importing(monkeypatch: pytest.MonkeyPatch) -> None:
+    warmed_modes: list[str] = []
+
+    def load_local_modules() -> None:
+        warmed_modes.append("import")
+
+    def get_local_implementation_catalog() -> None:
+        warmed_modes.append("static")
+
+    monkeypatch.setattr(local_registry, "load_local_modules", load_local_modules)
+    monkeypatch.setattr(local_registry, "get_local_implementation_catalog", get_local_implementation_catalog)
+    with tempfile.TemporaryDirectory() as socket_dir:
+        server = start_bsedic_daemon_in_background(
+            os.path.join(socket_dir, "daemon.sock"), RegistryDiscoveryMode.STATIC
+        )
+        server.shutdown()
+        server.server_close()
+    assert warmed_modes == ["static"]
+
+
+@pytest.mark.parametrize("socket_path", ["", os.path.join(os.sep, "d" * 200, "daemon.sock")])
+def test_invalid_daemon_socket_paths_are_rejected(socket_path: str) -> None:
+    with pytest.raises(ValueError, match="Invalid daemon socket path"):
+        parse_daemon_socket_path(socket_path)
+
+
+def test_daemon_matches_in_process_results_concurrently(daemon_socket_path: str) -> None:
+    assert is_bsedic_daemon_running(daemon_socket_path)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        expected = execute_bsedic(_make_arguments(tmpdir, "local"))
+        requests = [_make_arguments(tmpdir, f"remote{i}") for i in range(4)]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda args: forward_to_bsedic_daemon(args, daemon_socket_path), requests))
+        for result in results:
+            assert result is not None
+            assert result[0] == expected[0]
+            assert result[1].get_compact_repr() == expected[1].get_compact_repr()
+
+
+def test_daemon_reraises_compile_errors(daemon_socket_path: str) -> None:
+    with tempfile.TemporaryDirectory() as tmpdir, pytest.raises(ValueError):
+        forward_to_bsedic_daemon(_make_arguments(tmpdir, "untrusted", ["pypi::numpy"]), daemon_socket_path)
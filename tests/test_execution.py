@@ -45,3 +45,25 @@ ENTRYPOINT ["python3", "/runtime/main.py"]
         with open(output_dockerfile) as results_file:
             results = results_file.read()
         assert results == correct_answer
+
+
+def test_build_dockerfile_for_multiple_pbif_archive() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        zip_path = os.path.join(tmpdir, "inputArchive.zip")
+        with zipfile.ZipFile(zip_path, "w") as zip_ref:
+            zip_ref.writestr("first.pbif", '"python:pypi<numpy[>=2.0.0]>@numpy.random.rand"')
+            zip_ref.writestr("nested/second.pbif", '"python:pypi<scipy>@scipy.optimize.minimize"')
+            zip_ref.writestr("third.pbif", '"python:pypi<numpy[>=2.0.0]>@numpy.linalg.inv"')
+        output_dir = os.path.join(tmpdir, "output")
+        os.makedirs(output_dir)
+        test_args = ProgramArguments(
+            zip_path, output_dir, None, ContainerizationTypes.SINGLE, ContainerizationEngine.DOCKER
+        )
+        _, primary_dependencies = run_bsedic(test_args)
+        assert primary_dependencies.get_pypi_dependencies() == ["numpy>=2.0.0", "scipy"]
+        with open(os.path.join(output_dir, "Dockerfile")) as results_file:
+            assert "RUN python3 -m pip install 'numpy>=2.0.0' 'scipy'" in results_file.read()
+        with zipfile.ZipFile(os.path.join(output_dir, "inputArchive.zip")) as new_archive:
+            assert new_archive.read("first.pbif") == b'"local:numpy.random.rand"'
+            assert new_archive.read("nested/second.pbif") == b'"local:scipy.optimize.minimize"'
+            assert new_archive.read("third.pbif") == b'"local:numpy.linalg.inv"'
@@ -0,0 +1,151 @@
+import os
+import stat
+import tempfile
+import zipfile
+
+import pytest
+
+from bsedic.execution import execute_bsedic
+from bsedic.utils import experiment_archive
+from bsedic.utils.atomic_file import get_umask
+from bsedic.utils.experiment_archive import (
+    extract_archive_members,
+    extract_archive_returning_pbif_path,
+    read_pbif_from_archive,
+    reconstitute_archive,
+)
+from bsedic.utils.input_types import (
+    ArchiveExtractionMode,
+    ContainerizationEngine,
+    ContainerizationTypes,
+    ProgramArguments,
+)
+
+
+@pytest.mark.parametrize("copy_raw", [True, False])
+def test_reconstitute_archive_copies_unchanged_members_raw(copy_raw: bool, monkeypatch: pytest.MonkeyPatch) -> None:
+    if not copy_raw:  # as on a Python version whose `ZipFile` internals are not known to allow copying raw data
+        monkeypatch.setattr(experiment_archive, "_RAW_COPY_PYTHON_VERSIONS", ((3, 0), (3, 0)))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive_path = os.path.join(tmpdir, "experiment.omex")
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            # LZMA is never produced when recompressing, so it marks members that were copied verbatim
+            archive.writestr("model/model.xml", "<sbml/>" * 1000, compress_type=zipfile.ZIP_LZMA)
+            archive.writestr("data.csv", "1,2,3\n" * 1000, compress_type=zipfile.ZIP_STORED)
+            archive.writestr("experiment.pbif", '"python:pypi<numpy>@numpy.random.rand"')
+            archive.writestr("obsolete.txt", "to be removed")
+
+        output_dir = os.path.join(tmpdir, "output")
+        os.makedirs(output_dir)
+        pbif_path = extract_archive_returning_pbif_path(archive_path, output_dir)
+        with open(pbif_path, "w") as pbif_file:
+            pbif_file.write('"local:numpy.random.rand"')
+        extracted_dir = os.path.dirname(pbif_path)
+        os.remove(os.path.join(extracted_dir, "obsolete.txt"))
+        with open(os.path.join(extracted_dir, "model", "added.txt"), "w") as added_file:
+            added_file.write("new")
+
+        new_archive_path = os.path.join(output_dir, "experiment.omex")
+        reconstitute_archive(archive_path, extracted_dir, new_archive_path)
+
+        with zipfile.ZipFile(new_archive_path) as new_archive:
+            assert new_archive.testzip() is None
+            members = {member.filename: member for member in new_archive.infolist()}
+            assert set(members) == {"model/model.xml", "data.csv", "experiment.pbif", "model/", "model/added.txt"}
+            assert members["model/model.xml"].compress_type == zipfile.ZIP_LZMA
+            assert members["data.csv"].compress_type == zipfile.ZIP_STORED
+            assert members["experiment.pbif"].compress_type == zipfile.ZIP_DEFLATED
+            assert new_archive.read("model/model.xml") == b"<sbml/>" * 1000
+            assert new_archive.read("experiment.pbif") == b'"local:numpy.random.rand"'
+            assert new_archive.read("model/added.txt") == b"new"
+        assert [name for name in os.listdir(output_dir) if name.endswith(".tmp")] == []
+        assert stat.S_IMODE(os.stat(new_archive_path).st_mode) == 0o666 & ~get_umask()  # as if written in place
+
+
+def test_reconstitute_archive_can_overwrite_its_source() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive_path = os.path.join(tmpdir, "experiment.zip")
+        with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("experiment.pbif", "original")
+        pbif_path = extract_archive_returning_pbif_path(archive_path, tmpdir)
+        with open(pbif_path, "w") as pbif_file:
+            pbif_file.write("rewritten")
+        reconstitute_archive(archive_path, os.path.dirname(pbif_path), archive_path)
+        with zipfile.ZipFile(archive_path) as archive:
+            assert archive.read("experiment.pbif") == b"rewritten"
+
+
+_manifest = """<?xml version="1.0" encoding="UTF-8"?>
+<omexManifest xmlns="http://identifiers.org/combine.specifications/omex-manifest">
+  <content location="." format="http://identifiers.org/combine.specifications/omex"/>
+  <content location="./experiment.pbif" format="http://purl.org/NET/mediatypes/application/json" master="true"/>
+  <content location="./results/summary.json" format="http://purl.org/NET/mediatypes/application/json"/>
+</omexManifest>
+"""
+
+
+def _write_selective_test_archive(archive_path: str, include_results: bool = True) -> None:
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        archive.writestr("manifest.xml", _manifest)
+        archive.writestr("experiment.pbif", '"python:pypi<numpy[>=2.0.0]>@numpy.random.rand"')
+        archive.writestr("data/payload.bin", os.urandom(1024) * 64, compress_type=zipfile.ZIP_LZMA)
+        if include_results:
+            archive.writestr("results/summary.json", "{}")  # would win a name-based search
+
+
+def test_read_pbif_from_archive_follows_the_manifest() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive_path = os.path.join(tmpdir, "experiment.omex")
+        _write_selective_test_archive(archive_path)
+        assert read_pbif_from_archive(archive_path) == (
+            "experiment.pbif",
+            '"python:pypi<numpy[>=2.0.0]>@numpy.random.rand"',
+        )
+        assert os.listdir(tmpdir) == ["experiment.omex"]
+
+        zip_path = os.path.join(tmpdir, "experiment.zip")
+        with zipfile.ZipFile(zip_path, "w") as archive:
+            archive.writestr("__MACOSX/._experiment.pbif", "resource fork")
+            archive.writestr("experiment.pbif", "document")
+        assert read_pbif_from_archive(zip_path) == ("experiment.pbif", "document")
+
+
+def test_selective_extraction_only_writes_the_pbif() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive_path = os.path.join(tmpdir, "experiment.omex")
+        _write_selective_test_archive(archive_path, include_results=False)
+        full_output_dir = os.path.join(tmpdir, "full")
+        selective_output_dir = os.path.join(tmpdir, "selective")
+        for output_dir, extraction_mode in (
+            (full_output_dir, ArchiveExtractionMode.FULL),
+            (selective_output_dir, ArchiveExtractionMode.SELECTIVE),
+        ):
+            os.makedirs(output_dir)
+            execute_bsedic(
+                ProgramArguments(
+                    archive_path,
+                    output_dir,
+                    None,
+                    ContainerizationTypes.SINGLE,
+                    ContainerizationEngine.DOCKER,
+                    archive_extraction_mode=extraction_mode,
+                )
+            )
+
+        assert os.listdir(os.path.join(selective_output_dir, "experiment")) == ["experiment.pbif"]
+        for file_name in ("Dockerfile", os.path.join("experiment", "experiment.pbif")):
+            with (
+                open(os.path.join(full_output_dir, file_name)) as full_file,
+                open(os.path.join(selective_output_dir, file_name)) as selective_file,
+            ):
+                assert full_file.read() == selective_file.read()
+        with zipfile.ZipFile(os.path.join(selective_output_dir, "experiment.omex")) as new_archive:
+            assert new_archive.testzip() is None
+            assert new_archive.namelist() == ["manifest.xml", "experiment.pbif", "data/payload.bin"]
+            assert new_archive.getinfo("data/payload.bin").compress_type == zipfile.ZIP_LZMA
+            assert new_archive.read("experiment.pbif") == b'"local:numpy.random.rand"'
+
+        # Remaining members are only extracted on request
+        extracted_paths = extract_archive_members(archive_path, selective_output_dir, ["data/payload.bin"])
+        assert extracted_paths == [os.path.join(selective_output_dir, "experiment", "data", "payload.bin")]
+        assert os.path.getsize(extracted_paths[0]) == 1024 * 64
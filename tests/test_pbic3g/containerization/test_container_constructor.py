@@ -1,13 +1,19 @@
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
 
 from bsedic.pbif.containerization.container_constructor import (
+    NoDependenciesFoundError,
     ProgramArguments,
     convert_dependencies_to_installation_string_representation,
     determine_dependencies,
+    determine_dependencies_for_documents,
     formulate_dockerfile_for_necessary_env,
     generate_necessary_values,
 )
 from bsedic.utils.input_types import ContainerizationEngine, ContainerizationTypes
+from bsedic.utils.process_pool import get_process_pool_worker_count
 
 
 def test_generate_necessary_values() -> None:
@@ -44,6 +50,54 @@ def test_determine_dependencies():
     assert (pypi_results[1], conda_results[1], adjusted_list) == correct_answer
 
 
+def test_determine_dependencies_rewrites_every_address() -> None:
+    # Repeated dependencies used to be skipped before their address was rewritten, leaving it in the document
+    document = """
+"python:pypi<numpy[>=2.0.0]>@numpy.random.rand"
+"python:pypi<numpy[>=2.0.0]>@numpy.linalg.inv"
+"python:pypi<numpy[>=2.0.0]>@numpy.random.rand"
+"local:already.Local"
+""".strip()
+    dependencies, updated_document = determine_dependencies(document, ["pypi::numpy"])
+    assert dependencies.get_pypi_dependencies() == ["numpy>=2.0.0"]
+    assert (
+        updated_document
+        == '"local:numpy.random.rand"\n"local:numpy.linalg.inv"\n"local:numpy.random.rand"\n"local:already.Local"'
+    )
+    # Only local addresses is not an error; no addresses at all is
+    assert determine_dependencies('"local:already.Local"')[1] == '"local:already.Local"'
+    with pytest.raises(NoDependenciesFoundError):
+        determine_dependencies('{"values": [1, 2, 3]}')
+
+
+def test_determine_dependencies_for_documents() -> None:
+    documents = [
+        '"python:pypi<numpy[>=2.0.0]>@numpy.random.rand"\n"python:conda<readdy>@readdy.ReactionDiffusionSystem"',
+        '{"values": [1, 2, 3]}',  # data, not a PBIF; tolerated since the other documents have dependencies
+        '"python:pypi<numpy[>=2.0.0]>@numpy.linalg.inv"\n"python:pypi<scipy>@scipy.optimize.minimize"',
+    ]
+    dependencies, updated_documents = determine_dependencies_for_documents(documents, max_workers=2)
+    assert dependencies.get_pypi_dependencies() == ["numpy>=2.0.0", "scipy"]
+    assert dependencies.get_conda_dependencies() == ["readdy"]
+    assert updated_documents == [
+        '"local:numpy.random.rand"\n"local:readdy.ReactionDiffusionSystem"',
+        '{"values": [1, 2, 3]}',
+        '"local:numpy.linalg.inv"\n"local:scipy.optimize.minimize"',
+    ]
+    with pytest.raises(NoDependenciesFoundError):
+        determine_dependencies_for_documents(['{"a": 1}', '{"b": 2}'])
+
+
+def test_documents_are_scanned_in_process_within_workers() -> None:
+    # e.g. multi-document archives compiled by batch workers, which must not each start a pool of their own
+    documents = ['"python:pypi<numpy>@numpy.random.rand"', '"python:pypi<scipy>@scipy.optimize.minimize"']
+    assert get_process_pool_worker_count(len(documents), max_workers=2) == 2
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(get_process_pool_worker_count, len(documents), 2).result() == 1
+        dependencies, _ = executor.submit(determine_dependencies_for_documents, documents, None, 2).result()
+    assert dependencies.get_pypi_dependencies() == ["numpy", "scipy"]
+
+
 def test_convert_dependencies_to_installation_string_representation():
     dependencies = [
         "numpy>=2.0.0",
@@ -0,0 +1,87 @@
+import json
+import os
+import tempfile
+
+import pytest
+
+from bsedic.execution import execute_bsedic
+from bsedic.pbif.containerization.environment_partitioning import (
+    collect_process_dependencies,
+    color_conflict_graph,
+    partition_environments,
+)
+from bsedic.pbif.dependency_resolution.resolver import UnsatisfiableDependenciesError
+from bsedic.utils.input_types import (
+    ContainerizationEngine,
+    ContainerizationTypes,
+    DependencyScanMode,
+    ProgramArguments,
+)
+
+_conflicting_document = """
+"python:pypi<numpy[>=2]>@numpy.random.rand"
+"python:pypi<numpy[<1.26]>@numpy.linalg.inv"
+"python:pypi<scipy>@scipy.optimize.minimize"
+"python:pypi<numpy[>=1.20]>@numpy.fft.fft"
+"python:conda<readdy>@readdy.ReactionDiffusionSystem"
+""".strip()
+
+
+def test_partitioning_separates_only_conflicting_requirements() -> None:
+    manifest = partition_environments(collect_process_dependencies([_conflicting_document]))
+    assert [environment.pypi_dependencies for environment in manifest.environments] == [
+        ["numpy>=2,>=1.20", "scipy"],
+        ["numpy<1.26"],
+    ]
+    assert manifest.environments[0].conda_dependencies == ["readdy"]
+    assert manifest.processes == {
+        "local:numpy.random.rand": ["env_0"],
+        "local:numpy.linalg.inv": ["env_1"],
+        "local:scipy.optimize.minimize": ["env_0"],
+        "local:numpy.fft.fft": ["env_0"],
+        "local:readdy.ReactionDiffusionSystem": ["env_0"],
+    }
+
+
+def test_coloring_checks_whole_color_classes() -> None:
+    # No two vertices conflict, but 0 and 1 together can not take 2
+    colors = color_conflict_graph([set(), set(), set()], lambda members: sorted(members) != [0, 1, 2])
+    assert colors == [0, 0, 1]
+
+
+def test_unsatisfiable_single_requirement_is_still_an_error() -> None:
+    with pytest.raises(UnsatisfiableDependenciesError):
+        partition_environments({("pypi", "numpy>2,<1"): ["local:numpy.random.rand"]})
+
+
+@pytest.mark.parametrize("scan_mode", [DependencyScanMode.TEXT, DependencyScanMode.STREAMING])
+def test_multiple_containerization_writes_one_environment_per_partition(scan_mode: DependencyScanMode) -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = os.path.join(tmpdir, "experiment.pbif")
+        with open(input_path, "w") as input_file:
+            input_file.write(_conflicting_document)
+        output_dir = os.path.join(tmpdir, "output")
+        os.makedirs(output_dir)
+        returned_template, primary_dependencies = execute_bsedic(
+            ProgramArguments(
+                input_path,
+                output_dir,
+                None,
+                ContainerizationTypes.MULTIPLE,
+                ContainerizationEngine.BOTH,
+                dependency_scan_mode=scan_mode,
+            )
+        )
+        with open(os.path.join(output_dir, "coordination_manifest.json")) as manifest_file:
+            manifest = json.load(manifest_file)
+        assert json.loads(returned_template.representation) == manifest
+        assert [environment["build_context"] for environment in manifest["environments"]] == [
+            "environments/env_0",
+            "environments/env_1",
+        ]
+        with open(os.path.join(output_dir, "environments", "env_1", "Dockerfile")) as dockerfile:
+            assert "RUN python3 -m pip install 'numpy<1.26'\n" in dockerfile.read()
+        assert os.path.exists(os.path.join(output_dir, "environments", "env_1", "singularity.def"))
+        assert "numpy<1.26" in primary_dependencies.get_pypi_dependencies()
+        with open(os.path.join(output_dir, "experiment.pbif")) as output_file:
+            assert "python:" not in output_file.read()
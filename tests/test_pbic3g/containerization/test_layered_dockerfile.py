@@ -0,0 +1,53 @@
+from bsedic.pbif.containerization.container_constructor import fill_dockerfile_template
+from bsedic.pbif.containerization.layered_dockerfile import (
+    compute_dependency_frequencies,
+    estimate_layer_reuse,
+    fill_layered_dockerfile_template,
+    split_dependency_layers,
+)
+from bsedic.pbif.containerization.singularity_definition import convert_dockerfile_to_singularity_definition
+from bsedic.utils.input_types import DockerfileLayout
+from bsedic.utils.result_types import ExperimentPrimaryDependencies
+
+_fleet = [
+    ExperimentPrimaryDependencies(["scipy", "numpy>=2", "process-bigraph<1.0", "tellurium"], ["readdy"]),
+    ExperimentPrimaryDependencies(["numpy>=2", "process-bigraph<1.0", "copasi-basico"], ["readdy"]),
+    ExperimentPrimaryDependencies(["process-bigraph<1.0", "numpy>=2", "scipy"], []),
+]
+
+
+def test_layers_are_deterministic_and_most_shared_first() -> None:
+    frequencies = compute_dependency_frequencies(_fleet)
+    assert frequencies["pypi::numpy>=2"] == 1.0
+    assert split_dependency_layers("pypi", ["tellurium", "scipy", "numpy>=2", "process-bigraph<1.0"], frequencies) == [
+        ["numpy>=2"],
+        ["process-bigraph<1.0"],
+        ["scipy"],
+        ["tellurium"],
+    ]
+    assert split_dependency_layers("pypi", ["tellurium", "Scipy", "numpy"]) == [["numpy", "Scipy", "tellurium"]]
+    assert (
+        fill_layered_dockerfile_template(_fleet[0]).representation
+        == fill_layered_dockerfile_template(
+            ExperimentPrimaryDependencies(list(reversed(_fleet[0].get_pypi_dependencies())), ["readdy"])
+        ).representation
+    )
+
+
+def test_layered_dockerfiles_share_more_layers_than_monolithic_ones() -> None:
+    frequencies = compute_dependency_frequencies(_fleet)
+    layered = [fill_dockerfile_template(deps, DockerfileLayout.LAYERED, frequencies).representation for deps in _fleet]
+    monolithic = [fill_dockerfile_template(deps).representation for deps in _fleet]
+    assert "--mount=type=cache,target=/root/.cache/pip" in layered[0]
+    assert "--mount=type=cache,target=/opt/micromamba/pkgs" in layered[0]
+    assert (
+        estimate_layer_reuse(layered).dependency_reuse_ratio > estimate_layer_reuse(monolithic).dependency_reuse_ratio
+    )
+
+
+def test_layered_dockerfile_converts_to_apptainer() -> None:
+    definition = convert_dockerfile_to_singularity_definition(
+        fill_layered_dockerfile_template(_fleet[0]).representation
+    )
+    assert "--mount" not in definition
+    assert "\napt update && apt upgrade -y && apt install -y git curl\n" in definition
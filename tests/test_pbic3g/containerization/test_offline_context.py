@@ -0,0 +1,172 @@
+import json
+import os
+import subprocess
+import tempfile
+
+import pytest
+
+from bsedic.execution import execute_bsedic
+from bsedic.pbif.containerization import offline_context
+from bsedic.pbif.containerization.offline_context import (
+    OfflineBuildContextError,
+    assemble_offline_build_context,
+    build_offline_package_index_snapshot,
+    download_runtime_requirements,
+    verify_offline_build_context,
+)
+from bsedic.utils.input_types import ContainerizationEngine, ContainerizationTypes, ProgramArguments
+from bsedic.utils.result_types import ExperimentPrimaryDependencies
+
+_offline_document = """
+"python:pypi<numpy[>=2.0.0]>@numpy.random.rand"
+"python:pypi<process-bigraph[<1.0]>@process_bigraph.processes.ParameterScan"
+"python:conda<readdy>@readdy.ReactionDiffusionSystem"
+""".strip()
+
+
+def _write_offline_artifacts(offline_artifacts_dir: str) -> None:
+    wheelhouse_dir = os.path.join(offline_artifacts_dir, "wheelhouse")
+    os.makedirs(wheelhouse_dir)
+    for file_name in [
+        "numpy-1.26.4-cp312-cp312-manylinux_2_17_x86_64.whl",
+        "numpy-2.0.0-cp312-cp312-manylinux_2_17_x86_64.whl",
+        "process_bigraph-0.0.30.tar.gz",
+        "setuptools-75.1.0-py3-none-any.whl",  # the runtime's (default) build backend
+        "README.txt",
+    ]:
+        with open(os.path.join(wheelhouse_dir, file_name), "w") as artifact_file:
+            artifact_file.write("")
+    conda_subdir = os.path.join(offline_artifacts_dir, "conda-channel", "linux-64")
+    os.makedirs(conda_subdir)
+    with open(os.path.join(conda_subdir, "repodata.json"), "w") as repodata_file:
+        json.dump(
+            {
+                "packages": {"readdy-2.0.9-py312_0.tar.bz2": {"name": "readdy", "version": "2.0.9"}},
+                "packages.conda": {"python-3.12.4-h0_0.conda": {"name": "python", "version": "3.12.4"}},
+            },
+            repodata_file,
+        )
+    with open(os.path.join(offline_artifacts_dir, "micromamba"), "w") as micromamba_file:
+        micromamba_file.write("")
+    os.makedirs(os.path.join(offline_artifacts_dir, "runtime"))
+    with open(os.path.join(offline_artifacts_dir, "runtime", "pyproject.toml"), "w") as project_file:
+        project_file.write("")
+
+
+def test_snapshot_lists_wheelhouse_and_channel_versions() -> None:
+    with tempfile.TemporaryDirectory() as offline_artifacts_dir:
+        _write_offline_artifacts(offline_artifacts_dir)
+        snapshot = build_offline_package_index_snapshot(offline_artifacts_dir)
+        assert snapshot.packages == {
+            "pypi": {"numpy": ["1.26.4", "2.0.0"], "process-bigraph": ["0.0.30"], "setuptools": ["75.1.0"]},
+            "conda": {"readdy": ["2.0.9"], "python": ["3.12.4"]},
+        }
+
+
+def test_offline_build_context_installs_only_from_local_artifacts() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        offline_artifacts_dir = os.path.join(tmpdir, "artifacts")
+        _write_offline_artifacts(offline_artifacts_dir)
+        input_path = os.path.join(tmpdir, "experiment.pbif")
+        with open(input_path, "w") as input_file:
+            input_file.write(_offline_document)
+        output_dir = os.path.join(tmpdir, "output")
+        os.makedirs(output_dir)
+        _, primary_dependencies = execute_bsedic(
+            ProgramArguments(
+                input_path,
+                output_dir,
+                None,
+                ContainerizationTypes.SINGLE,
+                ContainerizationEngine.BOTH,
+                offline_artifacts_dir=offline_artifacts_dir,
+            )
+        )
+        assert primary_dependencies.get_pypi_dependencies() == ["numpy==2.0.0", "process-bigraph==0.0.30"]
+        assert primary_dependencies.get_conda_dependencies() == ["readdy==2.0.9"]
+        with open(os.path.join(output_dir, "Dockerfile")) as dockerfile:
+            dockerfile_str = dockerfile.read()
+        assert "pip install --no-index --find-links /opt/bsedic/wheelhouse 'numpy==2.0.0'" in dockerfile_str
+        assert "-c file:///opt/bsedic/conda-channel 'readdy==2.0.9' python=3.12" in dockerfile_str
+        assert "curl" not in dockerfile_str
+        assert "git clone" not in dockerfile_str
+        assert "--no-build-isolation" not in dockerfile_str
+        for artifact_name in ["wheelhouse", "conda-channel", "micromamba", "runtime"]:
+            assert os.path.exists(os.path.join(output_dir, artifact_name))
+        with open(os.path.join(output_dir, "singularity.def")) as definition_file:
+            assert "%files" in definition_file.read()
+
+
+def test_verification_reports_every_missing_artifact() -> None:
+    with tempfile.TemporaryDirectory() as build_context_dir:
+        _write_offline_artifacts(build_context_dir)
+        os.remove(os.path.join(build_context_dir, "micromamba"))
+        with open(os.path.join(build_context_dir, "runtime", "pyproject.toml"), "w") as project_file:
+            project_file.write('[build-system]\nrequires = ["hatchling"]\nbuild-backend = "hatchling.build"\n')
+        with pytest.raises(OfflineBuildContextError) as error_info:
+            verify_offline_build_context(
+                build_context_dir,
+                ExperimentPrimaryDependencies(["numpy>=3", "scipy"], ["readdy", "git+https://example.com/x.git"]),
+            )
+        error_str = str(error_info.value)
+        assert "no version of `numpy` in `wheelhouse` satisfies `numpy>=3`" in error_str
+        assert "`scipy` from `pypi` is missing from `wheelhouse`" in error_str
+        assert "`micromamba` binary is missing" in error_str
+        assert "git+https://example.com/x.git" in error_str
+        assert "`hatchling` from `pypi` is missing from `wheelhouse` (needed to build `runtime`)" in error_str
+
+
+def test_verification_reports_missing_runtime_dependencies() -> None:
+    with tempfile.TemporaryDirectory() as build_context_dir:
+        _write_offline_artifacts(build_context_dir)
+        with open(os.path.join(build_context_dir, "runtime", "pyproject.toml"), "w") as project_file:
+            project_file.write(
+                '[project]\nname = "runtime"\ndependencies = ["bsail>=1", "process-bigraph", '
+                "\"numpy; python_version < '3'\", \"pytest; extra == 'dev'\"]\n"
+            )
+        with pytest.raises(OfflineBuildContextError) as error_info:
+            verify_offline_build_context(build_context_dir, ExperimentPrimaryDependencies(["numpy"], []))
+        error_str = str(error_info.value)
+        assert "`bsail` from `pypi` is missing from `wheelhouse` (needed to install `runtime`)" in error_str
+        assert "process-bigraph" not in error_str  # its sdist is in the wheelhouse
+        assert "pytest" not in error_str
+
+
+def test_assembling_never_downloads(monkeypatch: pytest.MonkeyPatch) -> None:
+    def download(command: list[str], **_kwargs: object) -> subprocess.CompletedProcess[str]:
+        raise AssertionError(command)
+
+    monkeypatch.setattr(offline_context.subprocess, "run", download)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        offline_artifacts_dir = os.path.join(tmpdir, "artifacts")
+        _write_offline_artifacts(offline_artifacts_dir)
+        os.remove(os.path.join(offline_artifacts_dir, "wheelhouse", "setuptools-75.1.0-py3-none-any.whl"))
+        wheelhouse_file_names = sorted(os.listdir(os.path.join(offline_artifacts_dir, "wheelhouse")))
+        build_context_dir = os.path.join(tmpdir, "context")
+        os.makedirs(build_context_dir)
+        with pytest.raises(OfflineBuildContextError, match="`setuptools` from `pypi` is missing"):
+            assemble_offline_build_context(
+                offline_artifacts_dir, build_context_dir, ExperimentPrimaryDependencies(["numpy"], [])
+            )
+        assert sorted(os.listdir(os.path.join(offline_artifacts_dir, "wheelhouse"))) == wheelhouse_file_names
+
+
+def test_missing_runtime_requirements_are_downloaded_into_the_wheelhouse(monkeypatch: pytest.MonkeyPatch) -> None:
+    download_commands: list[list[str]] = []
+
+    def download(command: list[str], **_kwargs: object) -> subprocess.CompletedProcess[str]:
+        download_commands.append(command)
+        wheelhouse_dir = command[command.index("--dest") + 1]
+        with open(os.path.join(wheelhouse_dir, "hatchling-1.25.0-py3-none-any.whl"), "w") as wheel_file:
+            wheel_file.write("")
+        return subprocess.CompletedProcess(command, 0, "", "")
+
+    monkeypatch.setattr(offline_context.subprocess, "run", download)
+    with tempfile.TemporaryDirectory() as offline_artifacts_dir:
+        _write_offline_artifacts(offline_artifacts_dir)
+        with open(os.path.join(offline_artifacts_dir, "runtime", "pyproject.toml"), "w") as project_file:
+            project_file.write('[build-system]\nrequires = ["hatchling>=1.20"]\n')
+        assert download_runtime_requirements(offline_artifacts_dir) == ["hatchling>=1.20"]
+        assert download_commands[0][-1] == "hatchling>=1.20"
+        assert download_runtime_requirements(offline_artifacts_dir) == []  # now in the wheelhouse
+        assert len(download_commands) == 1
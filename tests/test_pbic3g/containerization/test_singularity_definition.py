@@ -0,0 +1,80 @@
+import os
+import tempfile
+
+import pytest
+from spython.main.parse.parsers import DockerParser  # type: ignore[import-untyped]
+from spython.main.parse.writers import SingularityWriter  # type: ignore[import-untyped]
+
+from bsedic.pbif.containerization.container_constructor import formulate_dockerfile_for_necessary_env
+from bsedic.pbif.containerization.singularity_definition import (
+    UnsupportedDockerInstructionError,
+    convert_dockerfile_to_singularity_definition,
+)
+from bsedic.utils.input_types import ContainerizationEngine, ContainerizationTypes, ProgramArguments
+
+_documents = [
+    '"python:pypi<numpy[>=2.0.0]>@numpy.random.rand"',
+    "`python:conda<readdy>@readdy.ReactionDiffusionSystem`",
+    '"python:pypi<numpy[>=2.0.0]>@numpy.random.rand"\n`python:conda<readdy>@readdy.ReactionDiffusionSystem`',
+]
+
+_handwritten_dockerfile = """
+FROM python:3.12 AS base
+LABEL maintainer="someone" version=1
+ENV A=1 B="x y"
+ENV LEGACY value
+RUN apt update && \\
+    apt install -y git
+# a comment
+USER root
+EXPOSE 8080
+COPY a.txt b.txt /opt/
+WORKDIR /work
+FROM base AS runtime
+COPY --from=base /opt/a.txt /tmp/
+HEALTHCHECK CMD curl localhost
+RUN echo hi
+
+CMD ["python", "run.py"]
+""".strip()
+
+
+def _convert_with_spython(dockerfile: str) -> str:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dockerfile_path = os.path.join(tmpdir, "Dockerfile")
+        with open(dockerfile_path, "w") as docker_file:
+            docker_file.write(dockerfile)
+        return str(SingularityWriter(DockerParser(dockerfile_path).recipe).convert())
+
+
+def _generate_dockerfile(document: str) -> str:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        document_path = os.path.join(tmpdir, "document.pbif")
+        with open(document_path, "w") as document_file:
+            document_file.write(document)
+        test_args = ProgramArguments(
+            document_path, tmpdir, None, ContainerizationTypes.SINGLE, ContainerizationEngine.APPTAINER
+        )
+        return formulate_dockerfile_for_necessary_env(test_args)[0].representation
+
+
+@pytest.mark.parametrize("document", _documents)
+def test_native_conversion_matches_spython_for_generated_dockerfiles(document: str) -> None:
+    dockerfile = _generate_dockerfile(document)
+    assert convert_dockerfile_to_singularity_definition(dockerfile) == _convert_with_spython(dockerfile)
+
+
+def test_native_conversion_matches_spython_for_handwritten_dockerfile() -> None:
+    assert convert_dockerfile_to_singularity_definition(_handwritten_dockerfile) == _convert_with_spython(
+        _handwritten_dockerfile
+    )
+
+
+def test_native_conversion_drops_buildkit_run_options() -> None:
+    dockerfile = "FROM python:3.12\nRUN --mount=type=cache,target=/root/.cache/pip python3 -m pip install numpy"
+    assert "%post\npython3 -m pip install numpy\n" in convert_dockerfile_to_singularity_definition(dockerfile)
+
+
+def test_native_conversion_rejects_unsupported_instructions() -> None:
+    with pytest.raises(UnsupportedDockerInstructionError):
+        convert_dockerfile_to_singularity_definition("FROM python:3.12\nARG VERSION")
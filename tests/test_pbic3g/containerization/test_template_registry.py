@@ -0,0 +1,86 @@
+import os
+import tempfile
+
+import pytest
+
+from bsedic.execution import execute_bsedic
+from bsedic.pbif.containerization.container_constructor import fill_dockerfile_template
+from bsedic.pbif.containerization.template_registry import (
+    get_dockerfile_template,
+    list_dockerfile_templates,
+    parse_dockerfile_template,
+    register_dockerfile_template,
+)
+from bsedic.utils.input_types import ContainerizationEngine, ContainerizationTypes, ProgramArguments
+from bsedic.utils.result_types import ExperimentPrimaryDependencies
+
+_slim_template = """
+FROM python:3.12-slim-bookworm
+$${#CONDA_FORGE_DEPENDENCIES}
+$${#PYPI_DEPENDENCIES}
+ENTRYPOINT ["python3", "/runtime/main.py"]
+""".strip()
+
+
+def test_templates_are_split_into_literals_and_slots() -> None:
+    dockerfile_template = parse_dockerfile_template("slim", _slim_template)
+    assert dockerfile_template.slots == ["CONDA_FORGE_DEPENDENCIES", "PYPI_DEPENDENCIES"]
+    assert dockerfile_template.literals == [
+        "FROM python:3.12-slim-bookworm\n",
+        "\n",
+        '\nENTRYPOINT ["python3", "/runtime/main.py"]',
+    ]
+    assert dockerfile_template.render(ExperimentPrimaryDependencies(["numpy>=2"], [])) == (
+        "FROM python:3.12-slim-bookworm\n"
+        "# No conda dependencies!\n"
+        "RUN python3 -m pip install 'numpy>=2'\n"
+        'ENTRYPOINT ["python3", "/runtime/main.py"]'
+    )
+
+
+@pytest.mark.parametrize(
+    ("template_source", "error_match"),
+    [
+        (_slim_template + "\n$${#BASE_IMAGE}", "unknown slots BASE_IMAGE"),
+        (_slim_template.replace("$${#PYPI_DEPENDENCIES}", ""), "missing slots PYPI_DEPENDENCIES"),
+        (_slim_template.replace("$${#PYPI_DEPENDENCIES}", "$${#PYPI_DEPENDENCIES"), "malformed slot"),
+    ],
+)
+def test_invalid_templates_are_rejected_when_parsed(template_source: str, error_match: str) -> None:
+    with pytest.raises(ValueError, match=error_match):
+        parse_dockerfile_template("broken", template_source)
+
+
+def test_templates_can_be_registered_or_given_as_files() -> None:
+    register_dockerfile_template("test-slim", _slim_template)
+    assert "test-slim" in list_dockerfile_templates()
+    with pytest.raises(ValueError, match="already registered"):
+        register_dockerfile_template("test-slim", _slim_template)
+    experiment_deps = ExperimentPrimaryDependencies(["numpy>=2"], ["readdy"])
+    assert fill_dockerfile_template(experiment_deps, dockerfile_template="test-slim").representation.startswith(
+        "FROM python:3.12-slim-bookworm\n"
+    )
+    with pytest.raises(ValueError, match="Unknown Dockerfile template `missing`"):
+        get_dockerfile_template("missing")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        template_path = os.path.join(tmpdir, "mirror.Dockerfile")
+        with open(template_path, "w") as template_file:
+            template_file.write(_slim_template.replace("python:3.12-slim-bookworm", "mirror.example/python:3.12"))
+        input_path = os.path.join(tmpdir, "experiment.pbif")
+        with open(input_path, "w") as input_file:
+            input_file.write('"python:pypi<numpy[>=2.0.0]>@numpy.random.rand"')
+        output_dir = os.path.join(tmpdir, "output")
+        os.makedirs(output_dir)
+        execute_bsedic(
+            ProgramArguments(
+                input_path,
+                output_dir,
+                None,
+                ContainerizationTypes.SINGLE,
+                ContainerizationEngine.DOCKER,
+                dockerfile_template=template_path,
+            )
+        )
+        with open(os.path.join(output_dir, "Dockerfile")) as dockerfile:
+            assert dockerfile.read().startswith("FROM mirror.example/python:3.12\n")
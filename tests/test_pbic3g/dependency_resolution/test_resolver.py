@@ -0,0 +1,47 @@
+import json
+import os
+import tempfile
+
+import pytest
+
+from bsedic.pbif.containerization.container_constructor import formulate_dockerfile_for_document
+from bsedic.pbif.dependency_resolution.resolver import UnsatisfiableDependenciesError, resolve_dependencies
+from bsedic.utils.result_types import ExperimentPrimaryDependencies
+
+
+def test_resolver_merges_requirements_on_the_same_package() -> None:
+    resolved = resolve_dependencies(
+        ExperimentPrimaryDependencies(
+            ["numpy>=2.0.0", "scipy", "NumPy<3", "git+https://github.com/vivarium-collective/process-bigraph.git"],
+            ["readdy", "readdy"],
+        )
+    )
+    assert resolved.get_pypi_dependencies() == [
+        "numpy>=2.0.0,<3",
+        "scipy",
+        "git+https://github.com/vivarium-collective/process-bigraph.git",
+    ]
+    assert resolved.get_conda_dependencies() == ["readdy"]
+
+
+def test_resolver_rejects_unsatisfiable_requirements_before_building() -> None:
+    document = """
+"python:pypi<numpy[>=2]>@numpy.random.rand"
+"python:pypi<numpy[<1.26]>@numpy.linalg.inv"
+""".strip()
+    with pytest.raises(UnsatisfiableDependenciesError, match=r"`numpy>=2`, `numpy<1\.26`"):
+        formulate_dockerfile_for_document(document)
+
+
+def test_resolver_pins_against_package_index_snapshot() -> None:
+    snapshot = {"packages": {"pypi": {"NumPy": ["1.26.4", "2.0.0", "2.1.3", "2.2.0rc1", "3.0.0"], "scipy": ["1.14.1"]}}}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        snapshot_path = os.path.join(tmpdir, "index_snapshot.json")
+        with open(snapshot_path, "w") as snapshot_file:
+            json.dump(snapshot, snapshot_file)
+        resolved = resolve_dependencies(
+            ExperimentPrimaryDependencies(["numpy>=2", "numpy<3", "scipy", "copasi-basico"], []), snapshot_path
+        )
+        assert resolved.get_pypi_dependencies() == ["numpy==2.1.3", "scipy==1.14.1", "copasi-basico"]
+        with pytest.raises(UnsatisfiableDependenciesError, match="package index snapshot"):
+            resolve_dependencies(ExperimentPrimaryDependencies(["scipy<1.14"], []), snapshot_path)
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import zipfile
+
+import pytest
+
+from bsedic.execution import execute_bsedic
+from bsedic.pbif.containerization.container_constructor import determine_dependencies
+from bsedic.pbif.dependency_resolution.addresses import NoDependenciesFoundError
+from bsedic.pbif.dependency_resolution.streaming_scan import determine_dependencies_streaming
+from bsedic.utils.input_types import (
+    ArchiveExtractionMode,
+    ContainerizationEngine,
+    ContainerizationTypes,
+    DependencyScanMode,
+    ProgramArguments,
+)
+
+_documents = [
+    '{"a": {"address": "python:pypi<copasi-basico[>=0.8]>@basico.model_io.load_model"}}',
+    '  \n{"address": "python:conda<readdy>@readdy.ReactionDiffusionSystem", "b": "local:numpy"}\n\n  ',
+    "python:pypi<numpy>@numpy.random.rand python:pypi<numpy>@numpy.linalg.inv\tpython:pypi<scipy>@scipy",
+    '{"only": "local:already.rewritten"}   ',
+]
+
+
+@pytest.mark.parametrize("document", _documents)
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1024])
+def test_streaming_scan_matches_text_scan(document: str, chunk_size: int) -> None:
+    expected_dependencies, expected_document = determine_dependencies(document)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        document_path = os.path.join(tmpdir, "experiment.pbif")
+        with open(document_path, "w") as document_file:
+            document_file.write(document)
+        dependencies, document_changed = determine_dependencies_streaming(document_path, chunk_size=chunk_size)
+        with open(document_path) as document_file:
+            assert document_file.read() == expected_document
+        assert os.listdir(tmpdir) == ["experiment.pbif"]
+    assert repr(dependencies) == repr(expected_dependencies)
+    assert document_changed == (expected_document != document)
+
+
+def test_streaming_scan_leaves_file_untouched_on_error() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        document_path = os.path.join(tmpdir, "experiment.pbif")
+        for document, error in (
+            ("  no addresses here  ", NoDependenciesFoundError),
+            (" python:pypi<numpy>@numpy.random.rand python:pip<scipy>@scipy ", ValueError),
+        ):
+            with open(document_path, "w") as document_file:
+                document_file.write(document)
+            with pytest.raises(error):
+                determine_dependencies_streaming(document_path, chunk_size=8)
+            with open(document_path) as document_file:
+                assert document_file.read() == document
+            assert os.listdir(tmpdir) == ["experiment.pbif"]
+
+
+def test_streaming_scan_of_selectively_read_archive() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive_path = os.path.join(tmpdir, "experiment.zip")
+        with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("first.pbif", '"python:pypi<numpy[>=2.0.0]>@numpy.random.rand"')
+            archive.writestr("second.pbif", '"local:numpy.linalg.inv"')
+            archive.writestr("data/values.csv", "1,2,3")
+        output_dir = os.path.join(tmpdir, "output")
+        os.makedirs(output_dir)
+        _, primary_dependencies = execute_bsedic(
+            ProgramArguments(
+                archive_path,
+                output_dir,
+                None,
+                ContainerizationTypes.SINGLE,
+                ContainerizationEngine.DOCKER,
+                archive_extraction_mode=ArchiveExtractionMode.SELECTIVE,
+                dependency_scan_mode=DependencyScanMode.STREAMING,
+            )
+        )
+        assert primary_dependencies.get_pypi_dependencies() == ["numpy>=2.0.0"]
+        assert sorted(os.listdir(os.path.join(output_dir, "experiment"))) == ["first.pbif", "second.pbif"]
+        with zipfile.ZipFile(os.path.join(output_dir, "experiment.zip")) as new_archive:
+            assert new_archive.namelist() == ["first.pbif", "second.pbif", "data/values.csv"]
+            assert new_archive.read("first.pbif") == b'"local:numpy.random.rand"'
+            assert new_archive.read("second.pbif") == b'"local:numpy.linalg.inv"'
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from bsedic.pbif.containerization.container_constructor import determine_dependencies, scan_dependencies
+from bsedic.pbif.dependency_resolution.structured_scan import (
+    SCALAR_ARRAY,
+    determine_dependencies_structured,
+    iter_pbif_events,
+)
+from bsedic.utils.input_types import DependencyScanMode
+
+_document = {
+    "description": "mentions python:pypi<scipy>@scipy.optimize.minimize, but is not a node",
+    "numerical_data": {"_type": "array", "_shape": [2, 3], "_data": [[1.5, -2e-3, 3], [4, 5, 6]]},
+    "simulation": {
+        "_type": "composite",
+        "address": "local:composite",
+        "config": {
+            "state": {
+                "ode": {
+                    "address": "python:pypi<copasi-basico[>=0.8]>@basico.model_io.load_model",
+                    "inputs": {"species": ["species_store"]},
+                    "_type": "process",  # after the address
+                },
+                "species_store": {"_type": "map[float]", "values": [0.1, 0.2, 0.3, 0.4]},
+            }
+        },
+    },
+    "readdy": {"_type": "step", "address": "python:conda<readdy>@readdy.ReactionDiffusionSystem"},
+    "not_a_node": {"_type": "string", "address": "python:pypi<numpy>@numpy.random.rand"},
+}
+
+
+def test_structured_scan_rewrites_process_node_addresses_only() -> None:
+    document = json.dumps(_document, indent=2)
+    dependencies, updated_document = determine_dependencies_structured(
+        document, ["pypi::copasi-basico", "conda::readdy"]
+    )
+    assert dependencies.get_pypi_dependencies() == ["copasi-basico>=0.8"]
+    assert dependencies.get_conda_dependencies() == ["readdy"]
+    expected_document = json.loads(document)
+    expected_document["simulation"]["config"]["state"]["ode"]["address"] = "local:basico.model_io.load_model"
+    expected_document["readdy"]["address"] = "local:readdy.ReactionDiffusionSystem"
+    assert json.loads(updated_document) == expected_document
+    # Formatting is untouched; only the addresses themselves are replaced
+    assert len(document) - len(updated_document) == len("python:pypi<copasi-basico[>=0.8]>@") + len(
+        "python:conda<readdy>@"
+    ) - 2 * len("local:")
+
+
+def test_structured_scan_matches_text_scan_when_addresses_are_only_in_nodes() -> None:
+    document = json.dumps({key: value for key, value in _document.items() if key not in ("description", "not_a_node")})
+    assert (
+        scan_dependencies(document, scan_mode=DependencyScanMode.STRUCTURED)[1] == determine_dependencies(document)[1]
+    )
+
+
+def test_structured_scan_skips_numeric_arrays_in_one_event() -> None:
+    document = json.dumps({"data": {"_type": "array", "_data": [[float(i) for i in range(10_000)]] * 100}})
+    events = [event for event, _, _ in iter_pbif_events(document)]
+    assert events.count(SCALAR_ARRAY) == 100
+    assert len(events) < 120
+
+
+def test_structured_scan_requires_json() -> None:
+    with pytest.raises(ValueError, match="requires a JSON document"):
+        determine_dependencies_structured("concentrations = {'a': 'map[float]'}")
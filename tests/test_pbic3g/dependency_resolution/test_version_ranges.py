@@ -0,0 +1,39 @@
+import pytest
+from packaging.version import Version
+
+from bsedic.pbif.dependency_resolution.version_ranges import (
+    VersionInterval,
+    is_version_range_subset,
+    parse_version_ranges,
+)
+
+
+def test_version_ranges_are_merged_intervals() -> None:
+    assert parse_version_ranges(">=1.2,!=1.3,<2") == (
+        VersionInterval(Version("1.2"), True, Version("1.3"), False),
+        VersionInterval(Version("1.3"), False, Version("2.dev0"), False),
+    )
+    assert parse_version_ranges("~=1.4.2") == (VersionInterval(Version("1.4.2"), True, Version("1.5.dev0"), False),)
+    assert parse_version_ranges(">2,<1") == ()
+
+
+@pytest.mark.parametrize(
+    ("requested", "allowed", "is_subset"),
+    [
+        (">=1.2,<1.5", ("~=1.1",), True),
+        (">=1.2", ("~=1.1",), False),
+        ("==2.0rc1", ("<2.0",), False),  # `<2.0` excludes the pre-releases of 2.0
+        ("<=2.0", ("<2.0",), False),
+        (">=1,<=1.3", (">=1,<=1.2", ">1.2"), True),
+        (">=1", (">=1,<1.3", ">1.3"), False),
+        ("==1.2.*", (">=1.2.dev0,<2",), True),
+        ("", (">=0",), False),
+    ],
+)
+def test_version_range_subsets(requested: str, allowed: tuple[str, ...], is_subset: bool) -> None:
+    assert is_version_range_subset(requested, allowed) == is_subset
+
+
+def test_invalid_version_range() -> None:
+    with pytest.raises(ValueError, match="Invalid version specifier"):
+        parse_version_ranges(">>1")
@@ -5,6 +5,12 @@ import zipfile
 import pytest
 
 from bsedic.execution import execute_bsedic as run_bsedic
+from bsedic.pbif.dependency_resolution import whitelist
+from bsedic.pbif.dependency_resolution.whitelist import (
+    compile_passlist,
+    load_compiled_passlist,
+    save_compiled_passlist,
+)
 from bsedic.utils.input_types import ContainerizationEngine, ContainerizationTypes, ProgramArguments
 
 fake_input_file = """
@@ -48,6 +54,94 @@ pypi::process-bigraph
     _perform_execution_with_whitelist(fake_input_file, valid_whitelist)
 
 
+def test_compiled_passlist_normalizes_names_and_matches_prefixes() -> None:
+    passlist = compile_passlist(["pypi::Process_Bigraph", "pypi::bsedic-*", "conda::*[>=1.0]"])
+    passlist.check_dependency("pypi", "process.bigraph", "<1.0")
+    passlist.check_dependency("pypi", "bsedic-tools", "")
+    passlist.check_dependency("pypi", "BSEDIC_Tools", "")
+    passlist.check_dependency("conda", "readdy", ">=2.0")
+    with pytest.raises(ValueError, match="is not a trusted package"):
+        passlist.check_dependency("pypi", "bsedic", "")
+    with pytest.raises(ValueError, match="Unapproved source"):
+        compile_passlist(["pypi::numpy"]).check_dependency("conda", "numpy", "")
+
+
+def test_compiled_passlist_checks_requested_versions_against_allowed_ranges() -> None:
+    passlist = compile_passlist(["pypi::numpy[>=1.26,<2]", "pypi::numpy[~=2.1]", "pypi::scipy"])
+    for allowed_version in ("==1.26.4", ">=1.26,<1.27", "~=2.1", "==2.3.*"):
+        passlist.check_dependency("pypi", "numpy", allowed_version)
+    for disallowed_version in (">=1.26", ">=2.1", "<2.2", ""):  # `""` is any version at all
+        with pytest.raises(ValueError, match="outside of the trusted versions"):
+            passlist.check_dependency("pypi", "numpy", disallowed_version)
+    passlist.check_dependency("pypi", "scipy", "<0.1")
+
+
+def test_compiled_passlist_rejects_invalid_entries() -> None:
+    for invalid_entry in ("pypi:numpy", "pypi::", "pypi::num*py", "pypi::numpy[>>1]", "pypi::numpy::scipy"):
+        with pytest.raises(ValueError, match="invalid whitelist entry"):
+            compile_passlist([invalid_entry])
+
+
+def test_compiled_passlist_round_trips_through_json() -> None:
+    entries = [f"pypi::package-{index}[>={index % 5}]" for index in range(1_000)] + ["conda::bio*"]
+    passlist = compile_passlist(entries)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        compiled_passlist_path = os.path.join(tmpdir, "passlist.json")
+        save_compiled_passlist(passlist, compiled_passlist_path)
+        loaded_passlist = load_compiled_passlist(compiled_passlist_path)
+    assert loaded_passlist == passlist
+    assert loaded_passlist.entries == entries
+    loaded_passlist.check_dependency("pypi", "Package_999", ">=4.2")
+    loaded_passlist.check_dependency("conda", "biopython", "")
+
+
+def test_compiled_passlist_file_is_loaded_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    load_count = 0
+    original_load_compiled_passlist = whitelist.load_compiled_passlist
+
+    def count_loads(compiled_passlist_path: str) -> whitelist.CompiledPasslist:
+        nonlocal load_count
+        load_count += 1
+        return original_load_compiled_passlist(compiled_passlist_path)
+
+    monkeypatch.setattr(whitelist, "load_compiled_passlist", count_loads)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        compiled_passlist_path = os.path.join(tmpdir, "passlist.json")
+        save_compiled_passlist(compile_passlist(["pypi::numpy", "pypi::process-bigraph"]), compiled_passlist_path)
+        output_dir = os.path.join(tmpdir, "output")
+        os.makedirs(output_dir)
+        for _ in range(3):
+            input_path = os.path.join(tmpdir, "inputFile.pbif")
+            with open(input_path, "w") as input_file:
+                input_file.write(fake_input_file)
+            run_bsedic(
+                ProgramArguments(
+                    input_path,
+                    output_dir,
+                    None,
+                    ContainerizationTypes.SINGLE,
+                    ContainerizationEngine.DOCKER,
+                    compiled_passlist_path=compiled_passlist_path,
+                )
+            )
+        assert load_count == 1
+        save_compiled_passlist(compile_passlist(["pypi::scipy"]), compiled_passlist_path)
+        with open(input_path, "w") as input_file:
+            input_file.write(fake_input_file)
+        with pytest.raises(ValueError, match="not a trusted package"):
+            run_bsedic(
+                ProgramArguments(
+                    input_path,
+                    output_dir,
+                    None,
+                    ContainerizationTypes.SINGLE,
+                    ContainerizationEngine.DOCKER,
+                    compiled_passlist_path=compiled_passlist_path,
+                )
+            )
+        assert load_count == 2
+
+
 def _perform_execution_with_whitelist(input_pbif_as_string: str, whitelist_str: str):
     correct_answer = """
 FROM ghcr.io/astral-sh/uv:python3.12-bookworm
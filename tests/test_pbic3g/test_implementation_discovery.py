@@ -0,0 +1,93 @@
+import os
+import sys
+import tempfile
+
+from bsedic.pbif.implementation_discovery import discover_implementations
+
+_PACKAGE_SOURCES = {
+    "process_bigraph/__init__.py": "class Process:\n    pass\n\n\nclass Step:\n    pass\n",
+    "fake_bsail/__init__.py": "from .abstractions import AbstractSimulator as AbstractSimulator\n",
+    "fake_bsail/abstractions.py": (
+        "from process_bigraph.composite import Process\n\n\nclass AbstractSimulator(Process):\n    pass\n"
+    ),
+    "fake_plugin/__init__.py": "",
+    "fake_plugin/simulators.py": (
+        "import process_bigraph as pb\n"
+        "from fake_bsail import AbstractSimulator\n\n"
+        "raise RuntimeError('importing this module is expensive')\n\n\n"
+        "class OdeSimulator(AbstractSimulator):\n"
+        "    config_schema = {'model_source': 'string', 'time': {'_type': 'float', '_default': 10.0}}\n\n"
+        "    def inputs(self):\n"
+        "        return {'species_counts': 'map[float]'}\n\n"
+        "    def outputs(self):\n"
+        "        return {'species_counts': 'map[float]', 'time': 'float'}\n\n\n"
+        "class Converter(pb.Step):\n"
+        "    inputs = {**{'a': 'float'}}\n\n\n"
+        "class Helper:\n"
+        "    pass\n"
+    ),
+    "fake_plugin/steps/__init__.py": "",
+    "fake_plugin/steps/analysis.py": (
+        "from ..simulators import Converter as BaseConverter\n\n\nclass Plotter(BaseConverter):\n    pass\n"
+    ),
+    "fake_plugin/stiff.py": (
+        "from fake_plugin import simulators\n\n\n"
+        "class StiffOdeSimulator(simulators.OdeSimulator):\n"
+        "    config_schema = {'model_source': 'string', 'tolerance': 'float'}\n"
+    ),
+    "fake_plugin/lazy.py": "from process_bigraph import Step\n\n\nclass Lazy(Step):\n    pass\n",
+    "fake_plugin/broken.py": "class Broken(\n",
+}
+
+
+def test_implementations_are_discovered_without_importing_them() -> None:
+    with tempfile.TemporaryDirectory() as source_dir:
+        for relative_path, source in _PACKAGE_SOURCES.items():
+            os.makedirs(os.path.dirname(os.path.join(source_dir, relative_path)), exist_ok=True)
+            with open(os.path.join(source_dir, relative_path), "w") as source_file:
+                source_file.write(source)
+        previous_module_names = set(sys.modules)
+        sys.path.insert(0, source_dir)
+        try:
+            implementations = {
+                implementation.get_address(): implementation
+                for implementation in discover_implementations(["fake_plugin"], ["fake_bsail"], max_workers=2)
+            }
+            assert sorted(implementations) == [
+                "local:fake_plugin.lazy.Lazy",
+                "local:fake_plugin.simulators.Converter",
+                "local:fake_plugin.simulators.OdeSimulator",
+                "local:fake_plugin.steps.analysis.Plotter",
+                "local:fake_plugin.stiff.StiffOdeSimulator",
+            ]
+            assert not any(module_name.startswith(("fake_plugin", "fake_bsail")) for module_name in sys.modules)
+
+            simulator = implementations["local:fake_plugin.simulators.OdeSimulator"]
+            assert simulator.kind == "process"
+            assert simulator.bases == ["fake_bsail.AbstractSimulator"]
+            assert simulator.abstraction == "fake_bsail.abstractions.AbstractSimulator"
+            assert simulator.inputs == ["species_counts"]
+            assert simulator.outputs == ["species_counts", "time"]
+            assert simulator.config_schema == {"model_source": "string", "time": {"_type": "float", "_default": 10.0}}
+            converter = implementations["local:fake_plugin.simulators.Converter"]
+            assert converter.kind == "step"
+            assert converter.inputs is None  # not a plain literal
+            plotter = implementations["local:fake_plugin.steps.analysis.Plotter"]
+            assert plotter.kind == "step"
+            assert plotter.inputs is None  # inherited, but still not a plain literal
+
+            # Ports and config schemas not declared by a class itself come from the nearest base declaring them
+            stiff_simulator = implementations["local:fake_plugin.stiff.StiffOdeSimulator"]
+            assert stiff_simulator.abstraction == "fake_bsail.abstractions.AbstractSimulator"
+            assert stiff_simulator.inputs == ["species_counts"]
+            assert stiff_simulator.outputs == ["species_counts", "time"]
+            assert stiff_simulator.config_schema == {"model_source": "string", "tolerance": "float"}
+
+            # Only a selected implementation is imported
+            assert implementations["local:fake_plugin.lazy.Lazy"].load().__name__ == "Lazy"
+            assert "fake_plugin.lazy" in sys.modules
+            assert "fake_plugin.simulators" not in sys.modules
+        finally:
+            sys.path.remove(source_dir)
+            for module_name in set(sys.modules) - previous_module_names:
+                del sys.modules[module_name]
@@ -0,0 +1,52 @@
+import os
+import tempfile
+
+from bsedic.pbif.registry_index import RegistryIndex, get_registry_index, parse_requirements, update_registry_index
+
+
+def _write_distribution(site_dir: str, name: str, requires_dist: list[str], record: str = "") -> str:
+    metadata_path = os.path.join(site_dir, f"{name.replace('-', '_')}-1.0.dist-info")
+    os.makedirs(metadata_path)
+    with open(os.path.join(metadata_path, "METADATA"), "w") as metadata_file:
+        metadata_file.write(f"Metadata-Version: 2.1\nName: {name}\nVersion: 1.0\n")
+        metadata_file.writelines(f"Requires-Dist: {requirement_str}\n" for requirement_str in requires_dist)
+    with open(os.path.join(metadata_path, "RECORD"), "w") as record_file:
+        record_file.write(record)
+    return metadata_path
+
+
+def test_requirements_are_parsed_without_extra_only_ones() -> None:
+    assert parse_requirements([
+        "bsail (>=0.1,<1)",
+        "Process_Bigraph>=0.0.30",
+        'pytest; extra == "test"',
+        "not a requirement!",
+    ]) == {"bsail": "<1,>=0.1", "process-bigraph": ">=0.0.30"}
+
+
+def test_index_only_rescans_changed_distributions() -> None:
+    with tempfile.TemporaryDirectory() as site_dir:
+        plugin_metadata_path = _write_distribution(
+            site_dir, "My-Plugin", ["bsail>=1.0"], "my_plugin/__init__.py,,\nmy_plugin-1.0.dist-info/RECORD,,\n"
+        )
+        _write_distribution(site_dir, "extras-only", ['bsail; extra == "plugins"'])
+        registry_index_path = os.path.join(site_dir, "index", "registry_index.json")
+        registry_index = get_registry_index([site_dir], registry_index_path)
+        assert [entry.name for entry in registry_index.find_dependents("BSail")] == ["my-plugin"]
+        assert registry_index.get_distribution("my_plugin").top_level_modules == ["my_plugin"]
+        assert os.path.isfile(registry_index_path)
+
+        # Unchanged metadata is not parsed again (the stale requirement survives), but new distributions are found
+        metadata_file_path = os.path.join(plugin_metadata_path, "METADATA")
+        metadata_stat = os.stat(metadata_file_path)
+        with open(metadata_file_path, "a") as metadata_file:
+            metadata_file.write("Requires-Dist: numpy\n")
+        os.utime(metadata_file_path, ns=(metadata_stat.st_atime_ns, metadata_stat.st_mtime_ns))
+        _write_distribution(site_dir, "another-plugin", ["bsail"])
+        registry_index = get_registry_index([site_dir], registry_index_path)
+        assert registry_index.get_distribution("my-plugin").requirements == {"bsail": ">=1.0"}
+        assert sorted(entry.name for entry in registry_index.find_dependents("bsail")) == [
+            "another-plugin",
+            "my-plugin",
+        ]
+        assert update_registry_index(RegistryIndex(), [site_dir]).get_distribution("my-plugin").requires("numpy")
@@ -0,0 +1,103 @@
+import os
+import stat
+import tempfile
+import time
+import zipfile
+
+import pytest
+
+from bsedic.execution import execute_bsedic
+from bsedic.utils.atomic_file import get_umask
+from bsedic.utils.input_types import ContainerizationEngine, ContainerizationTypes, ProgramArguments
+from bsedic.utils.result_cache import CachedResult, ResultCache, compute_result_cache_key
+
+fake_input_file = """
+"python:pypi<numpy[>=2.0.0]>@numpy.random.rand"
+"python:conda<readdy>@readdy.ReactionDiffusionSystem"
+""".strip()
+
+
+def _make_cached_result(document: str) -> CachedResult:
+    return CachedResult(
+        updated_documents=[document], dockerfile="FROM scratch", pypi_dependencies=["numpy"], conda_dependencies=[]
+    )
+
+
+def test_cache_key_depends_on_every_input() -> None:
+    base_args = (["doc"], ["pypi::numpy"], "template", ContainerizationTypes.SINGLE, ContainerizationEngine.DOCKER)
+    base_key = compute_result_cache_key(*base_args)
+    assert base_key == compute_result_cache_key(*base_args)
+    variations = [
+        (["doc2"], ["pypi::numpy"], "template", ContainerizationTypes.SINGLE, ContainerizationEngine.DOCKER),
+        (["doc", "doc2"], ["pypi::numpy"], "template", ContainerizationTypes.SINGLE, ContainerizationEngine.DOCKER),
+        (["do", "cdoc2"], ["pypi::numpy"], "template", ContainerizationTypes.SINGLE, ContainerizationEngine.DOCKER),
+        (["doc"], None, "template", ContainerizationTypes.SINGLE, ContainerizationEngine.DOCKER),
+        (["doc"], [], "template", ContainerizationTypes.SINGLE, ContainerizationEngine.DOCKER),
+        (["doc"], ["pypi::numpy"], "template2", ContainerizationTypes.SINGLE, ContainerizationEngine.DOCKER),
+        (["doc"], ["pypi::numpy"], "template", ContainerizationTypes.NONE, ContainerizationEngine.DOCKER),
+        (["doc"], ["pypi::numpy"], "template", ContainerizationTypes.SINGLE, ContainerizationEngine.BOTH),
+    ]
+    keys = {compute_result_cache_key(*variation) for variation in variations}  # type: ignore[arg-type]
+    assert base_key not in keys
+    assert len(keys) == len(variations)
+
+
+def test_result_cache_evicts_least_recently_used() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        entry_size = len(_make_cached_result("x" * 1000).model_dump_json())
+        result_cache = ResultCache(tmpdir, max_bytes=entry_size * 2 + 10)
+        result_cache.put("first", _make_cached_result("1" * 1000))
+        time.sleep(0.01)
+        result_cache.put("second", _make_cached_result("2" * 1000))
+        time.sleep(0.01)
+        assert result_cache.get("first") is not None  # `second` is now the least recently used
+        time.sleep(0.01)
+        result_cache.put("third", _make_cached_result("3" * 1000))
+        assert result_cache.get("second") is None
+        assert result_cache.get("first") is not None
+        assert result_cache.get("third") is not None
+        assert result_cache.get_statistics() == {"hits": 3, "misses": 1}
+
+
+def test_result_cache_entries_are_written_atomically() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        result_cache = ResultCache(tmpdir)
+        result_cache.put("entry", _make_cached_result("document"))
+        (entry_name,) = os.listdir(tmpdir)
+        assert stat.S_IMODE(os.stat(os.path.join(tmpdir, entry_name)).st_mode) == 0o666 & ~get_umask()
+
+        os.mkdir(os.path.join(tmpdir, "blocked.json"))  # so the entry can not be moved into place
+        with pytest.raises(OSError):
+            result_cache.put("blocked", _make_cached_result("document"))
+        assert sorted(os.listdir(tmpdir)) == sorted([entry_name, "blocked.json"])  # no temporary file left behind
+
+
+def test_execute_bsedic_reuses_cached_results() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_dir = os.path.join(tmpdir, "cache")
+        zip_path = os.path.join(tmpdir, "inputArchive.omex")
+        outputs: list[str] = []
+        for run_number in range(2):
+            with zipfile.ZipFile(zip_path, "w") as zip_ref:
+                zip_ref.writestr("inputFile.pbif", fake_input_file)
+            output_dir = os.path.join(tmpdir, f"run{run_number}")
+            os.makedirs(output_dir)
+            test_args = ProgramArguments(
+                zip_path,
+                output_dir,
+                None,
+                ContainerizationTypes.SINGLE,
+                ContainerizationEngine.BOTH,
+                result_cache_dir=cache_dir,
+            )
+            template, dependencies = execute_bsedic(test_args)
+            assert dependencies.get_compact_repr() == "numpy>=2.0.0;readdy"
+            with open(os.path.join(output_dir, "Dockerfile")) as docker_file:
+                dockerfile = docker_file.read()
+            with open(os.path.join(output_dir, "singularity.def")) as definition_file:
+                assert definition_file.read() == template.representation
+            with zipfile.ZipFile(os.path.join(output_dir, "inputArchive.omex")) as zip_ref:
+                rewritten_document = zip_ref.read("inputFile.pbif").decode()
+            outputs.append(dockerfile + template.representation + rewritten_document)
+        assert outputs[0] == outputs[1]
+        assert len(os.listdir(cache_dir)) == 1
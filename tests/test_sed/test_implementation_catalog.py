@@ -0,0 +1,107 @@
+import os
+import sys
+import tempfile
+
+from bsedic.pbif.local_registry import refresh_implementation_catalog
+from bsedic.pbif.registry_index import get_registry_index
+from bsedic.sed.abstract_router import LocalRouter
+from bsedic.sed.data_structure import ExperimentNode, ExperimentNodeImplementation
+from bsedic.sed.implementation_catalog import ImplementationCatalog, UnknownPortImplementation
+
+_SITE_SOURCES = {
+    "bsail/__init__.py": "from process_bigraph import Process\n\n\nclass OdeSimulator(Process):\n    pass\n",
+    "ode_plugin/__init__.py": (
+        "from bsail import OdeSimulator\n\n\n"
+        "class CopasiOde(OdeSimulator):\n"
+        "    def inputs(self):\n"
+        "        return {'species': 'map[float]'}\n\n"
+        "    def outputs(self):\n"
+        "        return {'species': 'map[float]', 'time': 'float'}\n\n\n"
+        "class StiffCopasiOde(CopasiOde):\n"
+        "    pass\n\n\n"
+        "class UnknownPorts(OdeSimulator):\n"
+        "    pass\n"
+    ),
+    "ode_plugin-1.0.dist-info/METADATA": "Metadata-Version: 2.1\nName: ode-plugin\nVersion: 1.0\nRequires-Dist: bsail\n",
+    "ode_plugin-1.0.dist-info/top_level.txt": "ode_plugin\n",
+}
+
+
+def _implementation(address: str, definition: str, inputs: set[str]) -> ExperimentNodeImplementation:
+    return ExperimentNodeImplementation(
+        id=address.rpartition(".")[2], definition=definition, inputs=inputs, outputs={"time"}, address=address
+    )
+
+
+def test_catalog_is_indexed_by_definition_and_port_signature() -> None:
+    with tempfile.TemporaryDirectory() as catalog_dir:
+        catalog_path = os.path.join(catalog_dir, "catalog.sqlite")
+        with ImplementationCatalog(catalog_path) as implementation_catalog:
+            assert (
+                implementation_catalog.upsert_distributions({
+                    "plugin-a": (1, [_implementation("local:a.Ode", "OdeSimulator", {"species", "volume"})]),
+                    "plugin-b": (1, [_implementation("local:b.Ssa", "SsaSimulator", {"species"})]),
+                })
+                == 2
+            )
+        with ImplementationCatalog(catalog_path) as implementation_catalog:  # persisted
+            assert [n.address for n in implementation_catalog.find_by_definition("OdeSimulator")] == ["local:a.Ode"]
+            assert [
+                n.address for n in implementation_catalog.find_by_port_signature(["volume", "species"], ["time"])
+            ] == ["local:a.Ode"]
+            assert implementation_catalog.find_by_port_signature({"species"}, {"time"}, "OdeSimulator") == []
+
+            # Upserting a distribution replaces what it provided; removing it removes its implementations
+            router_digest = LocalRouter(implementation_catalog).get_routing_digest()
+            implementation_catalog.upsert_distributions({
+                "plugin-a": (2, [_implementation("local:a.Ode2", "OdeSimulator", {"species"})])
+            })
+            assert LocalRouter(implementation_catalog).get_routing_digest() != router_digest
+            assert implementation_catalog.get_implementation("local:a.Ode") is None
+            assert implementation_catalog.get_distribution_mtimes() == {"plugin-a": 2, "plugin-b": 1}
+            implementation_catalog.remove_distributions(["plugin-b"])
+            assert implementation_catalog.find_by_definition("SsaSimulator") == []
+
+            routed = LocalRouter(implementation_catalog).abstract_entity_to_implementation(
+                ExperimentNode(id="ode", definition="OdeSimulator", inputs={"species"}, outputs={"time"})
+            )
+            assert (routed.id, routed.address) == ("ode", "local:a.Ode2")
+
+
+def test_catalog_refresh_only_rediscovers_changed_distributions() -> None:
+    with tempfile.TemporaryDirectory() as site_dir:
+        for relative_path, source in _SITE_SOURCES.items():
+            os.makedirs(os.path.dirname(os.path.join(site_dir, relative_path)), exist_ok=True)
+            with open(os.path.join(site_dir, relative_path), "w") as source_file:
+                source_file.write(source)
+        sys.path.insert(0, site_dir)
+        try:
+            registry_index_path = os.path.join(site_dir, "registry_index.json")
+            with ImplementationCatalog(":memory:") as implementation_catalog:
+                registry_index = get_registry_index([site_dir], registry_index_path)
+                assert refresh_implementation_catalog(implementation_catalog, registry_index) == 2
+                assert refresh_implementation_catalog(implementation_catalog, registry_index) == 0
+                assert implementation_catalog.find_by_definition("OdeSimulator") == [
+                    ExperimentNodeImplementation(
+                        id=class_name,
+                        definition="OdeSimulator",
+                        inputs={"species"},
+                        outputs={"species", "time"},
+                        address=f"local:ode_plugin.{class_name}",
+                    )
+                    for class_name in ("CopasiOde", "StiffCopasiOde")  # ports inherited by the latter
+                ]
+                assert implementation_catalog.find_unknown_port_implementations("OdeSimulator") == [
+                    UnknownPortImplementation(
+                        id="UnknownPorts", definition="OdeSimulator", address="local:ode_plugin.UnknownPorts"
+                    )
+                ]
+                assert "ode_plugin" not in sys.modules
+
+                os.remove(os.path.join(site_dir, "ode_plugin-1.0.dist-info", "METADATA"))
+                registry_index = get_registry_index([site_dir], registry_index_path)
+                assert refresh_implementation_catalog(implementation_catalog, registry_index) == 0
+                assert implementation_catalog.get_distribution_mtimes() == {}
+                assert implementation_catalog.find_unknown_port_implementations() == []
+        finally:
+            sys.path.remove(site_dir)
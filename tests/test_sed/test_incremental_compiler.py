@@ -0,0 +1,168 @@
+import json
+import os
+import sqlite3
+import tempfile
+from typing import Optional
+
+import pytest
+
+from bsedic.sed.abstract_router import IndexedRouter
+from bsedic.sed.compiler import SedCompilationError, SedCompiler, SedCompilerSettings
+from bsedic.sed.data_structure import (
+    ExperimentEntityList,
+    ExperimentNode,
+    ExperimentNodeImplementation,
+    ExperimentWiring,
+)
+from bsedic.sed.node_fingerprint import compute_node_fingerprints
+from bsedic.sed.selection_policy import CostModel, CostModelPolicy
+from bsedic.sed.stage_cache import StageCache
+
+_IMPLEMENTATIONS = [
+    ExperimentNodeImplementation(
+        id=definition, definition=definition, inputs={"x"}, outputs={"y"}, address=f"local:plugin.{definition}"
+    )
+    for definition in ("Generator", "Special")
+]
+
+
+class _CountingRouter(IndexedRouter):
+    def __init__(
+        self,
+        implementations: list[ExperimentNodeImplementation] = _IMPLEMENTATIONS,
+        cost_model: Optional[CostModel] = None,
+    ) -> None:
+        super().__init__(implementations, None if cost_model is None else CostModelPolicy(cost_model))
+        self.routed_node_ids: list[str] = []
+
+    def route_entity_list(self, abstract_entity_list: ExperimentEntityList) -> ExperimentEntityList:
+        self.routed_node_ids += [node.id for node in abstract_entity_list.nodes]
+        return super().route_entity_list(abstract_entity_list)
+
+
+def _entity_list(special_source: str) -> ExperimentEntityList:
+    # 10 independent nodes, then a chain of 10 with `n_15` in the middle
+    return ExperimentEntityList(
+        definitions={"Generator": "bsail", "Special": special_source},
+        nodes=[
+            ExperimentNode(id=f"n_{i}", definition="Special" if i == 15 else "Generator", inputs={"x"}, outputs={"y"})
+            for i in range(20)
+        ],
+        wirings=[
+            ExperimentWiring(id=f"w_{i}", output=f"n_{i}", input=f"n_{i + 1}", protocol="float") for i in range(10, 19)
+        ],
+    )
+
+
+def test_recompile_only_redoes_changed_and_downstream_nodes() -> None:
+    with tempfile.TemporaryDirectory() as cache_dir:
+        stage_cache_path = os.path.join(cache_dir, "stages.sqlite")
+        router = _CountingRouter()
+        compiler = SedCompiler(SedCompilerSettings(router=router, stage_cache_path=stage_cache_path), None)
+        first_pbif = json.loads(compiler.compile(_entity_list("bsail-v1")))
+        assert first_pbif["state"]["n_15"]["address"] == "local:plugin.Special"
+        assert len(router.routed_node_ids) == 20
+
+        # A fresh compiler, as in a later run, reuses the persisted stage outputs
+        router = _CountingRouter()
+        compiler = SedCompiler(SedCompilerSettings(router=router, stage_cache_path=stage_cache_path), None)
+        assert json.loads(compiler.compile(_entity_list("bsail-v1"))) == first_pbif
+        assert router.routed_node_ids == []
+        assert json.loads(compiler.compile(_entity_list("bsail-v2"))) == first_pbif
+        assert router.routed_node_ids == ["n_15", "n_16", "n_17", "n_18", "n_19"]
+
+
+def test_routing_is_redone_when_the_router_changes() -> None:
+    special_implementations = [
+        implementation.model_copy(update={"address": f"local:{package}.Special"})
+        for package in ("other_plugin", "plugin")
+        for implementation in _IMPLEMENTATIONS
+        if implementation.definition == "Special"
+    ]
+    with tempfile.TemporaryDirectory() as cache_dir:
+        settings = SedCompilerSettings(stage_cache_path=os.path.join(cache_dir, "stages.sqlite"))
+
+        def compile_special_address(router: _CountingRouter) -> str:
+            settings.router = router
+            return str(
+                json.loads(SedCompiler(settings, None).compile(_entity_list("bsail")))["state"]["n_15"]["address"]
+            )
+
+        assert compile_special_address(_CountingRouter()) == "local:plugin.Special"
+        # Another implementation was installed, which comes first
+        router = _CountingRouter([*_IMPLEMENTATIONS[:1], *special_implementations])
+        assert compile_special_address(router) == "local:other_plugin.Special"
+        assert len(router.routed_node_ids) == 20
+        router = _CountingRouter([*_IMPLEMENTATIONS[:1], *special_implementations])
+        assert compile_special_address(router) == "local:other_plugin.Special"
+        assert router.routed_node_ids == []
+        # New measurements change what the cost model policy picks
+        cost_model = CostModel()
+        cost_model.record_measurement("local:plugin.Special", 1.0, 10**6)
+        router = _CountingRouter([*_IMPLEMENTATIONS[:1], *special_implementations], cost_model)
+        assert compile_special_address(router) == "local:plugin.Special"
+
+
+def test_stage_cache_evicts_least_recently_used_outputs() -> None:
+    with (
+        tempfile.TemporaryDirectory() as cache_dir,
+        StageCache(os.path.join(cache_dir, "stages.sqlite"), max_bytes=1_000) as stage_cache,
+    ):
+        stage_cache.put_many(0, {f"old_{i}": "x" * 90 for i in range(5)})  # 95 bytes each, with the fingerprint
+        assert list(stage_cache.get_many(0, ["old_0"])) == ["old_0"]  # now the most recently used
+        stage_cache.put_many(0, {f"new_{i}": "x" * 90 for i in range(6)})
+        assert stage_cache.get_total_bytes() == 950
+        remaining_outputs = stage_cache.get_many(0, [*(f"old_{i}" for i in range(5)), *(f"new_{i}" for i in range(6))])
+        assert sorted(remaining_outputs) == [*(f"new_{i}" for i in range(6)), "old_0", "old_1", "old_2", "old_3"]
+
+
+def test_closed_compiler_releases_its_stage_cache() -> None:
+    with tempfile.TemporaryDirectory() as cache_dir:
+        settings = SedCompilerSettings(router=_CountingRouter(), stage_cache_path=os.path.join(cache_dir, "s.sqlite"))
+        with SedCompiler(settings, None) as compiler:
+            compiler.compile(_entity_list("bsail"))
+        with pytest.raises(sqlite3.ProgrammingError):
+            compiler.compile(_entity_list("bsail"))
+
+
+def test_invalid_entity_list_reports_every_error() -> None:
+    entity_list = _entity_list("bsail").model_copy(
+        update={
+            "definitions": {"Generator": "bsail"},
+            "wirings": [ExperimentWiring(id="dangling", output="n_0", input="missing", protocol="float")],
+        }
+    )
+    with pytest.raises(SedCompilationError) as compilation_error:
+        SedCompiler(SedCompilerSettings(router=_CountingRouter()), None).compile(entity_list)
+    assert compilation_error.value.error_messages == [
+        "node `n_15` uses undeclared definition `Special`",
+        "wiring `dangling` leads into unknown node `missing`",
+    ]
+
+
+def test_fingerprints_follow_cycles_and_deep_chains() -> None:
+    def chain(length: int, edited_source: str) -> ExperimentEntityList:
+        return ExperimentEntityList(
+            definitions={"Generator": "bsail", "Special": edited_source},
+            nodes=[
+                ExperimentNode(
+                    id=f"n_{i}", definition="Special" if i == 2 else "Generator", inputs=set(), outputs=set()
+                )
+                for i in range(length)
+            ],
+            wirings=[
+                ExperimentWiring(id=f"w_{i}", output=f"n_{i}", input=f"n_{(i + 1) % 4}", protocol="float")
+                for i in range(4)  # a feedback loop of the first four nodes
+            ]
+            + [
+                ExperimentWiring(id=f"c_{i}", output=f"n_{i}", input=f"n_{i + 1}", protocol="float")
+                for i in range(3, length - 1)
+            ],
+        )
+
+    before = compute_node_fingerprints(chain(5000, "bsail-v1"))
+    after = compute_node_fingerprints(chain(5000, "bsail-v2"))
+    assert all(before[node_id] != after[node_id] for node_id in before)  # all of the loop, and everything after it
+    short_chain = chain(6, "bsail-v1")
+    reordered_chain = short_chain.model_copy(update={"wirings": list(reversed(short_chain.wirings))})
+    assert compute_node_fingerprints(reordered_chain) == compute_node_fingerprints(short_chain)
@@ -0,0 +1,53 @@
+import pytest
+
+from bsedic.sed.abstract_router import IndexedRouter, RoutingError
+from bsedic.sed.data_structure import ExperimentEntityList, ExperimentNode, ExperimentNodeImplementation
+
+_IMPLEMENTATIONS = [
+    ExperimentNodeImplementation(
+        id="CopasiOde", definition="OdeSimulator", inputs={"species"}, outputs={"species", "time"}, address="local:c.C"
+    ),
+    ExperimentNodeImplementation(
+        id="Plotter", definition="Plot", inputs={"series"}, outputs=set(), address="local:p.Plotter"
+    ),
+]
+
+
+class _CountingRouter(IndexedRouter):
+    def __init__(self) -> None:
+        super().__init__(_IMPLEMENTATIONS)
+        self.lookups = 0
+
+    def _get_implementations(self, abstract_representation: ExperimentNode) -> list[ExperimentNodeImplementation]:
+        self.lookups += 1
+        return super()._get_implementations(abstract_representation)
+
+
+def _entity_list(nodes: list[ExperimentNode]) -> ExperimentEntityList:
+    return ExperimentEntityList(definitions={}, nodes=nodes, wirings=[])
+
+
+def test_entity_list_is_routed_once_per_signature() -> None:
+    nodes = [
+        ExperimentNode(id=f"ode_{i}", definition="OdeSimulator", inputs={"species"}, outputs={"time", "species"})
+        for i in range(1000)
+    ] + [ExperimentNode(id="plot", definition="Plot", inputs={"series"}, outputs=set())]
+    router = _CountingRouter()
+    routed = router.route_entity_list(_entity_list(nodes))
+    assert router.lookups == 2
+    assert [node.id for node in routed.nodes] == [node.id for node in nodes]
+    assert all(isinstance(node, ExperimentNodeImplementation) for node in routed.nodes)
+    assert routed.nodes[-1].address == "local:p.Plotter"
+
+
+def test_every_unroutable_node_is_reported() -> None:
+    nodes = [
+        ExperimentNode(id="ode", definition="OdeSimulator", inputs={"species"}, outputs={"species", "time"}),
+        ExperimentNode(id="ssa_a", definition="SsaSimulator", inputs={"species"}, outputs={"species"}),
+        ExperimentNode(id="ode_wrong_ports", definition="OdeSimulator", inputs=set(), outputs={"time"}),
+        ExperimentNode(id="ssa_b", definition="SsaSimulator", inputs={"species"}, outputs={"species"}),
+    ]
+    with pytest.raises(RoutingError) as routing_error:
+        IndexedRouter(_IMPLEMENTATIONS).route_entity_list(_entity_list(nodes))
+    assert [node.id for node in routing_error.value.unroutable_nodes] == ["ssa_a", "ode_wrong_ports", "ssa_b"]
+    assert "3 node(s)" in str(routing_error.value)
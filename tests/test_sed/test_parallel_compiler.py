@@ -0,0 +1,60 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from bsedic.sed.abstract_router import IndexedRouter, RoutingError
+from bsedic.sed.compiler import CompilerWorkerPool, SedCompilationError, SedCompiler, SedCompilerSettings
+from bsedic.sed.data_structure import ExperimentEntityList, ExperimentNode, ExperimentNodeImplementation
+
+_ROUTER = IndexedRouter([
+    ExperimentNodeImplementation(
+        id="Ode", definition="OdeSimulator", inputs={"x"}, outputs={"y"}, address="local:plugin.Ode"
+    )
+])
+
+
+def _ensemble(size: int, definition_of: dict[int, str]) -> ExperimentEntityList:
+    return ExperimentEntityList(
+        definitions={"OdeSimulator": "bsail", "SsaSimulator": "bsail"},
+        nodes=[
+            ExperimentNode(
+                id=f"member_{i}", definition=definition_of.get(i, "OdeSimulator"), inputs={"x"}, outputs={"y"}
+            )
+            for i in range(size)
+        ],
+        wirings=[],
+    )
+
+
+@pytest.mark.parametrize("worker_pool", [CompilerWorkerPool.THREAD, CompilerWorkerPool.PROCESS])
+def test_parallel_stages_match_serial_compilation(worker_pool: CompilerWorkerPool) -> None:
+    settings = SedCompilerSettings(router=_ROUTER, worker_pool=worker_pool, max_workers=4, nodes_per_task=7)
+    ensemble = _ensemble(100, {})
+    serial_pbif = SedCompiler(SedCompilerSettings(router=_ROUTER), None).compile(ensemble)
+    assert SedCompiler(settings, None).compile(ensemble) == serial_pbif
+    assert list(json.loads(serial_pbif)["state"]) == [f"member_{i}" for i in range(100)]
+
+    # Errors are reported in node order, however the chunks were scheduled
+    with pytest.raises(SedCompilationError) as compilation_error:
+        SedCompiler(settings, None).compile(_ensemble(100, {90: "Undeclared", 3: "Undeclared"}))
+    assert compilation_error.value.error_messages == [
+        "node `member_3` uses undeclared definition `Undeclared`",
+        "node `member_90` uses undeclared definition `Undeclared`",
+    ]
+    with pytest.raises(RoutingError) as routing_error:
+        SedCompiler(settings, None).compile(_ensemble(100, {95: "SsaSimulator", 1: "SsaSimulator", 50: "SsaSimulator"}))
+    assert [node.id for node in routing_error.value.unroutable_nodes] == ["member_1", "member_50", "member_95"]
+
+
+def _compile_on_process_pool(ensemble: ExperimentEntityList) -> str:
+    settings = SedCompilerSettings(router=_ROUTER, worker_pool=CompilerWorkerPool.PROCESS, nodes_per_task=7)
+    return SedCompiler(settings, None).compile(ensemble)
+
+
+def test_process_pool_compiles_in_process_within_workers() -> None:
+    # e.g. within batch workers, which must not each start a pool of their own
+    ensemble = _ensemble(30, {})
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        pbif = executor.submit(_compile_on_process_pool, ensemble).result()
+    assert pbif == SedCompiler(SedCompilerSettings(router=_ROUTER), None).compile(ensemble)
@@ -0,0 +1,72 @@
+import io
+import json
+import socket
+import threading
+
+from bsedic.sed.abstract_router import IndexedRouter
+from bsedic.sed.compiler import SedCompiler, SedCompilerSettings
+from bsedic.sed.data_structure import ExperimentEntityList, ExperimentNode, ExperimentNodeImplementation
+from bsedic.sed.pbif_emitter import write_pbif_stream
+
+_COMPILER = SedCompiler(
+    SedCompilerSettings(
+        router=IndexedRouter([
+            ExperimentNodeImplementation(
+                id="Ode", definition="OdeSimulator", inputs={"x"}, outputs={"y"}, address="local:plugin.Ode"
+            )
+        ])
+    ),
+    None,
+)
+
+
+def _ensemble(size: int) -> ExperimentEntityList:
+    return ExperimentEntityList(
+        definitions={"OdeSimulator": "bsail"},
+        nodes=[
+            ExperimentNode(id=f"member_{i}", definition="OdeSimulator", inputs={"x"}, outputs={"y"})
+            for i in range(size)
+        ],
+        wirings=[],
+    )
+
+
+class _RecordingWriter(io.BytesIO):
+    def __init__(self) -> None:
+        super().__init__()
+        self.write_sizes: list[int] = []
+
+    def write(self, data: bytes) -> int:  # type: ignore[override]
+        self.write_sizes.append(len(data))
+        return super().write(data)
+
+
+def test_streamed_pbif_matches_compiled_pbif_with_bounded_writes() -> None:
+    ensemble = _ensemble(2000)
+    destination = _RecordingWriter()
+    written_bytes = _COMPILER.compile_to_stream(ensemble, destination, buffer_bytes=4096)
+    assert destination.getvalue().decode("utf-8") == _COMPILER.compile(ensemble)
+    assert written_bytes == len(destination.getvalue())
+    assert len(destination.write_sizes) > 1
+    assert max(destination.write_sizes) < 4096 + 512  # at most one node fragment past the buffer size
+
+    empty_destination = io.BytesIO()
+    _COMPILER.compile_to_stream(_ensemble(0), empty_destination)
+    assert json.loads(empty_destination.getvalue()) == {"state": {}, "composition": {}, "bridge": {}, "interface": {}}
+
+
+def test_pbif_streams_to_a_socket() -> None:
+    sending_socket, receiving_socket = socket.socketpair()
+    received = bytearray()
+
+    def receive() -> None:
+        while chunk := receiving_socket.recv(65536):
+            received.extend(chunk)
+
+    receiver = threading.Thread(target=receive)
+    receiver.start()
+    with sending_socket:
+        write_pbif_stream(iter(['{"state": {}', ', "composition": {}}']), sending_socket, buffer_bytes=8)
+    receiver.join()
+    receiving_socket.close()
+    assert json.loads(received) == {"state": {}, "composition": {}}
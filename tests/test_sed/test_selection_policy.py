@@ -0,0 +1,109 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from bsedic.sed.abstract_router import IndexedRouter
+from bsedic.sed.data_structure import ExperimentEntityList, ExperimentNode, ExperimentNodeImplementation
+from bsedic.sed.selection_policy import (
+    MAX_MEASUREMENTS_PER_IMPLEMENTATION,
+    CostModelPolicy,
+    load_cost_model,
+    record_cost_measurement,
+    save_cost_model,
+)
+
+_IMPLEMENTATIONS = [
+    ExperimentNodeImplementation(
+        id=class_name,
+        definition="OdeSimulator",
+        inputs={"species"},
+        outputs={"time"},
+        address=f"local:ode.{class_name}",
+    )
+    for class_name in ("Slow", "Fast", "Unmeasured")
+]
+_NODE = ExperimentNode(id="ode", definition="OdeSimulator", inputs={"species"}, outputs={"time"})
+
+
+def test_cost_model_policy_picks_the_fastest_measured_implementation() -> None:
+    with tempfile.TemporaryDirectory() as cost_model_dir:
+        cost_model_path = os.path.join(cost_model_dir, "cost_model.sqlite")
+        unmeasured_result = CostModelPolicy(load_cost_model(cost_model_path)).select(_NODE, _IMPLEMENTATIONS)
+        assert (unmeasured_result.implementation.id, unmeasured_result.predicted_cost) == ("Slow", None)
+
+        for runtime_seconds in (50.0, 55.0, 0.5):  # the outlier does not count
+            record_cost_measurement("local:ode.Slow", runtime_seconds, 10**8, cost_model_path)
+        for runtime_seconds in (1.0, 1.2):
+            record_cost_measurement("local:ode.Fast", runtime_seconds, 10**9, cost_model_path)
+
+        assert IndexedRouter(_IMPLEMENTATIONS).abstract_entity_to_implementation(_NODE).address == "local:ode.Slow"
+        selection_result = IndexedRouter(
+            _IMPLEMENTATIONS, CostModelPolicy(load_cost_model(cost_model_path))
+        ).select_implementation(_NODE)
+        assert (selection_result.implementation.id, selection_result.implementation.address) == (
+            "ode",
+            "local:ode.Fast",
+        )
+        assert selection_result.predicted_cost is not None
+        assert selection_result.predicted_cost.runtime_seconds == 1.1
+        assert selection_result.predicted_cost.peak_memory_bytes == 10**9
+        assert selection_result.predicted_cost.measurement_count == 2
+
+        # The predicted cost is kept on the routed node
+        routed_entity_list = IndexedRouter(
+            _IMPLEMENTATIONS, CostModelPolicy(load_cost_model(cost_model_path))
+        ).route_entity_list(ExperimentEntityList(definitions={"OdeSimulator": "bsail"}, nodes=[_NODE], wirings=[]))
+        routed_node = routed_entity_list.nodes[0]
+        assert isinstance(routed_node, ExperimentNodeImplementation)
+        assert routed_node.predicted_cost == selection_result.predicted_cost
+
+
+def test_concurrent_measurements_are_all_recorded() -> None:
+    with tempfile.TemporaryDirectory() as cost_model_dir:
+        cost_model_path = os.path.join(cost_model_dir, "cost_model.sqlite")
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for future in [
+                executor.submit(record_cost_measurement, f"local:ode.{class_name}", 1.0, 10**6, cost_model_path)
+                for class_name in ("Slow", "Fast")
+                for _ in range(16)
+            ]:
+                future.result()
+        cost_model = load_cost_model(cost_model_path)
+        assert {address: len(measurements) for address, measurements in cost_model.measurements.items()} == {
+            "local:ode.Slow": 16,
+            "local:ode.Fast": 16,
+        }
+
+
+def test_saving_keeps_measurements_recorded_since_loading() -> None:
+    with tempfile.TemporaryDirectory() as cost_model_dir:
+        cost_model_path = os.path.join(cost_model_dir, "cost_model.sqlite")
+        record_cost_measurement("local:ode.Slow", 2.0, 10**6, cost_model_path)
+        cost_model = load_cost_model(cost_model_path)
+        predicted_cost = record_cost_measurement("local:ode.Slow", 4.0, 10**6, cost_model_path)
+        assert predicted_cost is not None
+        assert predicted_cost.measurement_count == 2
+        cost_model.record_measurement("local:ode.Fast", 1.0, 10**6)
+        save_cost_model(cost_model, cost_model_path)
+        save_cost_model(cost_model, cost_model_path)
+
+        saved_cost_model = load_cost_model(cost_model_path)
+        assert {address: len(measurements) for address, measurements in saved_cost_model.measurements.items()} == {
+            "local:ode.Slow": 2,
+            "local:ode.Fast": 1,
+        }
+
+
+def test_saving_keeps_only_the_most_recent_measurements() -> None:
+    with tempfile.TemporaryDirectory() as cost_model_dir:
+        cost_model_path = os.path.join(cost_model_dir, "cost_model.sqlite")
+        cost_model = load_cost_model(cost_model_path)
+        for runtime_seconds in range(MAX_MEASUREMENTS_PER_IMPLEMENTATION + 8):
+            cost_model.record_measurement("local:ode.Slow", float(runtime_seconds), 10**6)
+        save_cost_model(cost_model, cost_model_path)
+        record_cost_measurement("local:ode.Slow", 100.0, 10**6, cost_model_path)
+
+        saved_measurements = load_cost_model(cost_model_path).measurements["local:ode.Slow"]
+        assert len(saved_measurements) == MAX_MEASUREMENTS_PER_IMPLEMENTATION
+        assert saved_measurements[0].runtime_seconds == 9.0
+        assert saved_measurements[-1].runtime_seconds == 100.0
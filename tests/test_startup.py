@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_report_modules_after_help = """
+import runpy, sys
+sys.argv = ["main.py", "--help"]
+try:
+    runpy.run_path("main.py", run_name="__main__")
+except SystemExit:
+    pass
+print(",".join(sorted(sys.modules)), file=sys.stderr)
+"""
+
+
+def test_cli_help_does_not_import_heavy_modules() -> None:
+    completed = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", _report_modules_after_help],
+        capture_output=True,
+        text=True,
+        cwd=REPO_ROOT,
+        check=True,
+    )
+    imported_modules = set(completed.stderr.strip().splitlines()[-1].split(","))
+    for module in ["pydantic", "spython", "bsedic.execution", "bsedic.batch", "bsedic.daemon", "http.client"]:
+        assert module not in imported_modules
+    assert "bsedic.utils.input_types" in imported_modules
+
+
+def test_input_types_lazily_reexports_result_models() -> None:
+    from bsedic.utils import input_types, result_types
+
+    assert input_types.ExperimentPrimaryDependencies is result_types.ExperimentPrimaryDependencies
+    assert input_types.ContainerizationFileRepr is result_types.ContainerizationFileRepr